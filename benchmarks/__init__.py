@@ -0,0 +1 @@
+"""Benchmarks for the propgraph hot paths"""
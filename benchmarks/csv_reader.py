@@ -0,0 +1,46 @@
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from propgraph.csvgraph import read_csv_files
+
+def generate(directory: str, files: int, rows: int, seed: int = 42) -> list[str]:
+   rnd = random.Random(seed)
+   names = []
+   for file in range(files):
+      filename = os.path.join(directory,f'nodes-{file}.csv')
+      with open(filename,'w') as output:
+         output.write('~id,~label,name,use:Int,weight:Double,active:Bool,tags:String[]\n')
+         for row in range(rows):
+            id = file*rows + row
+            output.write(f'n{id},Component,Component {id},{rnd.randrange(1000)},{rnd.random():.6f},{rnd.random()<0.5},a;b\n')
+      names.append(filename)
+   filename = os.path.join(directory,'edges.csv')
+   with open(filename,'w') as output:
+      output.write('~id,~from,~to,~label,since:Long\n')
+      total = files*rows
+      for row in range(total):
+         output.write(f'e{row},n{rnd.randrange(total)},n{rnd.randrange(total)},imports,{2000+rnd.randrange(25)}\n')
+   names.append(filename)
+   return names
+
+def main():
+   argparser = argparse.ArgumentParser(description='CSV reader throughput by chunk size')
+   argparser.add_argument('--files',help='The number of node files',type=int,default=4)
+   argparser.add_argument('--rows',help='The number of rows per node file',type=int,default=50000)
+   argparser.add_argument('--chunk-sizes',help='A comma separated list of the number of rows per chunk',default='100,1000,10000')
+   args = argparser.parse_args()
+
+   with tempfile.TemporaryDirectory() as directory:
+      generate(directory,args.files,args.rows)
+      pattern = os.path.join(directory,'*.csv')
+      for chunk_size in [int(size) for size in args.chunk_sizes.split(',')]:
+         start = time.perf_counter()
+         count = sum(1 for _ in read_csv_files([pattern],chunk_size=chunk_size))
+         elapsed = time.perf_counter() - start
+         print('{}\t{} items\t{:.3f}s\t{:.0f} items/s'.format(chunk_size,count,elapsed,count/elapsed))
+
+if __name__ == '__main__':
+   main()
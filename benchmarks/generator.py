@@ -0,0 +1,150 @@
+import argparse
+import os
+import random
+import sys
+from dataclasses import dataclass
+from io import StringIO
+from typing import TextIO
+
+@dataclass
+class GraphSpec:
+   # The shape of a synthetic graph (inline edges are the ~edges of each node)
+
+   nodes: int = 1000
+   fanout: int = 2
+   width: int = 4
+   labels: int = 4
+   inline_edges: bool = True
+   seed: int = 42
+
+   def label(self, id: int) -> str:
+      return 'Label{}'.format(id % self.labels)
+
+   def values(self, rnd: random.Random, id: int) -> list[tuple[str,str,object]]:
+      # (name, CSV type, value) of each property, cycling through the types
+      values = []
+      for index in range(self.width):
+         kind = index % 4
+         name = 'p{}'.format(index)
+         if kind==0:
+            values.append((name,'String','value {} {}'.format(id,rnd.randrange(1000))))
+         elif kind==1:
+            values.append((name,'Int',rnd.randrange(1000000)))
+         elif kind==2:
+            values.append((name,'Double',round(rnd.random(),6)))
+         else:
+            values.append((name,'Bool',rnd.random()<0.5))
+      return values
+
+   def edges(self, rnd: random.Random, id: int) -> list[int]:
+      return [rnd.randrange(self.nodes) for _ in range(self.fanout)]
+
+def _yaml_value(value: object) -> str:
+   if type(value)==str:
+      return "'" + value.replace("'","''") + "'"
+   if type(value)==bool:
+      return 'true' if value else 'false'
+   return str(value)
+
+def write_yaml(spec: GraphSpec, output: TextIO):
+   # keyed by the id property of each label
+   rnd = random.Random(spec.seed)
+   output.write("~schema: |\n  '''A generated graph'''\n")
+   for label in range(spec.labels):
+      output.write("  (:Label{} {{id}})\n  .id = 'the identifier'\n".format(label))
+   top_level = []
+   for id in range(spec.nodes):
+      output.write("n{id}:\n ~label: {label}\n id: 'n{id}'\n".format(id=id,label=spec.label(id)))
+      for name, _, value in spec.values(rnd,id):
+         output.write(' {}: {}\n'.format(name,_yaml_value(value)))
+      targets = spec.edges(rnd,id)
+      if spec.inline_edges and len(targets)>0:
+         output.write(' ~edges:\n')
+         for target in targets:
+            output.write(' - ~to: n{}\n   ~label: links\n   weight: {}\n'.format(target,rnd.randrange(100)))
+      else:
+         top_level.extend((id,target,rnd.randrange(100)) for target in targets)
+   if len(top_level)>0:
+      output.write('~edges:\n')
+      for source, target, weight in top_level:
+         output.write('- ~from: n{}\n  ~to: n{}\n  ~label: links\n  weight: {}\n'.format(source,target,weight))
+
+def generate_yaml(spec: GraphSpec) -> str:
+   output = StringIO()
+   write_yaml(spec,output)
+   return output.getvalue()
+
+def write_csv(spec: GraphSpec, directory: str) -> list[str]:
+   # a node file per label and an edge file; returns their names
+   rnd = random.Random(spec.seed)
+   names = [os.path.join(directory,'nodes-{}.csv'.format(spec.label(label))) for label in range(spec.labels)]
+   files = [open(name,'w',newline='') for name in names]
+   edges_name = os.path.join(directory,'edges.csv')
+   try:
+      header = None
+      with open(edges_name,'w',newline='') as edges:
+         edges.write('~from,~to,~label,weight:Int\n')
+         for id in range(spec.nodes):
+            values = spec.values(rnd,id)
+            if header is None:
+               header = ','.join(['~id','~label'] + ['{}:{}'.format(name,type_name) for name, type_name, _ in values]) + '\n'
+               for file in files:
+                  file.write(header)
+            fields = ['n{}'.format(id),spec.label(id)] + [str(value).lower() if type(value)==bool else str(value) for _, _, value in values]
+            files[id % spec.labels].write(','.join(fields) + '\n')
+            for target in spec.edges(rnd,id):
+               edges.write('n{},n{},links,{}\n'.format(id,target,rnd.randrange(100)))
+   finally:
+      for file in files:
+         file.close()
+   return names + [edges_name]
+
+def generate_schema(spec: GraphSpec) -> str:
+   # a node definition per label (documenting each property) and the edges
+   rnd = random.Random(spec.seed)
+   output = StringIO()
+   types = {'String': '', 'Int': 'integer ', 'Double': 'float ', 'Bool': 'boolean '}
+   output.write("'''\nA generated graph\n'''\n\n")
+   for label in range(spec.labels):
+      output.write("(:Label{} {{id}})\n'''The nodes with label {}'''\n".format(label,label))
+      output.write(".id = 'the identifier'\n")
+      for name, type_name, _ in spec.values(rnd,label):
+         output.write(".{} = {}'the {} property'\n".format(name,types[type_name],name))
+      for target in range(spec.labels):
+         output.write('-[:links]->(:Label{})\n'.format(target))
+      output.write('\n')
+   return output.getvalue()
+
+def main():
+   argparser = argparse.ArgumentParser(description='Generate a synthetic property graph')
+   argparser.add_argument('--format',help='The output format (defaults to yaml)',default='yaml',choices=['yaml','csv','schema'])
+   argparser.add_argument('--nodes',help='The number of nodes',type=int,default=1000)
+   argparser.add_argument('--fanout',help='The number of edges per node',type=int,default=2)
+   argparser.add_argument('--width',help='The number of properties per node',type=int,default=4)
+   argparser.add_argument('--labels',help='The number of distinct labels',type=int,default=4)
+   argparser.add_argument('--top-level-edges',help='Write the edges at the top level instead of with each node',action='store_true',default=False)
+   argparser.add_argument('--seed',help='The random seed',type=int,default=42)
+   argparser.add_argument('--output',help='The output file (or directory for csv, defaults to the current directory)')
+   args = argparser.parse_args()
+
+   spec = GraphSpec(nodes=args.nodes,fanout=args.fanout,width=args.width,labels=args.labels,inline_edges=not args.top_level_edges,seed=args.seed)
+   if args.format=='csv':
+      directory = args.output or '.'
+      os.makedirs(directory,exist_ok=True)
+      for name in write_csv(spec,directory):
+         print(name)
+   elif args.format=='schema':
+      text = generate_schema(spec)
+      if args.output:
+         with open(args.output,'w') as output:
+            output.write(text)
+      else:
+         sys.stdout.write(text)
+   elif args.output:
+      with open(args.output,'w') as output:
+         write_yaml(spec,output)
+   else:
+      write_yaml(spec,sys.stdout)
+
+if __name__ == '__main__':
+   main()
@@ -0,0 +1,47 @@
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)),'..'))
+
+COMMANDS = {
+   'import propgraph': ['-c','import propgraph'],
+   'propgraph --help': ['-m','propgraph','--help'],
+   'propgraph schema.check': ['-m','propgraph','schema.check',os.path.join(ROOT,'examples','ontology.pgs')],
+}
+
+def import_times(args: list[str]) -> list[tuple[int,int,str]]:
+   # the cumulative time in microseconds and depth for each module from -X importtime
+   result = subprocess.run([sys.executable,'-X','importtime'] + args,cwd=ROOT,capture_output=True,text=True)
+   times = []
+   for line in result.stderr.splitlines():
+      if not line.startswith('import time:') or 'cumulative' in line:
+         continue
+      _, cumulative, name = line.split('|')
+      # the module name is indented by two spaces per level after the separator
+      times.append((int(cumulative),(len(name)-len(name.lstrip())+1)//2,name.strip()))
+   return times
+
+def wall_time(args: list[str], repeat: int) -> float:
+   start = time.perf_counter()
+   for _ in range(repeat):
+      subprocess.run([sys.executable] + args,cwd=ROOT,capture_output=True)
+   return (time.perf_counter() - start)/repeat
+
+def main():
+   argparser = argparse.ArgumentParser(description='Measure the import time of propgraph and its command-line interface')
+   argparser.add_argument('--repeat',help='The number of repetitions for the wall time',type=int,default=5)
+   argparser.add_argument('--top',help='The number of slowest modules to list',type=int,default=5)
+   args = argparser.parse_args()
+
+   for name, command in COMMANDS.items():
+      times = import_times(command)
+      total = sum(cumulative for cumulative, depth, _ in times if depth==1)
+      print('{}: {:.1f} ms imports, {:.1f} ms wall'.format(name,total/1000,wall_time(command,args.repeat)*1000))
+      for cumulative, _, module in sorted([entry for entry in times if entry[1]==1],reverse=True)[:args.top]:
+         print('   {:8.1f} ms {}'.format(cumulative/1000,module))
+
+if __name__ == '__main__':
+   main()
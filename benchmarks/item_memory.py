@@ -0,0 +1,68 @@
+import argparse
+import gc
+import random
+import tracemalloc
+from dataclasses import dataclass
+
+from propgraph import read_graph
+
+# The item representation before slots, interning, and shared endpoint keys
+@dataclass
+class LegacyNodeItem:
+   labels: set
+   keys: set
+   properties: dict
+
+@dataclass
+class LegacyEdgeRelationItem:
+   labels: set
+   from_labels: set
+   from_node: dict
+   to_labels: set
+   to_node: dict
+   directed: bool
+   properties: dict
+
+def legacy(item):
+   if hasattr(item,'from_node'):
+      return LegacyEdgeRelationItem(set(item.labels),set(item.from_labels),dict(item.from_node),set(item.to_labels),dict(item.to_node),item.directed,dict(item.properties))
+   return LegacyNodeItem(set(item.labels),set(item.keys),dict(item.properties))
+
+def generate(nodes: int, edges: int, seed: int = 42) -> dict:
+   rnd = random.Random(seed)
+   graph = {}
+   for index in range(nodes):
+      graph[f'n{index}'] = {'~label':'Component','id':f'n{index}','name':f'Component {index}','use':index}
+   graph['~edges'] = [
+      {'~from':f'n{rnd.randrange(nodes)}','~to':f'n{rnd.randrange(nodes)}','~label':'imports'}
+      for _ in range(edges)
+   ]
+   return graph
+
+def measure(items_of) -> tuple[int,int]:
+   gc.collect()
+   tracemalloc.start()
+   items = items_of()
+   size = tracemalloc.get_traced_memory()[0]
+   tracemalloc.stop()
+   count = len(items)
+   del items
+   return size, count
+
+def main():
+   argparser = argparse.ArgumentParser(description='Memory used per item by read_graph')
+   argparser.add_argument('--nodes',help='The number of nodes',type=int,default=100000)
+   argparser.add_argument('--edges',help='The number of edges',type=int,default=1000000)
+   args = argparser.parse_args()
+
+   graph = generate(args.nodes,args.edges)
+
+   current, count = measure(lambda: list(read_graph(graph,infer=True,default_key='id')))
+   before, _ = measure(lambda: [legacy(item) for item in read_graph(graph,infer=True,default_key='id')])
+
+   print('items\t{}'.format(count))
+   print('before (bytes/item)\t{:.1f}'.format(before/count))
+   print('after (bytes/item)\t{:.1f}'.format(current/count))
+
+if __name__ == '__main__':
+   main()
@@ -0,0 +1,60 @@
+import argparse
+import asyncio
+import time
+
+from propgraph import read_graph
+from propgraph.loader import GraphLoader, load_requests, load_graph
+from propgraph.standin import StandinServer
+
+from benchmarks.generator import GraphSpec, generate_yaml
+
+def load_pipelined(server: StandinServer, graph: str, items: list, pipeline: int, **options) -> int:
+   with GraphLoader(server.connect(),graph,pipeline=pipeline) as loader:
+      for request in load_requests(iter(items),**options):
+         loader.submit(request)
+   return loader.queries
+
+def load_concurrent(server: StandinServer, graph: str, items: list, concurrency: int, **options) -> int:
+   async def run():
+      client = server.connect(asynchronous=True)
+      try:
+         return await load_graph(iter(items),client,graph=graph,concurrency=concurrency,**options)
+      finally:
+         await client.aclose()
+   return asyncio.run(run())
+
+def main():
+   argparser = argparse.ArgumentParser(description='Load throughput against the stand-in server by pipeline depth, concurrency, and batch size')
+   argparser.add_argument('--nodes',help='The number of nodes',type=int,default=2000)
+   argparser.add_argument('--fanout',help='The number of edges per node',type=int,default=2)
+   argparser.add_argument('--latency',help='The round trip latency in seconds',type=float,default=0.001)
+   argparser.add_argument('--query-time',help='The minimum time of each query in seconds',type=float,default=0.0)
+   argparser.add_argument('--pipelines',help='The pipeline depths',type=int,nargs='*',default=[1,10,100])
+   argparser.add_argument('--concurrency',help='The concurrency levels of the asynchronous loader',type=int,nargs='*',default=[1,8,32])
+   argparser.add_argument('--batch-sizes',help='The batch sizes (0 for none)',type=int,nargs='*',default=[0,100])
+   argparser.add_argument('--parameters',help='Use parameterized queries',action='store_true',default=False)
+   args = argparser.parse_args()
+
+   spec = GraphSpec(nodes=args.nodes,fanout=args.fanout,labels=1)
+   items = list(read_graph(generate_yaml(spec)))
+   runs = [('pipeline',depth) for depth in args.pipelines] + [('concurrency',level) for level in args.concurrency]
+   print('mode\tlevel\tbatch\tqueries\tround trips\tseconds\titems/s\tnodes\tedges')
+   with StandinServer(latency=args.latency,query_time=args.query_time,record=False) as server:
+      for batch_size in args.batch_sizes:
+         for mode, level in runs:
+            graph = '{}-{}-{}'.format(mode,level,batch_size)
+            options = {'batch_size':batch_size or None,'use_parameters':args.parameters}
+            round_trips = server.round_trips
+            start = time.perf_counter()
+            if mode=='pipeline':
+               queries = load_pipelined(server,graph,items,level,**options)
+            else:
+               queries = load_concurrent(server,graph,items,level,**options)
+            elapsed = time.perf_counter() - start
+            loaded = server.graph(graph)
+            print('{}\t{}\t{}\t{}\t{}\t{:.3f}\t{:.0f}\t{}\t{}'.format(
+               mode,level,batch_size,queries,server.round_trips-round_trips,elapsed,len(items)/elapsed,len(loaded.nodes),len(loaded.relationships)
+            ))
+
+if __name__ == '__main__':
+   main()
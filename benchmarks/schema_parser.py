@@ -0,0 +1,53 @@
+import argparse
+import os
+import tempfile
+import time
+
+from lark import Lark
+
+from propgraph import SchemaParser
+from propgraph import schema as schema_module
+
+EXAMPLE = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)),'..','examples','ontology.pgs'))
+
+def _time(f,repeat):
+   start = time.perf_counter()
+   for _ in range(repeat):
+      f()
+   return (time.perf_counter() - start)/repeat
+
+def main():
+   argparser = argparse.ArgumentParser(description='Cold and warm schema parser latency')
+   argparser.add_argument('--repeat',help='The number of repetitions',type=int,default=10)
+   argparser.add_argument('file',nargs='?',help='The schema to parse (defaults to the example ontology)',default=EXAMPLE)
+   args = argparser.parse_args()
+
+   with open(args.file,'r') as input:
+      source = input.read()
+
+   with tempfile.TemporaryDirectory() as dir:
+      cache_file = os.path.join(dir,'schema.lark')
+      build = _time(lambda: Lark(schema_module.grammar,parser='lalr',start='schema'),args.repeat)
+      Lark(schema_module.grammar,parser='lalr',start='schema',cache=cache_file)
+      disk = _time(lambda: Lark(schema_module.grammar,parser='lalr',start='schema',cache=cache_file),args.repeat)
+
+   SchemaParser()
+   shared = _time(lambda: SchemaParser(),args.repeat)
+   parser = SchemaParser()
+   parse = _time(lambda: parser.parse(source),args.repeat)
+
+   # a schema parse as done per file by the CLI
+   cold = build + parse
+   cached = disk + parse
+   warm = shared + parse
+
+   print('build tables (ms)\t{:.3f}'.format(build*1000))
+   print('load from disk cache (ms)\t{:.3f}'.format(disk*1000))
+   print('shared parser (ms)\t{:.3f}'.format(shared*1000))
+   print('parse {} (ms)\t{:.3f}'.format(os.path.basename(args.file),parse*1000))
+   print('cold schema parse, no cache (ms)\t{:.3f}'.format(cold*1000))
+   print('first schema parse in a process, disk cache (ms)\t{:.3f}'.format(cached*1000))
+   print('warm schema parse (ms)\t{:.3f}'.format(warm*1000))
+
+if __name__ == '__main__':
+   main()
@@ -0,0 +1,53 @@
+import argparse
+import os
+import random
+import tempfile
+import time
+from io import StringIO
+
+from propgraph import read_graph
+from propgraph.snapshot import write_snapshot, read_snapshot
+
+def generate(nodes: int, fanout: int, seed: int = 42) -> str:
+   rnd = random.Random(seed)
+   out = StringIO()
+   for id in range(nodes):
+      out.write(f"n{id}:\n ~label: Component\n id: 'n{id}'\n name: 'Component {id}'\n use: {rnd.randrange(1000)}\n weight: {rnd.random():.6f}\n tags: [a, b]\n")
+      if fanout>0:
+         out.write(' ~edges:\n')
+         for _ in range(fanout):
+            out.write(f' - ~to: n{rnd.randrange(nodes)}\n   ~label: imports\n')
+   return out.getvalue()
+
+def main():
+   argparser = argparse.ArgumentParser(description='Reading a graph from YAML versus a snapshot')
+   argparser.add_argument('--nodes',help='The number of nodes',type=int,default=20000)
+   argparser.add_argument('--fanout',help='The number of edges per node',type=int,default=2)
+   argparser.add_argument('files',nargs='*',help='YAML graph files to read instead of a generated graph')
+   args = argparser.parse_args()
+
+   sources = []
+   for file in args.files:
+      with open(file,'r') as input:
+         sources.append((file,input.read()))
+   if len(sources)==0:
+      sources.append(('generated',generate(args.nodes,args.fanout)))
+
+   print('source\titems\tyaml (s)\twrite (s)\tsnapshot (s)\tspeedup')
+   with tempfile.TemporaryDirectory() as directory:
+      path = os.path.join(directory,'graph.snapshot')
+      for name, text in sources:
+         start = time.perf_counter()
+         items = list(read_graph(StringIO(text)))
+         parse = time.perf_counter() - start
+         start = time.perf_counter()
+         write_snapshot(items,path)
+         write = time.perf_counter() - start
+         start = time.perf_counter()
+         count = sum(1 for _ in read_snapshot(path))
+         read = time.perf_counter() - start
+         assert count==len(items)
+         print('{}\t{}\t{:.3f}\t{:.3f}\t{:.3f}\t{:.1f}x'.format(name,count,parse,write,read,parse/read))
+
+if __name__ == '__main__':
+   main()
@@ -0,0 +1,63 @@
+# pytest-benchmark suites for the hot paths on generated graphs. The suite is
+# not collected with the tests; compare with the stored baseline (failing on a
+# mean regression of more than 25%) with:
+#
+#   python -m pytest benchmarks/suite.py --benchmark-storage=benchmarks/baselines --benchmark-compare --benchmark-compare-fail=mean:25%
+#
+# and save a new baseline with --benchmark-save=baseline.
+
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+
+from propgraph import read_graph, graph_to_cypher, SchemaParser
+from propgraph.csvgraph import read_csv_files
+from propgraph.util import stringify_param_value
+from propgraph.validate import validate_graph
+
+from benchmarks.generator import GraphSpec, generate_yaml, generate_schema, write_csv
+
+SPEC = GraphSpec(nodes=1000,fanout=2,width=8,labels=4)
+
+@pytest.fixture(scope='module')
+def yaml_text() -> str:
+   return generate_yaml(SPEC)
+
+@pytest.fixture(scope='module')
+def items(yaml_text) -> list:
+   return list(read_graph(yaml_text))
+
+@pytest.fixture(scope='module')
+def csv_files(tmp_path_factory) -> list[str]:
+   return write_csv(SPEC,str(tmp_path_factory.mktemp('csv')))
+
+@pytest.mark.parametrize('inline_edges',[True,False],ids=['inline','top-level'])
+def test_read_graph(benchmark, inline_edges) -> None:
+   text = generate_yaml(GraphSpec(nodes=SPEC.nodes,fanout=SPEC.fanout,width=SPEC.width,labels=SPEC.labels,inline_edges=inline_edges))
+   result = benchmark(lambda: sum(1 for _ in read_graph(text)))
+   assert result==1 + SPEC.nodes * (1 + SPEC.fanout)
+
+def test_read_csv(benchmark, csv_files) -> None:
+   result = benchmark(lambda: sum(1 for _ in read_csv_files(csv_files)))
+   assert result==SPEC.nodes * (1 + SPEC.fanout)
+
+@pytest.mark.parametrize('options',[{},{'use_parameters':True},{'batch_size':500}],ids=['literal','parameters','batched'])
+def test_graph_to_cypher(benchmark, items, options) -> None:
+   result = benchmark(lambda: sum(1 for _ in graph_to_cypher(iter(items),**options)))
+   assert result>0
+
+def test_schema_parse(benchmark) -> None:
+   text = generate_schema(GraphSpec(labels=50,width=12))
+   parser = SchemaParser()
+   schema = benchmark(lambda: parser.parse(text))
+   assert len(schema.nodes)==50
+
+def test_stringify_param_value(benchmark, items) -> None:
+   values = [item.properties for item in items if hasattr(item,'keys')]
+   result = benchmark(lambda: [stringify_param_value(value) for value in values])
+   assert len(result)==len(values)
+
+def test_validate(benchmark, yaml_text) -> None:
+   # the validate operation: reading and validating against the embedded schema
+   report = benchmark(lambda: validate_graph(read_graph(yaml_text)))
+   assert report.nodes==SPEC.nodes
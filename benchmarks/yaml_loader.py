@@ -0,0 +1,64 @@
+import argparse
+import glob
+import os
+import sys
+import time
+from io import StringIO
+
+import yaml
+
+from propgraph import read_graph
+
+EXAMPLES = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)),'..','examples'))
+
+def _sources(files):
+   for file in files:
+      with open(file,'r') as input:
+         yield file, input.read()
+   try:
+      from tests.test_api import GRAPH_A
+      yield 'tests.test_api.GRAPH_A', GRAPH_A
+   except ImportError:
+      pass
+
+def _items(text,loader,stream):
+   return list(read_graph(StringIO(text),loader=loader,stream=stream))
+
+def _time(text,loader,stream,repeat):
+   start = time.perf_counter()
+   for _ in range(repeat):
+      _items(text,loader,stream)
+   return (time.perf_counter() - start)/repeat
+
+def main():
+   argparser = argparse.ArgumentParser(description='Compare the python and libyaml loaders for read_graph')
+   argparser.add_argument('--repeat',help='The number of repetitions per file',type=int,default=20)
+   argparser.add_argument('files',nargs='*',help='The graph files to read (defaults to the examples)')
+   args = argparser.parse_args()
+
+   if not yaml.__with_libyaml__:
+      print('pyyaml was built without libyaml; only the python loader is available',file=sys.stderr)
+      sys.exit(1)
+
+   files = args.files if len(args.files)>0 else sorted(glob.glob(os.path.join(EXAMPLES,'*.yaml')))
+
+   failed = False
+   print('source\tstream\tpython (ms)\tc (ms)\tspeedup')
+   for name, text in _sources(files):
+      for stream in [False,True]:
+         python_items = _items(text,'python',stream)
+         c_items = _items(text,'c',stream)
+         # the schema objects do not compare by value
+         same = len(python_items)==len(c_items) and all(type(a)==type(b) and (type(a).__name__=='Schema' or a==b) for a, b in zip(python_items,c_items))
+         if not same:
+            print(f'{name}: item streams differ (stream={stream})',file=sys.stderr)
+            failed = True
+         python_time = _time(text,'python',stream,args.repeat)
+         c_time = _time(text,'c',stream,args.repeat)
+         print(f'{name}\t{stream}\t{python_time*1000:.3f}\t{c_time*1000:.3f}\t{python_time/c_time:.1f}x')
+
+   if failed:
+      sys.exit(1)
+
+if __name__ == '__main__':
+   main()
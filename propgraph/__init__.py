@@ -3,8 +3,54 @@ __version__=(0,6,0)
 __author__='Alex Miłowski'
 __author_email__='alex@milowski.com'
 
-from .cypher import read_graph, graph_to_cypher, cypher_literal, cypher_for_item, cypher_for_node, cypher_for_edge_relation, NodeItem, EdgeRelationItem
-from .schema import SchemaParser, Schema, NodeDefinition, EdgeDefinition
+from importlib import import_module
 
-__all__ = ['read_graph', 'graph_to_cypher', 'cypher_literal', 'cypher_for_item', 'cypher_for_node', 'cypher_for_edge_relation', 'NodeItem', 'EdgeRelationItem'
-           'SchemaParser','Schema','NodeDefinition','EdgeDefinition']
+# TYPE_CHECKING is defined rather than imported from typing so that typing is
+# not imported at startup (type checkers treat it as true); __main__ does the
+# same.
+TYPE_CHECKING = False
+
+# The modules are imported on first access so that importing the package (e.g.,
+# for the command-line interface) does not load yaml or lark until needed.
+_exports = {
+   'read_graph': 'cypher',
+   'graph_to_cypher': 'cypher',
+   'cypher_literal': 'cypher',
+   'cypher_for_item': 'cypher',
+   'cypher_for_node': 'cypher',
+   'cypher_for_edge_relation': 'cypher',
+   'NodeItem': 'items',
+   'EdgeRelationItem': 'items',
+   'SchemaParser': 'schema',
+   'Schema': 'schema',
+   'NodeDefinition': 'schema',
+   'EdgeDefinition': 'schema',
+   'batch_items': 'batch',
+   'cypher_for_batch': 'batch',
+   'TemplateCache': 'templates',
+   'template_cache': 'templates',
+   'read_graph_batches': 'columnar',
+   'NodeBatch': 'items',
+   'EdgeBatch': 'items',
+}
+
+__all__ = list(_exports.keys())
+
+if TYPE_CHECKING:
+   from .cypher import read_graph, graph_to_cypher, cypher_literal, cypher_for_item, cypher_for_node, cypher_for_edge_relation
+   from .items import NodeItem, EdgeRelationItem, NodeBatch, EdgeBatch
+   from .schema import SchemaParser, Schema, NodeDefinition, EdgeDefinition
+   from .batch import batch_items, cypher_for_batch
+   from .templates import TemplateCache, template_cache
+   from .columnar import read_graph_batches
+
+def __getattr__(name: str):
+   module = _exports.get(name)
+   if module is None:
+      raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+   value = getattr(import_module('.' + module, __name__), name)
+   globals()[name] = value
+   return value
+
+def __dir__():
+   return sorted(set(globals().keys()) | set(_exports.keys()))
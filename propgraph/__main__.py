@@ -1,13 +1,19 @@
+from __future__ import annotations
+
 import argparse
+import json
 import os
 import sys
-from typing import Any
-import yaml
+TYPE_CHECKING = False
 
-from propgraph import read_graph, graph_to_cypher, cypher_for_item, SchemaParser, Schema, NodeDefinition, NodeItem, EdgeRelationItem
-from .util import stringify_param_value
+# Note: the operations import what they use so that startup stays fast
+if TYPE_CHECKING:
+   from .schema import Schema
+   from .loader import LoadRequest
+   from .parallel import PartitionResult
 
 def generate_schema(labels : set[str],keys : dict[str,str]):
+   from .schema import Schema, NodeDefinition
    schema = Schema()
    default_key = keys.get('',{'@id'})
    for label in labels:
@@ -16,6 +22,20 @@ def generate_schema(labels : set[str],keys : dict[str,str]):
       schema.add_node(node_def)
    return schema
 
+def read_schema(source: str | None, labels: set[str], keys: dict[str,str]) -> Schema | None:
+   if source:
+      from .schema import SchemaParser
+      parser = SchemaParser()
+      with open(source,'r') as input:
+         schema = parser.parse(input)
+   else:
+      schema = None
+
+   if not schema and labels:
+      schema = generate_schema(labels,keys)
+
+   return schema
+
 def main():
    argparser = argparse.ArgumentParser(description='propgraph')
    argparser.add_argument('--host',help='The database host (defaults to 0.0.0.0)',default='0.0.0.0')
@@ -26,21 +46,58 @@ def main():
    argparser.add_argument('--show-property',help='A property to display as a progress indicator')
    argparser.add_argument('--infer',help='Infer labels and keys from @type and @id',action='store_true',default=False)
    argparser.add_argument('--exact',help='Set exact properties (not additive)',action='store_true',default=False)
+   argparser.add_argument('--create',help='Create the nodes and edges instead of merging them (e.g., a bulk load into an empty graph)',action='store_true',default=False)
+   argparser.add_argument('--indexes',help='Create indexes on the node keys before the nodes or, when deferred, after the nodes and before the edges (defaults to none)',default='none',choices=['none','before','deferred'])
+   argparser.add_argument('--constraints',help='Create unique constraints on the node keys along with the indexes when loading',action='store_true',default=False)
    argparser.add_argument('--use-parameters',help='Use parameters for queries (implies exact, not additive)',action='store_true',default=False)
+   argparser.add_argument('--batch-size',help='Batch items with the same shape into UNWIND queries of this size',type=int,default=0)
+   argparser.add_argument('--pipeline',help='The number of queries to send per round trip when loading (defaults to 1)',type=int,default=1)
+   argparser.add_argument('--concurrency',help='The number of queries kept in flight with an asyncio client when loading (defaults to 1, synchronous)',type=int,default=1)
+   argparser.add_argument('--workers',help='The number of worker processes used to load the files (defaults to 1)',type=int,default=1)
+   argparser.add_argument('--partitions',help='The number of partitions (by node key) per file when loading with workers',type=int)
+   argparser.add_argument('--retries',help='The number of retries with exponential backoff for connection errors and timeouts (defaults to 3)',type=int,default=3)
+   argparser.add_argument('--dead-letter',help='A file for the items rejected by the database (as JSON lines) instead of stopping the load')
+   argparser.add_argument('--coalesce',help='Merge the nodes (and edges) with the same identity across all the files before generating queries',action='store_true',default=False)
+   argparser.add_argument('--coalesce-policy',help='How conflicting property values are coalesced (defaults to last)',default='last',choices=['last','first','error','union'])
+   argparser.add_argument('--coalesce-limit',help='The number of coalesced items kept in memory before spilling to disk',type=int)
+   argparser.add_argument('--incremental',help='A manifest of content hashes used to only generate or load the items that changed since the last run')
+   argparser.add_argument('--delete',help='Delete the items no longer in the graph (with --incremental)',action='store_true',default=False)
+   argparser.add_argument('--checkpoint',help='A file that records the committed position of each source when loading')
+   argparser.add_argument('--checkpoint-interval',help='Record the checkpoint positions at most every interval seconds rather than after every committed query (queries since the last record are re-run when resuming)',type=float,default=0.0)
+   argparser.add_argument('--resume',help='Skip the items already committed according to the checkpoint (defaults to {graph}.checkpoint); fails if a source file has changed (by a hash of its content)',action='store_true',default=False)
+   argparser.add_argument('--stats',help='Report the time of each stage, throughput, query sizes and latencies, and peak memory as JSON at the end (json) or also as periodic progress lines (progress)',choices=['json','progress'])
+   argparser.add_argument('--stats-interval',help='The seconds between progress lines (defaults to 5)',type=float,default=5.0)
+   argparser.add_argument('--stats-hook',help='A StatsHook (or a function returning one) that receives the measurements as module:name')
+   argparser.add_argument('--trace-memory',help='Also report the peak python memory traced by tracemalloc (slower)',action='store_true',default=False)
    argparser.add_argument('--single-line',help='Show progress indicator as single line',action='store_true',default=False)
    argparser.add_argument('--graph',help='The graph name',default='test')
    argparser.add_argument('--database',help='The database type (defaults to falkor)',default='falkordb',choices=['redis','falkordb'])
-   argparser.add_argument('--format',help='The input format (defaults to yaml)',default='yaml',choices=['yaml','csv'])
+   argparser.add_argument('--stream',help='Stream the YAML input node by node instead of loading the whole document',action='store_true',default=False)
+   argparser.add_argument('--yaml-loader',help='The YAML loader to use (defaults to auto, libyaml when available)',default='auto',choices=['auto','c','python'])
+   argparser.add_argument('--report',help='The validation report format (defaults to text)',default='text',choices=['text','json'])
+   argparser.add_argument('--pending-limit',help='The number of unresolved edge endpoints kept in memory before spilling to disk when validating (defaults to 100000)',type=int,default=100000)
+   argparser.add_argument('--format',help='The input format (defaults to yaml)',default='yaml',choices=['yaml','csv','ndjson','snapshot'])
+   argparser.add_argument('--chunk-size',help='The number of CSV rows read and converted at a time (defaults to 10000)',type=int,default=10000)
+   argparser.add_argument('--output',help='The output directory for bulk-export (defaults to the graph name) or file for snapshot (defaults to {graph}.snapshot) and ndjson (defaults to stdout)')
    argparser.add_argument('--schema',help='A schema to use for the graph')
    argparser.add_argument('--labels',help='A comma separate list of node labels')
    argparser.add_argument('--keys',help='A comma separate list of node propertys to use as keys (label:key or key)')
-   argparser.add_argument('operation',help='The operation to perform',choices=['validate','cypher','load', 'schema.check', 'schema.doc'])
+   argparser.add_argument('operation',help='The operation to perform',choices=['validate','cypher','load','bulk-export','snapshot','ndjson', 'schema.check', 'schema.doc'])
    argparser.add_argument('files',nargs='*',help='The files to process.')
 
    args = argparser.parse_args()
 
+   # snapshots are binary files
+   mode = 'rb' if args.format=='snapshot' and not args.operation.startswith('schema.') else 'r'
+
+   from contextlib import nullcontext
    if len(args.files)==0:
-      sources = [sys.stdin]
+      sources = [sys.stdin.buffer if mode=='rb' else sys.stdin]
+   elif (args.format=='csv' and args.operation in ['validate','cypher','load'] or args.coalesce and args.operation in ['cypher','load'] or args.operation in ['bulk-export','snapshot','ndjson']) and args.workers<=1:
+      # the CSV files (and glob patterns) are read as a single graph with all
+      # the node files before the edge files, as are the files to coalesce,
+      # export, snapshot, or write as ndjson
+      sources = [nullcontext(args.files)]
    else:
       sources = args.files
 
@@ -67,129 +124,359 @@ def main():
       keys[''] = {default_key}
 
    labels = labels | ({x.strip() for x in args.labels.split(',')} if args.labels else set())
-         
+
+   checkpoint_path = args.checkpoint if args.checkpoint else (args.graph + '.checkpoint' if args.resume else None)
+   if checkpoint_path and args.operation=='load' and len(args.files)==0:
+      print('Checkpoints require files (not stdin).',file=sys.stderr)
+      sys.exit(1)
+
+   password = args.password if args.password else os.environ.get('DBPASSWORD')
+   retry = None
+   if args.operation=='load' and args.retries>0:
+      from .loader import RetryPolicy
+      retry = RetryPolicy(retries=args.retries)
+
+   username = args.username if args.username else os.environ.get('DBUSER')
+
+   stats = None
+   if args.stats or args.stats_hook:
+      from .stats import Stats, ProgressLines
+      hooks = []
+      if args.stats:
+         hooks.append(ProgressLines(progress=args.stats=='progress'))
+      if args.stats_hook:
+         from importlib import import_module
+         module, _, name = args.stats_hook.partition(':')
+         hook = getattr(import_module(module),name)
+         hooks.append(hook() if callable(hook) else hook)
+      stats = Stats(hooks,interval=args.stats_interval,trace_memory=args.trace_memory)
+
+   if args.operation=='load' and args.workers>1:
+      if stats is not None:
+         print('Statistics are not collected when loading with multiple workers.',file=sys.stderr)
+      if len(args.files)==0:
+         print('Loading with multiple workers requires files.',file=sys.stderr)
+         sys.exit(1)
+
+      from .parallel import parallel_load
+
+      files = args.files
+      if args.format=='csv':
+         from .csvgraph import expand_sources
+         files = expand_sources(files)
+
+      def report(result: PartitionResult):
+         if result.failed is not None:
+            print(f'Failed query in {result.task.describe()} ({result.failed}):\n{result.query}',file=sys.stderr)
+            print(result.error,file=sys.stderr)
+         elif result.error is not None:
+            print(f'Failed loading {result.task.describe()}: {result.error}',file=sys.stderr)
+         elif result.skipped>0 and args.show_property is not None:
+            print('{}: resumed after item {}'.format(result.task.describe(),result.skipped))
+         elif args.show_property is not None:
+            print('{}: {} items, {} queries'.format(result.task.describe(),result.items,result.queries))
+
+      schema = read_schema(args.schema,labels,keys)
+      indexes = None
+      if args.indexes!='none' and schema is not None:
+         from .indexes import schema_index_definitions
+         indexes = schema_index_definitions(schema,constraints=args.constraints)
+
+      from .loader import LoadError
+      try:
+         results = parallel_load(
+            files,
+            args.workers,
+            partitions=args.partitions,
+            on_result=report,
+            graph=args.graph,
+            pipeline=args.pipeline,
+            read_options={'format':args.format,'schema':schema,'infer':args.infer,'default_key':default_key,'stream':args.stream,'loader':args.yaml_loader,'chunk_size':args.chunk_size},
+            query_options={'merge':not args.create,'exact':args.exact,'use_parameters':args.use_parameters,'batch_size':args.batch_size},
+            connection={'database':args.database,'host':args.host,'port':args.port,'username':username,'password':password},
+            checkpoint=checkpoint_path,
+            checkpoint_interval=args.checkpoint_interval,
+            resume=args.resume,
+            retry=retry,
+            dead_letter=args.dead_letter,
+            indexes=indexes,
+            deferred_indexes=args.indexes=='deferred'
+         )
+      except LoadError as err:
+         print(f'Failed creating indexes ({err.request.describe()}):\n{err.request.query}',file=sys.stderr)
+         print(err.error,file=sys.stderr)
+         sys.exit(1)
+      retries = sum(result.retries for result in results)
+      rejected = sum(result.rejected for result in results)
+      if retries>0 or rejected>0:
+         print('{} retries, {} rejected items'.format(retries,rejected),file=sys.stderr)
+      if any(result.error is not None for result in results):
+         sys.exit(1)
+      return
+
+   def read_items(input, schema: Schema | None, coalescing: bool = False):
+      from .cypher import read_graph
+      options = {'schema':schema,'format':args.format,'infer':args.infer,'default_key':default_key,'stream':args.stream,'loader':args.yaml_loader,'chunk_size':args.chunk_size}
+      if type(input)==list and args.format!='csv':
+         def read_files(filenames):
+            for filename in filenames:
+               with open(filename,mode) as file:
+                  yield from read_graph(file,**options)
+         items = read_files(input)
+      else:
+         items = read_graph(input,**options)
+      if coalescing and args.coalesce:
+         from .coalesce import coalesce
+         items = coalesce(items,policy=args.coalesce_policy,max_entities=args.coalesce_limit)
+      if stats is not None:
+         items = stats.timed(items,'read',count=True)
+      return items
+
+   def source_bytes(source) -> int:
+      # the size of the input files (a stream has no size)
+      if type(source)==str:
+         return os.path.getsize(source)
+      if type(source)!=nullcontext:
+         return 0
+      filenames = args.files
+      if args.format=='csv':
+         from .csvgraph import expand_sources
+         filenames = expand_sources(filenames)
+      return sum(os.path.getsize(filename) for filename in filenames)
+
+   manifest = None
+   if args.incremental and args.operation in ['cypher','load']:
+      if args.workers>1:
+         print('Incremental loads cannot use multiple workers.',file=sys.stderr)
+         sys.exit(1)
+      from .incremental import Manifest
+      manifest = Manifest(args.incremental)
+
+   def changed(items, source):
+      # the items that changed since the last run when incremental
+      if manifest is None:
+         return items
+      scope = os.path.abspath(source) if type(source)==str else ('\n'.join(os.path.abspath(filename) for filename in args.files) if args.files else '-')
+      return manifest.diff(items,deletes=args.delete,scope=scope)
+
+   def indexed(items, schema: Schema | None, constraints: bool = False):
+      # the index definitions for the node keys (ahead of the nodes or deferred until the edges)
+      if args.indexes=='none':
+         return items
+      from .indexes import with_indexes
+      return with_indexes(items,schema=schema,deferred=args.indexes=='deferred',constraints=constraints,default_keys=[default_key] if args.infer else None)
+
+   checkpoint = None
+   if checkpoint_path and args.operation=='load':
+      from .checkpoint import Checkpoint
+      checkpoint = Checkpoint(checkpoint_path,interval=args.checkpoint_interval)
+
+   dead_letter = None
+   if args.dead_letter and args.operation=='load':
+      from .loader import DeadLetterFile
+      dead_letter = DeadLetterFile(args.dead_letter)
+
    for source in sources:
-      with open(source,'r') if type(source)==str else source as input:
+      if stats is not None:
+         stats.bytes += source_bytes(source)
+      with open(source,mode) if type(source)==str else source as input:
 
          if args.operation=='validate':
-            # TODO: support multi-key nodes
-            by_key = dict()
-            by_label = set()
-            for item in read_graph(input,format=args.format,infer=args.infer):
-               if type(item)==NodeItem:
-                  multi_key = ','.join([str(item.properties[key]) for key in sorted(item.keys)])
-                  by_key[multi_key] = item.labels
-                  for label in item.labels:
-                     by_label.add(label)
-                  by_label.add(':'.join(item.labels))
-               elif type(item)==EdgeRelationItem:
-                  for ids, labels in [(item.from_node,item.from_labels),(item.to_node,item.to_labels)]:
-                     if len(ids)>0:
-                        multi_key = ','.join([str(ids[key]) for key in sorted(ids.keys())])
-                        node = by_key.get(multi_key)
-                        if node is None:
-                           print('Undefined node with properties {}.'.format(str(ids)),file=sys.stderr)
-                     else:
-                        label_key = ':'.join(labels)
-                        if label_key not in by_label:
-                           print('Undefined node with labels {}.'.format(':'.join(labels)),file=sys.stderr)
+            from .validate import validate_graph
 
-         elif args.operation=='cypher':
-
-            if args.schema:
-               parser = SchemaParser()
-               schema = parser.parse(input)
+            schema = read_schema(args.schema,labels,keys)
+            report = validate_graph(
+               read_items(input,schema),
+               schema=schema,
+               source=source if type(source)==str else None,
+               max_pending=args.pending_limit
+            )
+            if args.report=='json':
+               print(json.dumps(report.to_dict()))
             else:
-               schema = None
+               for issue in report.issues:
+                  print(issue.message,file=sys.stderr)
+               omitted = sum(report.counts.values()) - len(report.issues)
+               if omitted>0:
+                  print('... {} more issues.'.format(omitted),file=sys.stderr)
+               print('{}: {} nodes, {} edges, {} issues in {:.3f}s ({:.0f} items/s)'.format(
+                  report.source or '-',report.nodes,report.edges,sum(report.counts.values()),report.elapsed,report.throughput
+               ))
+
+         elif args.operation=='cypher':
+            from .cypher import graph_to_cypher
 
-            if not schema and labels:
-               schema = generate_schema(labels,keys)
+            schema = read_schema(args.schema,labels,keys)
 
-            for query in graph_to_cypher(
-               read_graph(input,schema=schema,format=args.format,infer=args.infer,default_key=default_key),
+            queries = graph_to_cypher(
+               indexed(changed(read_items(input,schema,coalescing=True),source),schema,constraints=False),
+               merge=not args.create,
                exact=args.exact,
-               use_parameters=args.use_parameters
-            ):
+               use_parameters=args.use_parameters,
+               batch_size=args.batch_size
+            )
+            if stats is not None:
+               queries = stats.timed(queries,'generate')
+            for query in queries:
+               if query is None:
+                  continue
                parameters = None
                if args.use_parameters:
                   query, parameters = query
+               if stats is not None:
+                  stats.query_size(len(query))
                print(query,end=';\n')
                if parameters:
                   print(parameters)
+            if manifest is not None:
+               manifest.commit()
 
          elif args.operation=='load':
+            from .loader import GraphLoader, LoadError, LoadCounters, load_requests, load_graph, connect
 
-            if args.schema:
-               parser = SchemaParser()
-               schema = parser.parse(input)
-            else:
-               schema = None
-
-            if not schema and labels:
-               schema = generate_schema(labels,keys)
-
-            password = args.password if args.password else os.environ.get('DBPASSWORD')
-            username = args.username if args.username else os.environ.get('DBUSER')
-            match args.database:
-               case 'falkordb':
-                  try:
-                     import falkordb
-                  except ModuleNotFoundError:
-                     print('redis module was not installed. Install with: pip install pypropgraph[falkordb]',file=sys.stderr)
-                     sys.exit(1)
-                  db = falkordb.FalkorDB(host=args.host,port=args.port,username=username,password=password)
-                  graph = db.select_graph(args.graph)
-                  def run_query(q: str, params: dict[str,Any] | None = None):
-                     return graph.query(q,params)
-               case 'redis':
-                  try:
-                     import redis
-                  except ModuleNotFoundError:
-                     print('redis module was not installed. Install with: pip install pypropgraph[redis]',file=sys.stderr)
-                     sys.exit(1)
-                  db = redis.Redis(host=args.host,port=args.port,username=username,password=password)
-                  # Note: a hack for backwards compatibility since RedisGraph is no longer a product
-                  def run_query(q: str, params: dict[str,Any] | None = None):
-                     if params:
-                        params_header = "CYPHER "
-                        for key, value in params.items():
-                              params_header += str(key) + "=" + stringify_param_value(value) + " "
-                        q = params_header + q
-                     return db.execute_command('GRAPH.QUERY',args.graph,q)
-
-            item_count = 0
-
-            for item in read_graph(input,format=args.format,schema=schema,infer=args.infer,default_key=default_key):
-               item_count += 1
-               query = cypher_for_item(item,exact=args.exact,use_parameters=args.use_parameters)
-               parameters = None
-               if args.use_parameters:
-                  query, parameters = query
-               if query is None:
-                  continue
+            schema = read_schema(args.schema,labels,keys)
+
+            asynchronous = args.concurrency>1
+            try:
+               connection = connect(args.database,host=args.host,port=args.port,username=username,password=password,asynchronous=asynchronous)
+            except ModuleNotFoundError:
+               print('{database} module was not installed. Install with: pip install pypropgraph[{database}]'.format(database=args.database),file=sys.stderr)
+               sys.exit(1)
+
+            def show(request: LoadRequest):
                if args.show_query:
-                  print(query)
+                  print(request.query)
                   print(';')
                   if args.use_parameters:
-                     print(parameters)
+                     print(request.parameters)
                if args.show_property is not None:
-                  value = item.properties.get(args.show_property)
-                  if value is not None:
-                     print('({}) {}'.format(str(item_count),value),end='\r' if args.single_line else '\n')
+                  for item_count, item in enumerate(request.items,start=request.start):
+                     if not hasattr(item,'properties'):
+                        continue
+                     value = item.properties.get(args.show_property)
+                     if value is not None:
+                        print('({}) {}'.format(str(item_count),value),end='\r' if args.single_line else '\n')
+
+            skip = 0
+            on_commit = None
+            if checkpoint is not None:
+               if type(source)==str:
+                  filenames = source
+               else:
+                  from .csvgraph import expand_sources
+                  filenames = expand_sources(args.files)
                try:
-                  run_query(query,parameters)
-               except Exception as err:
-                  print(f'Failed query:\n{query}',file=sys.stderr)
+                  position = checkpoint.track(filenames,resume=args.resume)
+               except ValueError as err:
                   print(err,file=sys.stderr)
                   sys.exit(1)
+               if position.complete:
+                  print('{} was already loaded.'.format(source if type(source)==str else ', '.join(filenames)),file=sys.stderr)
+                  continue
+               skip = position.committed
+               on_commit = position.commit
+
+            if dead_letter is not None:
+               dead_letter.source = source if type(source)==str else None
+            counters = LoadCounters()
+            items = indexed(changed(read_items(input,schema,coalescing=True),source),schema,constraints=args.constraints)
+            try:
+               if asynchronous:
+                  async def run_load():
+                     try:
+                        await load_graph(
+                           items,
+                           connection,
+                           graph=args.graph,
+                           concurrency=args.concurrency,
+                           merge=not args.create,
+                           exact=args.exact,
+                           use_parameters=args.use_parameters,
+                           batch_size=args.batch_size,
+                           on_request=show,
+                           on_commit=on_commit,
+                           skip=skip,
+                           retry=retry,
+                           dead_letter=dead_letter,
+                           counters=counters,
+                           stats=stats
+                        )
+                     finally:
+                        await connection.aclose()
+                  import asyncio
+                  asyncio.run(run_load())
+               else:
+                  loader = GraphLoader(connection,args.graph,pipeline=args.pipeline,on_commit=on_commit,retry=retry,dead_letter=dead_letter,stats=stats)
+                  counters = loader.counters
+                  requests = load_requests(items,merge=not args.create,exact=args.exact,use_parameters=args.use_parameters,batch_size=args.batch_size,skip=skip)
+                  if stats is not None:
+                     requests = stats.timed(requests,'generate')
+                  with loader:
+                     for request in requests:
+                        show(request)
+                        loader.submit(request)
+            except LoadError as err:
+               print(f'Failed query ({err.request.describe()}):\n{err.request.query}',file=sys.stderr)
+               print(err.error,file=sys.stderr)
+               if checkpoint is not None:
+                  checkpoint.close()
+                  print('Committed through item {}, use --resume to continue.'.format(position.committed),file=sys.stderr)
+               sys.exit(1)
+            if checkpoint is not None:
+               position.finish()
+            if manifest is not None:
+               manifest.commit()
+               print('{} created, {} updated, {} unchanged, {} deleted'.format(manifest.created,manifest.updated,manifest.unchanged,manifest.deleted),file=sys.stderr)
+            if counters.retries>0 or counters.rejected>0:
+               print('{} retries, {} rejected items'.format(counters.retries,counters.rejected),file=sys.stderr)
+
+         elif args.operation=='bulk-export':
+            from .bulkexport import bulk_export, bulk_arguments
+
+            schema = read_schema(args.schema,labels,keys)
+            try:
+               exporter = bulk_export(read_items(input,schema,coalescing=True),args.output or args.graph)
+            except ValueError as err:
+               print(err,file=sys.stderr)
+               sys.exit(1)
+            print('falkordb-bulk-insert ' + ' '.join(bulk_arguments(args.graph,exporter.files)))
+            print('{} nodes, {} edges, {} duplicate nodes, {} edges with missing nodes'.format(exporter.nodes,exporter.edges,exporter.duplicates,exporter.missing),file=sys.stderr)
+
+         elif args.operation=='snapshot':
+            from .snapshot import write_snapshot
+
+            schema = read_schema(args.schema,labels,keys)
+            writer = write_snapshot(read_items(input,schema,coalescing=True),args.output or '{}.snapshot'.format(args.graph))
+            print('{}: {} nodes, {} edges'.format(writer.path,writer.nodes,writer.edges),file=sys.stderr)
+
+         elif args.operation=='ndjson':
+            from .ndjson import write_ndjson
+
+            schema = read_schema(args.schema,labels,keys)
+            items = read_items(input,schema,coalescing=True)
+            if args.output:
+               with open(args.output,'w',encoding='utf-8') as output:
+                  write_ndjson(items,output)
+            else:
+               write_ndjson(items,sys.stdout)
 
          elif args.operation=='schema.check' or args.operation=='schema.doc':
+            from .schema import SchemaParser
             parser = SchemaParser()
             schema = parser.parse(input)
 
             if args.operation=='schema.doc':
                schema.documentation(sys.stdout)
 
+   if stats is not None:
+      stats.finish()
+   if checkpoint is not None:
+      checkpoint.close()
+   if dead_letter is not None:
+      dead_letter.close()
+   if manifest is not None:
+      manifest.close()
+
 if __name__ == '__main__':
 
    main()
@@ -0,0 +1,158 @@
+from io import StringIO
+from typing import Any, Iterable, Iterator, Callable
+
+from .cypher import NodeItem, EdgeRelationItem, cypher_literal, _get_property
+from .items import NodeBatch, EdgeBatch, NodeDeletion, EdgeDeletion, NodeRemoval, EdgeRemoval, IndexDefinition
+from .util import stringify_param_value
+
+def _labels_expr(labels) -> str:
+   return ':' + ':'.join(labels) if len(labels)>0 else ''
+
+def _value_literal(value) -> str:
+   match value:
+      case str():
+         return cypher_literal(value)
+      case bool():
+         return 'true' if value else 'false'
+      case dict():
+         return '{' + ', '.join(f'`{key}`: {_value_literal(item)}' for key, item in value.items()) + '}'
+      case list() | tuple():
+         return '[' + ', '.join(map(_value_literal,value)) + ']'
+      case _:
+         return stringify_param_value(value)
+
+def _properties(properties: dict[str,Any], exclude: Iterable[str] = ()) -> dict[str,Any]:
+   values = {}
+   for property, value in properties.items():
+      if property in exclude:
+         continue
+      if type(value)==dict:
+         property, value = _get_property(value)
+      values[property] = value
+   return values
+
+def _id_values(keys: tuple[str,...], properties: dict[str,Any]) -> dict[str,Any]:
+   values = {}
+   for key in keys:
+      value = properties.get(key)
+      if value is None:
+         raise ValueError('Node is missing id property {id_property}'.format(id_property=key))
+      values[key] = value
+   return values
+
+def item_shape(item: NodeItem | EdgeRelationItem) -> tuple | None:
+   # The shape is everything the batched query text depends on. Property
+   # names are carried by the row maps and so do not split batches.
+   match item:
+      case NodeItem():
+         return ('node',tuple(sorted(item.labels)),tuple(sorted(item.keys)))
+      case EdgeRelationItem():
+         return (
+            'edge',
+            tuple(sorted(item.labels)),
+            tuple(sorted(item.from_labels)),tuple(sorted(item.from_node.keys())),
+            tuple(sorted(item.to_labels)),tuple(sorted(item.to_node.keys())),
+            item.directed,
+            len(item.properties)>0
+         )
+      case NodeBatch() | EdgeBatch():
+         # a columnar batch is already a batch of its own
+         return ('columnar',id(item))
+      case NodeDeletion() | EdgeDeletion() | NodeRemoval() | EdgeRemoval() | IndexDefinition():
+         # deletions, property removals, and indexes are not batched
+         return ('single',id(item))
+   return None
+
+def batch_items(stream: Iterable[Any], batch_size: int = 1000, shape_of: Callable[[Any],tuple | None] = item_shape) -> Iterator[list[NodeItem | EdgeRelationItem]]:
+   batch = []
+   shape = None
+   for item in stream:
+      item_batch_shape = shape_of(item)
+      if item_batch_shape is None:
+         continue
+      if len(batch)>0 and (item_batch_shape!=shape or len(batch)>=batch_size):
+         yield batch
+         batch = []
+      shape = item_batch_shape
+      batch.append(item)
+   if len(batch)>0:
+      yield batch
+
+def _node_rows(nodes: list[NodeItem], keys: tuple[str,...], merge: bool, additive: bool) -> list[dict[str,Any]]:
+   rows = []
+   for node in nodes:
+      rows.append({
+         'keys': _id_values(keys,node.properties) if merge else {},
+         'properties': _properties(node.properties,exclude=keys if merge and additive else ())
+      })
+   return rows
+
+def _edge_rows(edges: list[EdgeRelationItem]) -> list[dict[str,Any]]:
+   rows = []
+   for edge in edges:
+      for id_properties in [edge.from_node,edge.to_node]:
+         for id_property, value in id_properties.items():
+            if value is None:
+               raise ValueError('Node does not have id property {property} value'.format(property=id_property))
+      rows.append({
+         'from': dict(edge.from_node),
+         'to': dict(edge.to_node),
+         'properties': _properties(edge.properties)
+      })
+   return rows
+
+def node_batch_query(labels: tuple[str,...], keys: tuple[str,...], rows: str, merge: bool = True, additive: bool = True) -> str:
+   q = StringIO()
+   q.write('UNWIND {rows} AS row\n'.format(rows=rows))
+   if merge:
+      q.write('MERGE (n{labels}'.format(labels=_labels_expr(labels)))
+      if len(keys)>0:
+         q.write(' {' + ', '.join(f'`{key}`: row.`keys`.`{key}`' for key in keys) + '}')
+      q.write(')')
+   else:
+      q.write('CREATE (n{labels})'.format(labels=_labels_expr(labels)))
+   q.write('\n SET n {op} row.`properties`\n'.format(op='+=' if additive else '='))
+   return q.getvalue()
+
+def edge_batch_query(labels: tuple[str,...], from_labels: tuple[str,...], from_keys: tuple[str,...], to_labels: tuple[str,...], to_keys: tuple[str,...], directed: bool, has_properties: bool, rows: str, additive: bool = True) -> str:
+   q = StringIO()
+   q.write('UNWIND {rows} AS row\n'.format(rows=rows))
+   for label, node_labels, keys in [('from',from_labels,from_keys),('to',to_labels,to_keys)]:
+      q.write('MERGE ({label}{labels}'.format(label=label,labels=_labels_expr(node_labels)))
+      q.write(' {' + ', '.join(f'`{key}`: row.`{label}`.`{key}`' for key in keys) + '})\n')
+   q.write('MERGE (from)-[r{labels}]-{directed}(to)'.format(labels=_labels_expr(labels),directed='>' if directed else ''))
+   if has_properties:
+      q.write('\n SET r {op} row.`properties`\n'.format(op='+=' if additive else '='))
+   return q.getvalue()
+
+def cypher_for_batch(items: list[NodeItem | EdgeRelationItem], merge: bool = True, exact: bool = False, use_parameters: bool = False) -> str | tuple[str,dict[str,Any]]:
+   if len(items)==0:
+      raise ValueError('Cannot generate a query for an empty batch')
+   first = items[0]
+   if isinstance(first,(NodeBatch,EdgeBatch)):
+      from .columnar import cypher_for_columnar
+      return cypher_for_columnar(first,merge=merge,exact=exact,use_parameters=use_parameters)
+   if isinstance(first,(NodeDeletion,EdgeDeletion,NodeRemoval,EdgeRemoval,IndexDefinition)):
+      from .cypher import cypher_for_item
+      return cypher_for_item(first,merge=merge,exact=exact,use_parameters=use_parameters)
+   additive = not exact and not use_parameters
+   match first:
+      case NodeItem():
+         keys = tuple(sorted(first.keys))
+         rows = _node_rows(items,keys,merge,additive)
+         query = node_batch_query(tuple(sorted(first.labels)),keys,'$rows' if use_parameters else _value_literal(rows),merge=merge,additive=additive)
+      case EdgeRelationItem():
+         rows = _edge_rows(items)
+         query = edge_batch_query(
+            tuple(sorted(first.labels)),
+            tuple(sorted(first.from_labels)),tuple(sorted(first.from_node.keys())),
+            tuple(sorted(first.to_labels)),tuple(sorted(first.to_node.keys())),
+            first.directed,
+            len(first.properties)>0,
+            '$rows' if use_parameters else _value_literal(rows),
+            additive=additive
+         )
+      case _:
+         raise ValueError('Unsupported item type {}'.format(type(first).__name__))
+
+   return query if not use_parameters else (query,{'rows':rows})
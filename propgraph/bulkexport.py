@@ -0,0 +1,252 @@
+import csv
+import os
+import pickle
+import re
+import tempfile
+from collections import OrderedDict
+from typing import Any, BinaryIO, Iterable, Iterator
+
+from .items import NodeItem, EdgeRelationItem
+from .incremental import _properties, _canonical
+
+# The FalkorDB bulk loader (falkordb-bulk-insert) reads a CSV file per node
+# label set and per relationship type. The first column of a node file is the
+# node identifier (not stored as a property since its name starts with an
+# underscore) and the first two columns of a relationship file are the
+# identifiers of its source and destination nodes. The headers are typed
+# (e.g., `name:STRING`) and loaded with --enforce-schema as the loader would
+# otherwise infer the types from the text (e.g., the string '007' as an int).
+
+_UNSAFE = re.compile(r'[^A-Za-z0-9_.-]')
+
+def _filename(name: str) -> str:
+   return _UNSAFE.sub('_',name) + '.csv'
+
+def bulk_type(value: Any) -> str:
+   # the --enforce-schema type of a value
+   match value:
+      case bool():
+         return 'BOOLEAN'
+      case int():
+         return 'INT'
+      case float():
+         return 'DOUBLE'
+      case list():
+         return 'ARRAY'
+   return 'STRING'
+
+def _column_type(current: str | None, value_type: str) -> str:
+   # ints widen to doubles and any other mix of types is a string column
+   if current is None or current==value_type:
+      return value_type
+   if {current,value_type}=={'INT','DOUBLE'}:
+      return 'DOUBLE'
+   return 'STRING'
+
+def bulk_value(value: Any) -> str:
+   # arrays are python list literals as the loader evaluates them
+   if value is None:
+      return ''
+   if type(value)==bool:
+      return 'true' if value else 'false'
+   if type(value)==list:
+      return repr(value)
+   return str(value)
+
+class _Spill:
+   # The rows of one output file in a temporary file until the columns are
+   # known (the pickled values of the columns seen so far)
+
+   def __init__(self, path: str, name: str):
+      self.path = path
+      self.name = name
+      self.columns = {}
+      self.types = {}
+      self.rows = 0
+
+   def row(self, properties: dict[str,Any]) -> list[Any]:
+      values = [None] * len(self.columns)
+      for name, value in properties.items():
+         index = self.columns.get(name)
+         if index is None:
+            index = len(self.columns)
+            self.columns[name] = index
+            values.append(None)
+         values[index] = value
+         if value is not None:
+            self.types[name] = _column_type(self.types.get(name),bulk_type(value))
+      self.rows += 1
+      return values
+
+class BulkExporter:
+   # Writes the nodes and edges to the CSV files of the bulk loader. Nodes get
+   # dense integer ids by labels and keys and the edges are resolved to them
+   # when finished (missing endpoints are counted). The rows are spilled to
+   # temporary files until the columns of each file are known.
+
+   def __init__(self, directory: str, max_open_files: int = 64):
+      self.directory = directory
+      self.max_open_files = max_open_files
+      self.ids = {}
+      self.by_key = {}
+      self.nodes = 0
+      self.edges = 0
+      self.duplicates = 0
+      self.missing = 0
+      self.spill = tempfile.TemporaryDirectory(prefix='propgraph-',dir=directory)
+      self.node_files = {}
+      self.edge_files = {}
+      self.open_files = OrderedDict()
+      self.files = []
+      self.filenames = set()
+
+   def __enter__(self):
+      return self
+
+   def __exit__(self, exc_type, exc_value, traceback):
+      self.close()
+      return False
+
+   def _open(self, spill: _Spill) -> BinaryIO:
+      file = self.open_files.get(spill.path)
+      if file is not None:
+         self.open_files.move_to_end(spill.path)
+         return file
+      if len(self.open_files)>=self.max_open_files:
+         _, least_recent = self.open_files.popitem(last=False)
+         least_recent.close()
+      file = open(spill.path,'ab')
+      self.open_files[spill.path] = file
+      return file
+
+   def _spill(self, files: dict[Any,_Spill], kind: str, name: str, key: Any) -> _Spill:
+      spill = files.get(key)
+      if spill is None:
+         spill = _Spill(os.path.join(self.spill.name,'{}-{}'.format(kind,len(files))),name)
+         files[key] = spill
+      return spill
+
+   def _write(self, spill: _Spill, record: tuple):
+      pickle.dump(record,self._open(spill),protocol=pickle.HIGHEST_PROTOCOL)
+
+   def add_node(self, node: NodeItem):
+      if len(node.labels)==0:
+         raise ValueError('The bulk loader requires a label for every node: {}'.format(node.properties))
+      labels = frozenset(node.labels)
+      properties = _properties(node.properties)
+      key = _canonical(sorted((name,properties.get(name)) for name in node.keys)) if len(node.keys)>0 else None
+      id = self.nodes
+      if key is not None:
+         if (labels,key) in self.ids:
+            self.duplicates += 1
+            return
+         self.ids[(labels,key)] = id
+         # an endpoint without (or with fewer) labels is resolved by its key
+         # values alone unless they are ambiguous
+         self.by_key[key] = id if key not in self.by_key else None
+      self.nodes += 1
+      spill = self._spill(self.node_files,'nodes',':'.join(sorted(labels)),labels)
+      self._write(spill,(id,spill.row(properties)))
+
+   def add_edge(self, edge: EdgeRelationItem):
+      if len(edge.labels)!=1:
+         raise ValueError('The bulk loader requires a single relationship type: {}'.format(', '.join(sorted(edge.labels)) or 'none'))
+      endpoints = tuple(
+         (frozenset(labels),_canonical(sorted(node.items())))
+         for labels, node in [(edge.from_labels,edge.from_node),(edge.to_labels,edge.to_node)]
+      )
+      type_name = next(iter(edge.labels))
+      spill = self._spill(self.edge_files,'edges',type_name,type_name)
+      self._write(spill,(endpoints,spill.row(_properties(edge.properties))))
+
+   def add(self, item: Any):
+      match item:
+         case NodeItem():
+            self.add_node(item)
+         case EdgeRelationItem():
+            self.add_edge(item)
+
+   def _resolve(self, endpoint: tuple) -> int | None:
+      id = self.ids.get(endpoint)
+      if id is None:
+         id = self.by_key.get(endpoint[1])
+      return id
+
+   def _records(self, spill: _Spill) -> Iterator[tuple]:
+      file = self.open_files.pop(spill.path,None)
+      if file is not None:
+         file.close()
+      if not os.path.exists(spill.path):
+         return
+      with open(spill.path,'rb') as input:
+         while True:
+            try:
+               yield pickle.load(input)
+            except EOFError:
+               break
+      os.unlink(spill.path)
+
+   def _output(self, kind: str, spill: _Spill, header: list[str], rows: Iterable[tuple[list[int],list[Any]]]) -> str:
+      # each row is its identifiers and the values of the columns seen before it
+      filename = _filename(spill.name)
+      # distinct names may be the same once made safe for a file name
+      suffix = 1
+      while (kind,filename) in self.filenames:
+         suffix += 1
+         filename = _filename('{}-{}'.format(spill.name,suffix))
+      self.filenames.add((kind,filename))
+      path = os.path.join(self.directory,kind,filename)
+      os.makedirs(os.path.dirname(path),exist_ok=True)
+      width = len(spill.columns)
+      with open(path,'w',newline='',encoding='utf-8') as output:
+         writer = csv.writer(output,lineterminator='\n')
+         writer.writerow(header + ['{}:{}'.format(name,spill.types.get(name,'STRING')) for name in spill.columns.keys()])
+         for ids, values in rows:
+            writer.writerow(ids + [bulk_value(value) for value in values] + [''] * (width - len(values)))
+      return path
+
+   def finish(self) -> list[tuple[str,str,str]]:
+      # writes the CSV files and returns the (kind, name, path) of each
+      files = []
+      for spill in self.node_files.values():
+         rows = (([id],values) for id, values in self._records(spill))
+         files.append(('nodes',spill.name,self._output('nodes',spill,['_id:ID'],rows)))
+
+      def resolved(spill: _Spill):
+         for (source, target), values in self._records(spill):
+            source_id = self._resolve(source)
+            target_id = self._resolve(target)
+            if source_id is None or target_id is None:
+               self.missing += 1
+               continue
+            self.edges += 1
+            yield [source_id,target_id], values
+
+      for spill in self.edge_files.values():
+         files.append(('relations',spill.name,self._output('relations',spill,[':START_ID',':END_ID'],resolved(spill))))
+      self.node_files = {}
+      self.edge_files = {}
+      self.files.extend(files)
+      return files
+
+   def close(self):
+      for file in self.open_files.values():
+         file.close()
+      self.open_files.clear()
+      self.spill.cleanup()
+
+def bulk_arguments(graph: str, files: list[tuple[str,str,str]]) -> list[str]:
+   # the falkordb-bulk-insert arguments for the exported files
+   arguments = [graph,'--enforce-schema']
+   for kind, name, path in files:
+      arguments.extend(['--nodes-with-label' if kind=='nodes' else '--relations-with-type',name,path])
+   return arguments
+
+def bulk_export(stream: Iterable[Any], directory: str, max_open_files: int = 64) -> BulkExporter:
+   # returns the exporter with its counts and `files`
+   os.makedirs(directory,exist_ok=True)
+   with BulkExporter(directory,max_open_files=max_open_files) as exporter:
+      for item in stream:
+         exporter.add(item)
+      exporter.finish()
+   return exporter
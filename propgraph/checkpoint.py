@@ -0,0 +1,110 @@
+import hashlib
+import os
+import sqlite3
+import time
+from typing import Any
+
+_BLOCK = 1 << 20
+
+def source_fingerprint(filenames: list[str]) -> str:
+   # the hash of the whole content of the files (a resumed source must not
+   # have changed anywhere, not just at its ends)
+   digest = hashlib.sha256()
+   for filename in filenames:
+      digest.update('{}\0'.format(os.path.getsize(filename)).encode('utf-8'))
+      with open(filename,'rb') as input:
+         while block := input.read(_BLOCK):
+            digest.update(block)
+   return digest.hexdigest()
+
+def _filenames(source: str | list[str]) -> list[str]:
+   return [source] if type(source)==str else list(source)
+
+class SourceCheckpoint:
+   # The committed position of one source (or partition of a source): the
+   # number of the last item whose query completed along with every query
+   # before it.
+
+   def __init__(self, checkpoint: 'Checkpoint', source: str, part: str, fingerprint: str, committed: int = 0, complete: bool = False):
+      self.checkpoint = checkpoint
+      self.source = source
+      self.part = part
+      self.fingerprint = fingerprint
+      self.committed = committed
+      self.complete = complete
+
+   def commit(self, request: Any):
+      if request.end>self.committed:
+         self.committed = request.end
+         self.checkpoint.changed(self)
+
+   def finish(self):
+      self.complete = True
+      self.checkpoint.changed(self)
+      self.checkpoint.flush()
+
+class Checkpoint:
+   # Records the committed position of each source in a SQLite database
+   # (shared by the workers of a parallel load). Positions are written on each
+   # commit or, with an `interval`, at most every `interval` seconds (and on
+   # flush or close) at the risk of re-running the queries since the last write.
+
+   def __init__(self, path: str, interval: float = 0.0):
+      self.path = path
+      self.interval = interval
+      self.connection = sqlite3.connect(path,timeout=60)
+      self.connection.execute(
+         'CREATE TABLE IF NOT EXISTS checkpoint ('
+         'source TEXT NOT NULL, part TEXT NOT NULL, fingerprint TEXT NOT NULL, '
+         'items INTEGER NOT NULL, complete INTEGER NOT NULL, updated REAL NOT NULL, '
+         'PRIMARY KEY (source, part))'
+      )
+      self.connection.commit()
+      self.dirty = {}
+      self.flushed = time.monotonic()
+
+   def __enter__(self):
+      return self
+
+   def __exit__(self, exc_type, exc_value, traceback):
+      self.close()
+      return False
+
+   def track(self, source: str | list[str], part: str = '', resume: bool = False, fingerprint: str | None = None) -> SourceCheckpoint:
+      # the position of a source, starting over unless resuming (a ValueError if
+      # the content of a resumed source has changed); the fingerprint of the
+      # source can be given when it is already known (e.g., for each partition)
+      filenames = _filenames(source)
+      key = '\n'.join(os.path.abspath(filename) for filename in filenames)
+      current = fingerprint if fingerprint is not None else source_fingerprint(filenames)
+      if resume:
+         row = self.connection.execute('SELECT fingerprint, items, complete FROM checkpoint WHERE source=? AND part=?',(key,part)).fetchone()
+         if row is not None:
+            if row[0]!=current:
+               raise ValueError('{} has changed since it was checkpointed'.format(', '.join(filenames)))
+            return SourceCheckpoint(self,key,part,current,committed=row[1],complete=row[2]!=0)
+      position = SourceCheckpoint(self,key,part,current)
+      self.changed(position)
+      self.flush()
+      return position
+
+   def changed(self, position: SourceCheckpoint):
+      self.dirty[(position.source,position.part)] = position
+      if time.monotonic()-self.flushed>=self.interval:
+         self.flush()
+
+   def flush(self):
+      self.flushed = time.monotonic()
+      if len(self.dirty)==0:
+         return
+      now = time.time()
+      with self.connection:
+         self.connection.executemany(
+            'INSERT OR REPLACE INTO checkpoint (source, part, fingerprint, items, complete, updated) VALUES (?,?,?,?,?,?)',
+            [(position.source,position.part,position.fingerprint,position.committed,1 if position.complete else 0,now) for position in self.dirty.values()]
+         )
+      self.dirty = {}
+
+   def close(self):
+      self.flush()
+      self.connection.close()
@@ -0,0 +1,150 @@
+import os
+import pickle
+import tempfile
+import zlib
+from typing import Any, Callable, Iterable, Iterator
+
+from .cypher import _get_property
+from .items import NodeItem, EdgeRelationItem
+from .incremental import item_identity, _canonical
+
+def _last(name: str, current: Any, value: Any) -> Any:
+   return value
+
+def _first(name: str, current: Any, value: Any) -> Any:
+   return current
+
+def _error(name: str, current: Any, value: Any) -> Any:
+   if current!=value:
+      raise ValueError('Conflicting values for property {}: {} and {}'.format(name,repr(current),repr(value)))
+   return current
+
+def _union(name: str, current: Any, value: Any) -> Any:
+   values = list(current) if type(current)==list else [current]
+   for item in value if type(value)==list else [value]:
+      if item not in values:
+         values.append(item)
+   return values[0] if len(values)==1 else values
+
+POLICIES = {
+   'last': _last,
+   'first': _first,
+   'error': _error,
+   'union': _union,
+}
+
+def _properties(properties: dict[str,Any]) -> dict[str,Any]:
+   values = {}
+   for property, value in properties.items():
+      if type(value)==dict:
+         property, value = _get_property(value)
+      values[property] = value
+   return values
+
+class Coalescer:
+   # Merges the nodes with the same labels and keys (and the edges with the
+   # same labels, endpoints, and direction). Conflicting values are combined by
+   # the policy: 'last', 'first', 'error', 'union', or a
+   # function(name,current,new). Beyond `max_entities`, the items are spilled
+   # to `partitions` files by hash.
+
+   def __init__(self, policy: str | Callable[[str,Any,Any],Any] = 'last', max_entities: int | None = None, partitions: int = 64, directory: str | None = None):
+      if type(policy)==str:
+         if policy not in POLICIES:
+            raise ValueError('Unrecognized coalescing policy {}'.format(policy))
+         policy = POLICIES[policy]
+      self.policy = policy
+      self.max_entities = max_entities
+      self.partitions = partitions
+      self.directory = directory
+      self.nodes = {}
+      self.edges = {}
+      self.items = 0
+      self.merged = 0
+      self.spilled = False
+      self.spill = None
+      self.files = None
+
+   def _merge(self, entities: dict[str,Any], identity: str, item: NodeItem | EdgeRelationItem):
+      entity = entities.get(identity)
+      if entity is None:
+         item.properties = _properties(item.properties)
+         entities[identity] = item
+         return
+      self.merged += 1
+      properties = entity.properties
+      for name, value in _properties(item.properties).items():
+         current = properties.get(name)
+         properties[name] = value if current is None else self.policy(name,current,value)
+
+   def _spill(self, kind: int, identity: str, item: NodeItem | EdgeRelationItem):
+      partition = zlib.crc32(identity.encode('utf-8')) % self.partitions
+      pickle.dump((identity,item),self.files[kind][partition],protocol=pickle.HIGHEST_PROTOCOL)
+
+   def _start_spill(self):
+      self.spilled = True
+      self.spill = tempfile.TemporaryDirectory(prefix='propgraph-',dir=self.directory)
+      self.files = [
+         [open(os.path.join(self.spill.name,'{}-{}'.format(kind,partition)),'wb') for partition in range(self.partitions)]
+         for kind in ['nodes','edges']
+      ]
+      for kind, entities in enumerate([self.nodes,self.edges]):
+         for identity, item in entities.items():
+            self._spill(kind,identity,item)
+         entities.clear()
+
+   def add(self, item: NodeItem | EdgeRelationItem):
+      identity = item_identity(item)
+      if identity is None:
+         raise ValueError('Cannot coalesce item type {}'.format(type(item).__name__))
+      self.items += 1
+      kind = 0 if identity[0]=='node' else 1
+      identity = _canonical(identity)
+      if self.files is not None:
+         self._spill(kind,identity,item)
+         return
+      self._merge(self.nodes if kind==0 else self.edges,identity,item)
+      if self.max_entities is not None and len(self.nodes)+len(self.edges)>self.max_entities:
+         self._start_spill()
+
+   def _partition(self, path: str) -> Iterator[NodeItem | EdgeRelationItem]:
+      entities = {}
+      with open(path,'rb') as input:
+         while True:
+            try:
+               identity, item = pickle.load(input)
+            except EOFError:
+               break
+            self._merge(entities,identity,item)
+      os.unlink(path)
+      yield from entities.values()
+
+   def entities(self) -> Iterator[NodeItem | EdgeRelationItem]:
+      # the coalesced nodes and then the coalesced edges
+      if self.files is None:
+         nodes, edges = self.nodes, self.edges
+         self.nodes, self.edges = {}, {}
+         yield from nodes.values()
+         yield from edges.values()
+         return
+      try:
+         for files in self.files:
+            for file in files:
+               file.close()
+         for files in self.files:
+            for file in files:
+               yield from self._partition(file.name)
+      finally:
+         self.files = None
+         self.spill.cleanup()
+         self.spill = None
+
+def coalesce(stream: Iterable[Any], policy: str | Callable[[str,Any,Any],Any] = 'last', max_entities: int | None = None, partitions: int = 64, directory: str | None = None) -> Iterator[Any]:
+   # the nodes are yielded before the edges and other items (e.g., a schema)
+   coalescer = Coalescer(policy=policy,max_entities=max_entities,partitions=partitions,directory=directory)
+   for item in stream:
+      if isinstance(item,(NodeItem,EdgeRelationItem)):
+         coalescer.add(item)
+      else:
+         yield item
+   yield from coalescer.entities()
@@ -0,0 +1,192 @@
+from typing import Any, Iterable, Iterator
+
+from .cypher import read_graph, _get_property
+from .items import NodeItem, EdgeRelationItem, NodeBatch, EdgeBatch, NodeIndex
+from .batch import item_shape, node_batch_query, edge_batch_query, _value_literal
+
+try:
+   import numpy
+except ModuleNotFoundError:
+   numpy = None
+
+def _ids(values: list[int]):
+   return numpy.array(values,dtype=numpy.int64) if numpy is not None else values
+
+def column(values: list[Any]):
+   # numeric and boolean columns without missing values become typed arrays
+   # and everything else is kept as an object array (or a list without numpy).
+   # Mixed int and float columns are kept as objects as float64 would turn the
+   # ints into floats (and lose the precision of those beyond 2**53).
+   if numpy is None:
+      return values
+   if len(values)>0:
+      if all(type(value)==bool for value in values):
+         return numpy.array(values,dtype=numpy.bool_)
+      if all(type(value)==int for value in values):
+         try:
+            return numpy.array(values,dtype=numpy.int64)
+         except OverflowError:
+            pass
+      elif all(type(value)==float for value in values):
+         return numpy.array(values,dtype=numpy.float64)
+   array = numpy.empty(len(values),dtype=object)
+   array[:] = values
+   return array
+
+def _values(column_values) -> list[Any]:
+   return column_values.tolist() if numpy is not None else column_values
+
+def _columns(rows: list[dict[str,Any]]) -> dict[str,Any]:
+   names = {}
+   for row in rows:
+      for name in row.keys():
+         names[name] = None
+   return {name: column([row.get(name) for row in rows]) for name in names}
+
+def _properties(properties: dict[str,Any]) -> dict[str,Any]:
+   values = {}
+   for property, value in properties.items():
+      if type(value)==dict:
+         property, value = _get_property(value)
+      values[property] = value
+   return values
+
+class _Buffer:
+
+   def __init__(self, item: NodeItem | EdgeRelationItem):
+      self.item = item
+      self.ids = []
+      self.targets = []
+      self.rows = []
+
+class ColumnarBuilder:
+   # Accumulates items into columnar batches per shape (label set and keys).
+   # Pending node batches are always emitted before any edge batch so that
+   # consumers see the nodes before the edges that refer to them.
+
+   def __init__(self, batch_size: int = 10000):
+      if batch_size<1:
+         raise ValueError('The batch size must be at least 1: {}'.format(batch_size))
+      self.batch_size = batch_size
+      self.nodes = NodeIndex()
+      self.node_buffers = {}
+      self.edge_buffers = {}
+
+   def _node_batch(self, buffer: _Buffer) -> NodeBatch:
+      return NodeBatch(frozenset(buffer.item.labels),tuple(sorted(buffer.item.keys)),_ids(buffer.ids),_columns(buffer.rows))
+
+   def _edge_batch(self, buffer: _Buffer) -> EdgeBatch:
+      item = buffer.item
+      return EdgeBatch(
+         frozenset(item.labels),
+         frozenset(item.from_labels),tuple(sorted(item.from_node.keys())),
+         frozenset(item.to_labels),tuple(sorted(item.to_node.keys())),
+         item.directed,
+         _ids(buffer.ids),_ids(buffer.targets),
+         _columns(buffer.rows),
+         self.nodes
+      )
+
+   def flush_nodes(self) -> Iterator[NodeBatch]:
+      buffers = self.node_buffers
+      self.node_buffers = {}
+      for buffer in buffers.values():
+         yield self._node_batch(buffer)
+
+   def flush(self) -> Iterator[NodeBatch | EdgeBatch]:
+      yield from self.flush_nodes()
+      buffers = self.edge_buffers
+      self.edge_buffers = {}
+      for buffer in buffers.values():
+         yield self._edge_batch(buffer)
+
+   def add(self, item: Any) -> Iterator[NodeBatch | EdgeBatch]:
+      shape = item_shape(item)
+      if shape is None:
+         return
+      match item:
+         case NodeItem():
+            buffer = self.node_buffers.get(shape)
+            if buffer is None:
+               buffer = _Buffer(item)
+               self.node_buffers[shape] = buffer
+            keys = {name: item.properties.get(name) for name in item.keys}
+            buffer.ids.append(self.nodes.id_of(item.labels,keys))
+            buffer.rows.append(_properties(item.properties))
+            if len(buffer.ids)>=self.batch_size:
+               del self.node_buffers[shape]
+               yield self._node_batch(buffer)
+         case EdgeRelationItem():
+            if len(self.node_buffers)>0:
+               yield from self.flush_nodes()
+            buffer = self.edge_buffers.get(shape)
+            if buffer is None:
+               buffer = _Buffer(item)
+               self.edge_buffers[shape] = buffer
+            buffer.ids.append(self.nodes.id_of(item.from_labels,item.from_node))
+            buffer.targets.append(self.nodes.id_of(item.to_labels,item.to_node))
+            buffer.rows.append(_properties(item.properties))
+            if len(buffer.ids)>=self.batch_size:
+               del self.edge_buffers[shape]
+               yield self._edge_batch(buffer)
+
+def columnar_batches(stream: Iterable[Any], batch_size: int = 10000) -> Iterator[NodeBatch | EdgeBatch]:
+   builder = ColumnarBuilder(batch_size=batch_size)
+   for item in stream:
+      yield from builder.add(item)
+   yield from builder.flush()
+
+def read_graph_batches(source, batch_size: int = 10000, **options) -> Iterator[NodeBatch | EdgeBatch]:
+   yield from columnar_batches(read_graph(source,**options),batch_size=batch_size)
+
+def _rows(columns: dict[str,Any], size: int) -> list[dict[str,Any]]:
+   # one conversion per column and the rows are assembled without the missing values
+   rows = [{} for _ in range(size)]
+   for name, values in columns.items():
+      for row, value in zip(rows,_values(values)):
+         if value is not None:
+            row[name] = value
+   return rows
+
+def batch_rows(batch: NodeBatch | EdgeBatch, merge: bool = True, additive: bool = True) -> list[dict[str,Any]]:
+   match batch:
+      case NodeBatch():
+         properties = _rows(batch.columns,len(batch))
+         if not merge:
+            return [{'keys':{},'properties':row} for row in properties]
+         keys = _rows({name: batch.columns[name] for name in batch.keys},len(batch))
+         for key in keys:
+            missing = [name for name in batch.keys if name not in key]
+            if len(missing)>0:
+               raise ValueError('Node is missing id property {id_property}'.format(id_property=missing[0]))
+         if additive:
+            for row in properties:
+               for name in batch.keys:
+                  row.pop(name,None)
+         return [{'keys':key,'properties':row} for key, row in zip(keys,properties)]
+      case EdgeBatch():
+         properties = _rows(batch.columns,len(batch))
+         return [
+            {'from':batch.nodes.key(source),'to':batch.nodes.key(target),'properties':row}
+            for source, target, row in zip(_values(batch.source),_values(batch.target),properties)
+         ]
+   raise ValueError('Unsupported batch type {}'.format(type(batch).__name__))
+
+def cypher_for_columnar(batch: NodeBatch | EdgeBatch, merge: bool = True, exact: bool = False, use_parameters: bool = False) -> str | tuple[str,dict[str,Any]]:
+   additive = not exact and not use_parameters
+   rows = batch_rows(batch,merge=merge,additive=additive)
+   rows_expr = '$rows' if use_parameters else _value_literal(rows)
+   match batch:
+      case NodeBatch():
+         query = node_batch_query(tuple(sorted(batch.labels)),batch.keys,rows_expr,merge=merge,additive=additive)
+      case EdgeBatch():
+         query = edge_batch_query(
+            tuple(sorted(batch.labels)),
+            tuple(sorted(batch.from_labels)),batch.from_keys,
+            tuple(sorted(batch.to_labels)),batch.to_keys,
+            batch.directed,
+            len(batch.columns)>0,
+            rows_expr,
+            additive=additive
+         )
+   return query if not use_parameters else (query,{'rows':rows})
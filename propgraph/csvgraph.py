@@ -0,0 +1,248 @@
+import csv
+import glob
+import re
+from datetime import date, datetime
+from itertools import islice
+from typing import Any, Callable, Iterable, Iterator, TextIO
+
+from .cypher import _KeyResolver
+from .items import NodeItem, EdgeRelationItem, NodeKey
+from .schema import Schema
+
+# The column header is name:Type or name:Type[] (Neptune bulk load format)
+# where the type name is case insensitive and defaults to String
+
+def _bool(value: str) -> bool:
+   lower = value.lower()
+   if lower=='true':
+      return True
+   if lower=='false':
+      return False
+   raise ValueError('Invalid boolean value {}'.format(repr(value)))
+
+def _date(value: str) -> str:
+   # Dates are checked and normalized to ISO 8601 but kept as strings as they
+   # are written as cypher string literals or query parameters
+   if len(value)==10:
+      return date.fromisoformat(value).isoformat()
+   return datetime.fromisoformat(value.replace('Z','+00:00') if value.endswith('Z') else value).isoformat()
+
+TYPES = {
+   'bool': _bool,
+   'boolean': _bool,
+   'byte': int,
+   'short': int,
+   'int': int,
+   'integer': int,
+   'long': int,
+   'float': float,
+   'double': float,
+   'string': None,
+   'date': _date,
+   'datetime': _date,
+}
+
+_ARRAY_SEPARATOR = re.compile(r'(?<!\\);')
+
+def _split_array(value: str) -> list[str]:
+   if '\\' not in value:
+      return value.split(';')
+   return [item.replace('\\;',';') for item in _ARRAY_SEPARATOR.split(value)]
+
+def converter(type_name: str | None) -> Callable[[str],Any] | None:
+   # the conversion of a column type (None for strings)
+   if type_name is None:
+      return None
+   array = type_name.endswith('[]')
+   if array:
+      type_name = type_name[:-2]
+   try:
+      convert = TYPES[type_name.lower()]
+   except KeyError:
+      raise ValueError('Unsupported column type {}'.format(type_name)) from None
+   if not array:
+      return convert
+   if convert is None:
+      return _split_array
+   return lambda value: [convert(item) for item in _split_array(value)]
+
+class CSVColumn:
+   __slots__ = ('index','name','type_name','convert')
+
+   def __init__(self, index: int, name: str, type_name: str | None):
+      self.index = index
+      self.name = name
+      self.type_name = type_name
+      self.convert = converter(type_name)
+
+class CSVHeader:
+   # The columns of a file are compiled once from its header: the system
+   # columns (~id, ~label, ~from, ~to) by position and a converter per property
+
+   def __init__(self, fieldnames: list[str]):
+      self.fieldnames = fieldnames
+      self.width = len(fieldnames)
+      self.system = {}
+      self.columns = []
+      for index, field in enumerate(fieldnames):
+         if field.startswith('~'):
+            self.system[field] = index
+            continue
+         name, _, type_name = field.partition(':')
+         self.columns.append(CSVColumn(index,name,type_name if type_name else None))
+      self.untyped = [column for column in self.columns if column.type_name is None]
+      self.kind = 'edge' if '~from' in self.system else 'node'
+      if self.kind=='edge' and '~to' not in self.system:
+         raise ValueError('An edge file requires both ~from and ~to columns')
+
+class CSVGraphReader:
+   # Reads Neptune CSV node and edge files. Nodes are keyed by the schema keys
+   # or by ~id (as the id property) and untyped columns use the schema
+   # datatypes. Rows are converted in chunks of chunk_size rows.
+
+   def __init__(self, schema: Schema | None = None, kind: str | None = None, chunk_size: int = 10000):
+      if chunk_size<1:
+         raise ValueError('The chunk size must be at least 1: {}'.format(chunk_size))
+      self.schema = schema
+      self.kind = kind
+      self.chunk_size = chunk_size
+      self.keys_for = _KeyResolver(schema,infer=True,default_key='id')
+      self.schema_types = {}
+      self.endpoints = {}
+
+   def _types(self, labels: frozenset[str]) -> dict[str,Callable[[str],Any]]:
+      types = self.schema_types.get(labels)
+      if types is None:
+         types = {}
+         found = self.schema.find(*labels) if self.schema is not None and len(labels)>0 else []
+         if len(found)>0:
+            for name, datatype, _ in found[0].properties.values():
+               convert = TYPES.get(datatype.lower()) if datatype is not None else None
+               if convert is not None:
+                  types[name] = convert
+         self.schema_types[labels] = types
+      return types
+
+   def _labels(self, value: str | None) -> frozenset[str]:
+      return self.keys_for.intern(_split_array(value) if value else ())
+
+   def _add_endpoint(self, id: str, labels: frozenset[str], keys: frozenset[str], properties: dict[str,Any]):
+      # the labels and schema key values of a node referenced by its ~id
+      self.endpoints[id] = (labels,NodeKey(tuple((name,properties.get(name)) for name in sorted(keys))))
+
+   def _endpoint(self, id: str) -> tuple[frozenset[str],NodeKey]:
+      # a single key object per referenced node id; a node that was not read
+      # (e.g., an edge file read alone) is matched by its id property
+      endpoint = self.endpoints.get(id)
+      if endpoint is None:
+         endpoint = (self.keys_for.intern(()),NodeKey((('id',id),)))
+         self.endpoints[id] = endpoint
+      return endpoint
+
+   def _convert_rows(self, header: CSVHeader, rows: list[list[str]]) -> list[dict[str,Any]]:
+      result = []
+      columns = header.columns
+      for row in rows:
+         properties = {}
+         for column in columns:
+            value = row[column.index]
+            if value!='':
+               properties[column.name] = value if column.convert is None else column.convert(value)
+         result.append(properties)
+      return result
+
+   def _apply_schema_types(self, header: CSVHeader, labels: frozenset[str], properties: dict[str,Any]):
+      types = self._types(labels)
+      if len(types)==0:
+         return
+      for column in header.untyped:
+         convert = types.get(column.name)
+         value = properties.get(column.name)
+         if convert is not None and value is not None:
+            properties[column.name] = convert(value)
+
+   def _items(self, header: CSVHeader, rows: list[list[str]], kind: str) -> Iterator[NodeItem | EdgeRelationItem]:
+      for row in rows:
+         if len(row)<header.width:
+            row.extend([''] * (header.width - len(row)))
+      converted = self._convert_rows(header,rows)
+      system = header.system
+      id_index = system.get('~id')
+      label_index = system.get('~label')
+      schema_typed = self.schema is not None and len(header.untyped)>0
+      if kind=='node':
+         for row, properties in zip(rows,converted):
+            labels = self._labels(row[label_index] if label_index is not None else None)
+            if schema_typed:
+               self._apply_schema_types(header,labels,properties)
+            keys = self.keys_for(labels)
+            if id_index is not None and row[id_index]!='':
+               properties = {'id': row[id_index], **properties}
+               self._add_endpoint(row[id_index],labels,keys,properties)
+            yield NodeItem(labels,keys,properties)
+      else:
+         from_index = system['~from']
+         to_index = system['~to']
+         for row, properties in zip(rows,converted):
+            labels = self._labels(row[label_index] if label_index is not None else None)
+            if id_index is not None and row[id_index]!='':
+               properties = {'id': row[id_index], **properties}
+            from_labels, from_node = self._endpoint(row[from_index])
+            to_labels, to_node = self._endpoint(row[to_index])
+            yield EdgeRelationItem(labels,from_labels,from_node,to_labels,to_node,True,properties)
+
+   def read(self, source: TextIO, header: list[str] | None = None) -> Iterator[NodeItem | EdgeRelationItem]:
+      # the items of a single CSV stream
+      reader = csv.reader(source,delimiter=',',quotechar='"')
+      if header is None:
+         header = next(reader,None)
+         if header is None:
+            return
+      header = CSVHeader(header)
+      kind = self.kind if self.kind is not None else header.kind
+      if kind=='edge' and header.kind!='edge':
+         raise ValueError('An edge file requires both ~from and ~to columns')
+      while True:
+         rows = list(islice(reader,self.chunk_size))
+         if len(rows)==0:
+            break
+         yield from self._items(header,rows,kind)
+
+def expand_sources(sources: Iterable[str]) -> list[str]:
+   # the glob patterns are expanded in sorted order
+   files = []
+   for source in sources:
+      if glob.has_magic(source):
+         matches = sorted(glob.glob(source,recursive=True))
+         if len(matches)==0:
+            raise FileNotFoundError('No files match {}'.format(source))
+         files.extend(matches)
+      else:
+         files.append(source)
+   return files
+
+def _header(filename: str, encoding: str) -> list[str] | None:
+   with open(filename,'r',newline='',encoding=encoding) as input:
+      return next(csv.reader(input),None)
+
+def read_csv_files(sources: Iterable[str], schema: Schema | None = None, kind: str | None = None, chunk_size: int = 10000, encoding: str = 'utf-8-sig') -> Iterator[NodeItem | EdgeRelationItem]:
+   # all the node files are read before the edge files (those with ~from)
+   node_files = []
+   edge_files = []
+   for filename in expand_sources(sources):
+      header = _header(filename,encoding)
+      if header is None:
+         continue
+      file_kind = kind if kind is not None else CSVHeader(header).kind
+      (node_files if file_kind=='node' else edge_files).append(filename)
+
+   reader = CSVGraphReader(schema=schema,kind=kind,chunk_size=chunk_size)
+   for filename in node_files + edge_files:
+      with open(filename,'r',newline='',encoding=encoding) as input:
+         yield from reader.read(input)
+
+def read_csv(source: TextIO | list[str], location: str = None, schema: Schema | None = None, kind: str | None = None, chunk_size: int = 10000) -> Iterator[NodeItem | EdgeRelationItem]:
+   if isinstance(source,(list,tuple)):
+      yield from read_csv_files(source,schema=schema,kind=kind,chunk_size=chunk_size)
+   else:
+      yield from CSVGraphReader(schema=schema,kind=kind,chunk_size=chunk_size).read(source)
@@ -1,30 +1,14 @@
-import yaml
-import csv
 from io import StringIO
 import os
 from typing import TextIO, Any
 
 from .schema import SchemaParser, Schema
-from .util import stringify_param_value
-
-from typing import Generator, Iterator
-from dataclasses import dataclass
-
-@dataclass
-class NodeItem:
-   labels: set
-   keys: set
-   properties: dict
-
-@dataclass
-class EdgeRelationItem:
-   labels: set
-   from_labels: set
-   from_node: dict
-   to_labels: set
-   to_node: dict
-   directed: bool
-   properties: dict
+from .util import stringify_param_value, yaml_loader
+
+from typing import Generator, Iterator, Callable
+
+from .items import NodeItem, EdgeRelationItem, NodeKey, Interner, NodeBatch, EdgeBatch, NodeDeletion, EdgeDeletion, NodeRemoval, EdgeRemoval, IndexDefinition
+from .templates import template_cache
 
 def cypher_literal(value):
    return "'" + value.replace('\\','\\\\').replace("'",r"\'") + "'"
@@ -41,12 +25,28 @@ def _label_set(spec,infer=False):
    return set(labels) if type(labels)==list else set([labels])
 
 def _get_id_properties(schema: Schema, labels : set[str], infer: bool = False, default_key: str = "@id"):
-   node_def = None
-   if schema is not None:
-      node_defs = schema.find(*labels)
-      node_def = node_defs[0] if len(node_defs)>0 else None
+   keys = schema.find_keys(*labels) if schema is not None else None
+
+   return keys if keys is not None else (set([default_key]) if infer else set())
+
+class _KeyResolver:
+   # Resolves the id properties once per label set for a whole graph and
+   # interns the label and key sets shared by the items
 
-   return node_def.keys if node_def is not None else (set([default_key]) if infer else set())
+   def __init__(self, schema: Schema, infer: bool = False, default_key: str = "@id"):
+      self.schema = schema
+      self.infer = infer
+      self.default_key = default_key
+      self.resolved = {}
+      self.intern = Interner()
+
+   def __call__(self, labels: set[str]) -> frozenset[str]:
+      label_set = frozenset(labels)
+      keys = self.resolved.get(label_set)
+      if keys is None:
+         keys = self.intern(_get_id_properties(self.schema, labels, infer=self.infer, default_key=self.default_key))
+         self.resolved[label_set] = keys
+      return keys
 
 def _get_property(propdef):
    name = propdef.get('name')
@@ -69,23 +69,23 @@ def _node_edge_labels(node):
          yield name
 
 
-def _create_edge(source: TextIO, schema: Schema, from_id: str, to_id: str, directed: bool, edge_labels: set[str], edge : dict[str,Any], infer=False, default_key: str = "@id"):
-   from_node = source.get(from_id)
-   if from_node is None:
+def _node_identity(node: dict[str,Any], keys_for: _KeyResolver, infer: bool = False) -> tuple[frozenset[str],NodeKey]:
+   labels = keys_for.intern(_label_set(node,infer))
+   id_properties = keys_for(labels)
+   if id_properties is None or len(id_properties)==0:
+      id_properties = set(_node_properties(node))
+   return (labels,NodeKey(tuple(map(lambda name: (name,node.get(name)),id_properties))))
+
+def _create_edge(resolve: Callable[[str],tuple[frozenset[str],NodeKey] | None], from_id: str, to_id: str, directed: bool, edge_labels: set[str], edge : dict[str,Any]):
+   from_identity = resolve(from_id)
+   if from_identity is None:
       raise ValueError('Cannot find source node with id {}, edge {}'.format(from_id,':'.join(edge_labels)))
-   to_node = source.get(to_id)
-   if to_node is None:
+   to_identity = resolve(to_id)
+   if to_identity is None:
       raise ValueError('Cannot find target node with id {}, edge {}'.format(to_id,':'.join(edge_labels)))
-   from_to_id = []
-   for label, id, node in [('from',from_id,from_node),('to',to_id,to_node)]:
-      labels = _label_set(node,infer)
-      id_properties = _get_id_properties(schema, labels, infer=infer, default_key=default_key)
-      if id_properties is None or len(id_properties)==0:
-         id_properties = set(_node_properties(node))
-
-      from_to_id.append((labels,list(map(lambda name: (name,node.get(name)),id_properties))))
 
-   edge_item = EdgeRelationItem(edge_labels,from_to_id[0][0],dict(from_to_id[0][1]),from_to_id[1][0],dict(from_to_id[1][1]),directed,{})
+   # the endpoint labels and keys are shared with every other edge of the nodes
+   edge_item = EdgeRelationItem(edge_labels,from_identity[0],from_identity[1],to_identity[0],to_identity[1],directed,{})
    for key in edge.keys():
       if key[0]=='~':
          continue
@@ -95,6 +95,8 @@ def _create_edge(source: TextIO, schema: Schema, from_id: str, to_id: str, direc
    return edge_item
 
 def cypher_for_edge_relation(relation: EdgeRelationItem, merge=True, exact=False, use_parameters: bool = False) -> str | tuple[str,dict[str,Any]]:
+   if use_parameters:
+      return template_cache.query(relation, merge=merge)
    q = StringIO()
    for label, labels, id_properties in [('from',relation.from_labels,relation.from_node),('to',relation.to_labels,relation.to_node)]:
       q.write('MERGE ({label}{labels}'.format(label=label,labels=':' + ':'.join(labels) if len(labels)>0 else ''))
@@ -115,9 +117,7 @@ def cypher_for_edge_relation(relation: EdgeRelationItem, merge=True, exact=False
       directed_expr = ''
    q.write('MERGE (from)-[r{labels}]-{directed}(to)'.format(labels=':' + ':'.join(relation.labels) if len(relation.labels)>0 else '',directed=directed_expr))
    if relation.properties:
-      if use_parameters:
-         q.write('\n SET r = $properties\n')
-      elif exact:
+      if exact:
          q.write('\n SET r = {\n')
          first = True
          for property in relation.properties.keys():
@@ -130,21 +130,23 @@ def cypher_for_edge_relation(relation: EdgeRelationItem, merge=True, exact=False
             first = False
          q.write('\n }\n')
       else:
-         for condition in ['CREATE','MATCH'] if merge else ['CREATE']:
-            first = True
-            for key in relation.properties.keys():
-               if first:
-                  q.write(f'\n ON {condition}\n SET ')
-                  first = False
-               else:
-                  q.write(',\n     ')
-               value = relation.properties.get(key)
-               if type(value)==str:
-                  value = cypher_literal(value)
-               q.write('r.`{name}` = {value}'.format(name=key,value=value))
-   return q.getvalue() if not use_parameters else (q.getvalue(),{'properties':relation.properties} if relation.properties else None)
+         # the properties are set whether the relation was created or matched
+         first = True
+         for key in relation.properties.keys():
+            if first:
+               q.write('\n SET ')
+               first = False
+            else:
+               q.write(',\n     ')
+            value = relation.properties.get(key)
+            if type(value)==str:
+               value = cypher_literal(value)
+            q.write('r.`{name}` = {value}'.format(name=key,value=value))
+   return q.getvalue()
 
 def cypher_for_node(node: NodeItem, merge: bool = True, exact: bool = False, use_parameters: bool = False) -> str | tuple[str,dict[str,Any]]:
+   if use_parameters:
+      return template_cache.query(node, merge=merge)
 
    q = StringIO()
    if merge:
@@ -163,11 +165,9 @@ def cypher_for_node(node: NodeItem, merge: bool = True, exact: bool = False, use
          q.write('}')
       q.write(')')
    else:
-      q.write('CREATE (n:{labels})'.format(labels=':'+':'.join(node.labels) if len(node.labels)>0 else ''))
+      q.write('CREATE (n{labels})'.format(labels=':'+':'.join(node.labels) if len(node.labels)>0 else ''))
 
-   if use_parameters:
-      q.write('\n SET n = $properties\n')
-   elif exact:
+   if exact:
       q.write('\n SET n = {\n')
       first = True
       for property in node.properties.keys():
@@ -180,28 +180,28 @@ def cypher_for_node(node: NodeItem, merge: bool = True, exact: bool = False, use
          first = False
       q.write('\n }\n')
    else:
-      for condition in ['CREATE','MATCH'] if merge else ['CREATE']:
-         first = True
-         for property in node.properties.keys():
-            if merge and property in node.keys:
-               continue
-            value = node.properties[property]
-            if type(value)==dict:
-               property, value = _get_property(value)
-            # TODO: quote property name
-            if first:
-               if merge:
-                  q.write(f'\n ON {condition}\n')
-               q.write(' SET ')
-               first = False
-            else:
-               q.write(',\n     ')
-            q.write('n.`{property}` = '.format(property=property))
-            if type(value)==str:
-               q.write(cypher_literal(value))
-            else:
-               q.write(str(value))
-   return q.getvalue() if not use_parameters else (q.getvalue(),{'properties':node.properties})
+      # the properties are set whether the node was created or matched
+      first = True
+      for property in node.properties.keys():
+         if merge and property in node.keys:
+            continue
+         value = node.properties[property]
+         if type(value)==dict:
+            property, value = _get_property(value)
+         # TODO: quote property name
+         if first:
+            if merge:
+               q.write('\n')
+            q.write(' SET ')
+            first = False
+         else:
+            q.write(',\n     ')
+         q.write('n.`{property}` = '.format(property=property))
+         if type(value)==str:
+            q.write(cypher_literal(value))
+         else:
+            q.write(str(value))
+   return q.getvalue()
 
 def cypher_for_item(item, merge: bool = True, exact: bool= False, use_parameters: bool = False) -> str | tuple[str,dict[str,Any]]:
    match item:
@@ -209,64 +209,112 @@ def cypher_for_item(item, merge: bool = True, exact: bool= False, use_parameters
          return cypher_for_node(item, merge=merge, exact=exact, use_parameters=use_parameters)
       case EdgeRelationItem():
          return cypher_for_edge_relation(item, merge=merge, exact=exact, use_parameters=use_parameters)
-
-def graph_to_cypher(stream, merge: bool = True,exact: bool = False, use_parameters: bool = False):
+      case NodeBatch() | EdgeBatch():
+         from .columnar import cypher_for_columnar
+         return cypher_for_columnar(item, merge=merge, exact=exact, use_parameters=use_parameters)
+      case NodeDeletion() | EdgeDeletion():
+         from .incremental import cypher_for_deletion
+         return cypher_for_deletion(item, use_parameters=use_parameters)
+      case NodeRemoval() | EdgeRemoval():
+         from .incremental import cypher_for_removal
+         return cypher_for_removal(item, use_parameters=use_parameters)
+      case IndexDefinition():
+         from .indexes import cypher_for_index
+         return cypher_for_index(item) if not use_parameters else (cypher_for_index(item), None)
+
+def graph_to_cypher(stream, merge: bool = True,exact: bool = False, use_parameters: bool = False, batch_size: int | None = None):
+   if batch_size:
+      from .batch import batch_items, cypher_for_batch
+      if not (isinstance(stream, Generator) or isinstance(stream, Iterator)):
+         stream = [stream]
+      for batch in batch_items(stream, batch_size=batch_size):
+         yield cypher_for_batch(batch, merge=merge, exact=exact, use_parameters=use_parameters)
+      return
    if isinstance(stream, Generator) or isinstance(stream, Iterator):
       for item in stream:
          yield cypher_for_item(item, merge=merge, exact=exact, use_parameters=use_parameters)
    else:
       yield cypher_for_item(stream, merge=merge, exact=exact, use_parameters=use_parameters)
 
-def _read_property_defs(fieldnames):
-   property_defs = {}
-   for property in fieldnames:
-      if property[0]=='~':
-         continue
-      name, *typeinfo = property.split(':')
-      type_name = typeinfo[0] if len(typeinfo)>0 else 'String'
-      if type_name=='Int':
-         type_func = int
-      elif type_name=='Float':
-         type_func = float
-      else:
-         type_func = str
-      property_defs[property] = (name,type_func)
-   return property_defs
-
-def read_csv(source, location=None, schema=None, kind=None):
-   reader = csv.DictReader(source,delimiter=',',quotechar='"')
-   is_node = kind=='node'
-   keys = set(['id'])
-   property_defs = None
-   for row in reader:
-      if kind is None:
-         if '~from' in row:
-            is_node = False
-         else:
-            is_node = True
-      if property_defs is None:
-         property_defs = _read_property_defs(reader.fieldnames)
-      if is_node:
-         labels = set([row['~label']])
-         properties = { 'id' : row['~id']}
-         for property in property_defs:
-            property_def = property_defs[property]
-            properties[property_def[0]] = property_def[1](row[property])
-         yield NodeItem(labels,keys,properties)
-      else:
-         properties = { 'id' : row['~id']}
-         labels = set([row['~label']])
-         for property in property_defs:
-            property_def = property_defs[property]
-            properties[property_def[0]] = property_def[1](row[property])
-         yield EdgeRelationItem(labels,set(),{'id': row['~from']},set(),{'id': row['~to']},True,properties)
+def read_csv(source, location=None, schema=None, kind=None, chunk_size: int = 10000):
+   from .csvgraph import read_csv
+   yield from read_csv(source, location=location, schema=schema, kind=kind, chunk_size=chunk_size)
+
+def _read_schema(schema_source: str | dict[str,Any], location: str = None) -> Schema | None:
+   parser = SchemaParser()
+   if type(schema_source)==str:
+      return parser.parse(schema_source)
+   elif type(schema_source)==dict:
+      fileref = schema_source.get('source')
+      if fileref is not None:
+         if location is not None:
+            dir = os.path.dirname(os.path.abspath(location))
+            fileref = os.path.join(dir,fileref)
+         with open(fileref,'r') as input:
+            return parser.parse(input)
+   return None
+
+def _node_item(node: dict[str,Any], keys_for: _KeyResolver, infer: bool = False) -> NodeItem:
+   labels = keys_for.intern(_label_set(node,infer=infer))
+
+   keys = keys_for(labels)
+
+   properties = {}
 
+   for property in _node_properties(node):
+      value = node[property]
+      if type(value)==dict:
+         property, value = _get_property(value)
+      properties[property] = value
 
-def read_graph(source: TextIO, location: str = None, schema: Schema = None, format: str = 'yaml', kind: str = None, infer: bool = False, default_key: str = "@id"):
+   if keys is None or len(keys)==0:
+      keys = keys_for.intern(properties.keys())
+
+   return NodeItem(labels,keys,properties)
+
+def _node_edges(id: str, node: dict[str,Any]) -> Iterator[tuple[Any,str | None,str]]:
+   edges = node.get('~edges')
+   if edges is not None:
+      yield (edges,None,id)
+
+   for label in _node_edge_labels(node):
+      yield (node[label],label[1:],id)
+
+def _read_edges(graph_edges: list[tuple[Any,str | None,str | None]], resolve: Callable[[str],tuple[frozenset[str],NodeKey] | None], intern: Interner):
+   for edges, label, from_id in graph_edges:
+      for edge in (edges.values() if '~to' not in edges else [edges]) if type(edges)==dict else edges:
+      #for edge in edges.values() if type(edges)==dict else edges:
+         if type(edge)!=dict:
+            raise ValueError(f'Invalid edge specification {edge} for node {from_id}')
+         to_id = edge.get('~to')
+         if to_id is None:
+            raise ValueError('Missing target node (~to)')
+
+         directed = edge.get('~directed',True)
+
+         labels = _label_set(edge)
+         edge_from_id = from_id if from_id is not None else edge.get('~from')
+
+         if edge_from_id is None:
+            raise ValueError('Missing source node (~from)')
+
+         if label is not None:
+            labels.add(label)
+
+         yield _create_edge(resolve, edge_from_id, to_id, directed, intern(labels), edge)
+
+def read_graph(source: TextIO, location: str = None, schema: Schema = None, format: str = 'yaml', kind: str = None, infer: bool = False, default_key: str = "@id", stream: bool = False, loader: str = 'auto', chunk_size: int = 10000):
 
    if format == 'csv':
-      for item in read_csv(source, location=location, schema=schema,kind=kind):
-         yield item
+      yield from read_csv(source, location=location, schema=schema, kind=kind, chunk_size=chunk_size)
+      return
+   elif format == 'ndjson':
+      from .ndjson import read_ndjson
+      yield from read_ndjson(source, location=location, schema=schema, infer=infer, default_key=default_key)
+      return
+   elif format == 'snapshot':
+      from .snapshot import read_snapshot
+      yield from read_snapshot(source)
       return
    elif format != 'yaml':
       raise ValueError('Unrecognized format {}'.format(format))
@@ -275,26 +323,23 @@ def read_graph(source: TextIO, location: str = None, schema: Schema = None, form
       location = source[1]
       source = source[0]
 
+   if stream and type(source)!=dict:
+      from .stream import read_yaml_stream
+      yield from read_yaml_stream(source, location=location, schema=schema, infer=infer, default_key=default_key, loader=yaml_loader(loader))
+      return
+
    if type(source)!=dict:
-      source = yaml.load(source,Loader=yaml.Loader)
+      import yaml
+      source = yaml.load(source,Loader=yaml_loader(loader))
 
    if schema is None:
       schema_source = source.get('~schema')
       if schema_source is not None:
-         parser = SchemaParser()
-         if type(schema_source)==str:
-            schema = parser.parse(schema_source)
-         elif type(schema_source)==dict:
-            fileref = schema_source.get('source')
-            if fileref is not None:
-               if location is not None:
-                  dir = os.path.dirname(os.path.abspath(location))
-                  fileref = os.path.join(dir,fileref)
-               with open(fileref,'r') as input:
-                  schema = parser.parse(input)
+         schema = _read_schema(schema_source, location)
       if schema is not None:
          yield schema
 
+   keys_for = _KeyResolver(schema, infer=infer, default_key=default_key)
    graph_edges = []
    for id in source.keys():
       if id == '~edges':
@@ -307,51 +352,22 @@ def read_graph(source: TextIO, location: str = None, schema: Schema = None, form
 
       node = source[id]
 
-      edges = node.get('~edges')
-      if edges is not None:
-         graph_edges.append((edges,None,id))
-
-      for label in _node_edge_labels(node):
-         graph_edges.append((node[label],label[1:],id))
-
-      labels = _label_set(node,infer=infer)
+      graph_edges.extend(_node_edges(id, node))
 
-      keys = _get_id_properties(schema, labels, infer=infer, default_key=default_key)
+      yield _node_item(node, keys_for, infer=infer)
 
-      properties = {}
-
-      for property in _node_properties(node):
-         value = node[property]
-         if type(value)==dict:
-            property, value = _get_property(value)
-         properties[property] = value
-
-      if keys is None or len(keys)==0:
-         keys = set(properties.keys())
-
-      yield NodeItem(labels,keys,properties)
-
-   for edges, label, from_id in graph_edges:
-      for edge in (edges.values() if '~to' not in edges else [edges]) if type(edges)==dict else edges:
-      #for edge in edges.values() if type(edges)==dict else edges:
-         if type(edge)!=dict:
-            raise ValueError(f'Invalid edge specification {edge} for node {from_id}')
-         to_id = edge.get('~to')
-         if to_id is None:
-            raise ValueError('Missing target node (~to)')
-
-         directed = edge.get('~directed',True)
-
-         labels = _label_set(edge)
-         edge_from_id = from_id if from_id is not None else edge.get('~from')
-
-         if edge_from_id is None:
-            raise ValueError('Missing source node (~from)')
-
-         if label is not None:
-            labels.add(label)
+   identities = {}
+   def resolve(id):
+      identity = identities.get(id)
+      if identity is None:
+         node = source.get(id)
+         if node is None:
+            return None
+         identity = _node_identity(node, keys_for, infer=infer)
+         identities[id] = identity
+      return identity
 
-         yield _create_edge(source, schema, edge_from_id, to_id, directed, labels, edge, infer=infer, default_key=default_key)
+   yield from _read_edges(graph_edges, resolve, keys_for.intern)
 
 if __name__ == '__main__':
    import sys
@@ -0,0 +1,227 @@
+import hashlib
+import json
+import sqlite3
+from io import StringIO
+from typing import Any, Iterable, Iterator
+
+from .cypher import _get_property, cypher_literal
+from .items import NodeItem, EdgeRelationItem, NodeDeletion, EdgeDeletion, NodeRemoval, EdgeRemoval
+
+NODE = 0
+EDGE = 1
+
+def _canonical(value: Any) -> str:
+   return json.dumps(value,sort_keys=True,separators=(',',':'),ensure_ascii=False,default=str)
+
+def _digest(text: str) -> bytes:
+   return hashlib.blake2b(text.encode('utf-8'),digest_size=16).digest()
+
+def item_identity(item: NodeItem | EdgeRelationItem) -> list | None:
+   # the labels and key values of a node or the labels, endpoints, and
+   # direction of an edge (None for other items)
+   match item:
+      case NodeItem():
+         return ['node',sorted(item.labels),sorted((name,item.properties.get(name)) for name in item.keys)]
+      case EdgeRelationItem():
+         return [
+            'edge',
+            sorted(item.labels),
+            sorted(item.from_labels),sorted(item.from_node.items()),
+            sorted(item.to_labels),sorted(item.to_node.items()),
+            item.directed
+         ]
+   return None
+
+def _properties(properties: dict[str,Any]) -> dict[str,Any]:
+   values = {}
+   for property, value in properties.items():
+      if type(value)==dict:
+         property, value = _get_property(value)
+      values[property] = value
+   return values
+
+def content_hash(item: NodeItem | EdgeRelationItem, properties: dict[str,Any] | None = None) -> bytes:
+   keys = sorted(item.keys) if isinstance(item,NodeItem) else None
+   return _digest(_canonical([keys,_properties(item.properties) if properties is None else properties]))
+
+def deletion(kind: int, identity: list) -> NodeDeletion | EdgeDeletion:
+   if kind==NODE:
+      _, labels, key = identity
+      return NodeDeletion(frozenset(labels),dict(key))
+   _, labels, from_labels, from_node, to_labels, to_node, directed = identity
+   return EdgeDeletion(frozenset(labels),frozenset(from_labels),dict(from_node),frozenset(to_labels),dict(to_node),directed)
+
+def removal(kind: int, identity: list, properties: tuple[str,...]) -> NodeRemoval | EdgeRemoval:
+   if kind==NODE:
+      _, labels, key = identity
+      return NodeRemoval(frozenset(labels),dict(key),properties)
+   _, labels, from_labels, from_node, to_labels, to_node, directed = identity
+   return EdgeRemoval(frozenset(labels),frozenset(from_labels),dict(from_node),frozenset(to_labels),dict(to_node),directed,properties)
+
+class Manifest:
+   # The content hash and property names of every node and edge loaded, in
+   # SQLite. The changes of a diff are only kept once committed (e.g., after a
+   # successful load).
+
+   def __init__(self, path: str, chunk_size: int = 500):
+      self.path = path
+      self.chunk_size = chunk_size
+      self.connection = sqlite3.connect(path,isolation_level=None)
+      self.connection.execute(
+         'CREATE TABLE IF NOT EXISTS items ('
+         'scope TEXT NOT NULL, key BLOB NOT NULL, hash BLOB NOT NULL, kind INTEGER NOT NULL, '
+         'identity TEXT NOT NULL, run INTEGER NOT NULL, properties TEXT, PRIMARY KEY (scope, key))'
+      )
+      # manifests written before the property names were kept
+      if 'properties' not in [column[1] for column in self.connection.execute('PRAGMA table_info(items)')]:
+         self.connection.execute('ALTER TABLE items ADD COLUMN properties TEXT')
+      self.connection.execute('CREATE INDEX IF NOT EXISTS items_run ON items (scope, run)')
+      self.run = None
+      self.created = 0
+      self.updated = 0
+      self.unchanged = 0
+      self.deleted = 0
+
+   def __enter__(self):
+      return self
+
+   def __exit__(self, exc_type, exc_value, traceback):
+      self.close()
+      return False
+
+   def __len__(self) -> int:
+      return self.connection.execute('SELECT count(*) FROM items').fetchone()[0]
+
+   def begin(self):
+      # every diff is a new run (within the transaction until committed)
+      if not self.connection.in_transaction:
+         self.connection.execute('BEGIN')
+      self.run = self.connection.execute('SELECT coalesce(max(run),0)+1 FROM items').fetchone()[0]
+
+   def commit(self):
+      if self.connection.in_transaction:
+         self.connection.execute('COMMIT')
+      self.run = None
+
+   def rollback(self):
+      if self.connection.in_transaction:
+         self.connection.execute('ROLLBACK')
+      self.run = None
+
+   def close(self):
+      self.rollback()
+      self.connection.close()
+
+   def _diff_chunk(self, scope: str, chunk: list[tuple[Any,int,str,bytes,bytes,str]]) -> Iterator[Any]:
+      # an updated item is followed by the removal of the properties it no
+      # longer has (as it is merged additively)
+      keys = [key for _, _, _, key, _, _ in chunk if key is not None]
+      previous_items = {key: (hash,names) for key, hash, names in self.connection.execute(
+         'SELECT key, hash, properties FROM items WHERE scope=? AND key IN ({})'.format(','.join('?'*len(keys))),
+         [scope] + keys
+      ).fetchall()} if len(keys)>0 else {}
+      rows = []
+      for item, kind, identity, key, hash, names in chunk:
+         if key is None:
+            yield item
+            continue
+         previous, previous_names = previous_items.get(key,(None,None))
+         if previous is None:
+            self.created += 1
+            yield item
+         elif previous!=hash:
+            self.updated += 1
+            yield item
+            removed = tuple(sorted(set(json.loads(previous_names)) - set(json.loads(names)))) if previous_names is not None else ()
+            if len(removed)>0:
+               yield removal(kind,json.loads(identity),removed)
+         else:
+            self.unchanged += 1
+         previous_items[key] = (hash,names)
+         rows.append((scope,key,hash,kind,identity,self.run,names))
+      self.connection.executemany(
+         'INSERT INTO items (scope, key, hash, kind, identity, run, properties) VALUES (?,?,?,?,?,?,?) '
+         'ON CONFLICT (scope, key) DO UPDATE SET hash=excluded.hash, run=excluded.run, properties=excluded.properties',
+         rows
+      )
+
+   def deletions(self, scope: str = '') -> Iterator[NodeDeletion | EdgeDeletion]:
+      # the items of a scope (edges first) not seen in this run
+      for kind in [EDGE,NODE]:
+         cursor = self.connection.execute('SELECT identity FROM items WHERE scope=? AND run<? AND kind=?',(scope,self.run,kind))
+         for identity, in cursor.fetchall():
+            self.deleted += 1
+            yield deletion(kind,json.loads(identity))
+      self.connection.execute('DELETE FROM items WHERE scope=? AND run<?',(scope,self.run))
+
+   def diff(self, stream: Iterable[Any], deletes: bool = False, scope: str = '') -> Iterator[Any]:
+      # the new and changed items (and other stream objects) of the graph of a
+      # scope (e.g., the file name) and, with deletes, the deletions
+      self.begin()
+      chunk = []
+      for item in stream:
+         identity = item_identity(item)
+         if identity is None:
+            chunk.append((item,None,None,None,None,None))
+         else:
+            text = _canonical(identity)
+            properties = _properties(item.properties)
+            chunk.append((item,NODE if identity[0]=='node' else EDGE,text,_digest(text),content_hash(item,properties),_canonical(sorted(properties))))
+         if len(chunk)>=self.chunk_size:
+            yield from self._diff_chunk(scope,chunk)
+            chunk = []
+      if len(chunk)>0:
+         yield from self._diff_chunk(scope,chunk)
+      if deletes:
+         yield from self.deletions(scope)
+
+def _match(name: str, labels, key: dict[str,Any], parameters: dict[str,Any] | None, prefix: str) -> str:
+   properties = []
+   for index, (property, value) in enumerate(key.items()):
+      if parameters is not None:
+         parameter = '{}{}'.format(prefix,index)
+         parameters[parameter] = value
+         value = '$' + parameter
+      elif type(value)==str:
+         value = cypher_literal(value)
+      properties.append('`{}`: {}'.format(property,value))
+   return '({name}{labels}{properties})'.format(
+      name=name,
+      labels=':' + ':'.join(sorted(labels)) if len(labels)>0 else '',
+      properties=' {' + ', '.join(properties) + '}' if len(properties)>0 else ''
+   )
+
+def _match_edge(item: EdgeDeletion | EdgeRemoval, parameters: dict[str,Any] | None) -> str:
+   return '{source}-[r{labels}]-{directed}{target}'.format(
+      source=_match('from',item.from_labels,item.from_node,parameters,'from'),
+      labels=':' + ':'.join(sorted(item.labels)) if len(item.labels)>0 else '',
+      directed='>' if item.directed else '',
+      target=_match('to',item.to_labels,item.to_node,parameters,'to')
+   )
+
+def cypher_for_deletion(item: NodeDeletion | EdgeDeletion, use_parameters: bool = False) -> str | tuple[str,dict[str,Any]]:
+   parameters = {} if use_parameters else None
+   q = StringIO()
+   match item:
+      case NodeDeletion():
+         q.write('MATCH {node}\nDETACH DELETE n'.format(node=_match('n',item.labels,item.key,parameters,'k')))
+      case EdgeDeletion():
+         q.write('MATCH {edge}\nDELETE r'.format(edge=_match_edge(item,parameters)))
+      case _:
+         raise ValueError('Unsupported item type {}'.format(type(item).__name__))
+   return q.getvalue() if not use_parameters else (q.getvalue(),parameters)
+
+def cypher_for_removal(item: NodeRemoval | EdgeRemoval, use_parameters: bool = False) -> str | tuple[str,dict[str,Any]]:
+   parameters = {} if use_parameters else None
+   q = StringIO()
+   match item:
+      case NodeRemoval():
+         q.write('MATCH {node}\nREMOVE '.format(node=_match('n',item.labels,item.key,parameters,'k')))
+         name = 'n'
+      case EdgeRemoval():
+         q.write('MATCH {edge}\nREMOVE '.format(edge=_match_edge(item,parameters)))
+         name = 'r'
+      case _:
+         raise ValueError('Unsupported item type {}'.format(type(item).__name__))
+   q.write(', '.join('{}.`{}`'.format(name,property) for property in item.properties))
+   return q.getvalue() if not use_parameters else (q.getvalue(),parameters)
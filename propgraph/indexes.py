@@ -0,0 +1,95 @@
+import warnings
+from typing import Any, Iterable, Iterator
+
+from .items import NodeItem, EdgeRelationItem, NodeBatch, EdgeBatch, EdgeDeletion, EdgeRemoval, IndexDefinition
+from .schema import Schema
+
+def index_definitions(labels: Iterable[str], keys: Iterable[str], constraints: bool = False) -> list[IndexDefinition]:
+   # an index (and a unique constraint) on the keys of each label
+   properties = tuple(sorted(keys))
+   if len(properties)==0:
+      return []
+   definitions = []
+   for label in sorted(labels):
+      definitions.append(IndexDefinition(label,properties))
+      if constraints:
+         definitions.append(IndexDefinition(label,properties,unique=True))
+   return definitions
+
+def schema_index_definitions(schema: Schema, constraints: bool = False) -> list[IndexDefinition]:
+   definitions = []
+   for node in schema.nodes:
+      definitions.extend(index_definitions(node.labels,node.keys,constraints=constraints))
+   return definitions
+
+def _quote(name: str) -> str:
+   return '`' + name.replace('`','``') + '`'
+
+def cypher_for_index(definition: IndexDefinition) -> str:
+   return 'CREATE INDEX FOR (n:{label}) ON ({properties})'.format(
+      label=_quote(definition.label),
+      properties=', '.join('n.' + _quote(name) for name in definition.properties)
+   )
+
+def index_command(definition: IndexDefinition) -> tuple | None:
+   # Unique constraints are created with a command (the graph name is
+   # substituted for None) rather than a query
+   if not definition.unique:
+      return None
+   return ('GRAPH.CONSTRAINT','CREATE',None,'UNIQUE','NODE',definition.label,'PROPERTIES',str(len(definition.properties)),*definition.properties)
+
+def is_existing_index_error(error: Exception) -> bool:
+   message = str(error).lower()
+   return 'already indexed' in message or 'already exists' in message
+
+def with_indexes(stream: Iterable[Any], schema: Schema | None = None, deferred: bool = False, constraints: bool = False, default_keys: Iterable[str] | None = None) -> Iterator[Any]:
+   # Inserts an index for the node keys (from the schema and the nodes) before
+   # the first node it applies to or, when deferred, before the first edge.
+   # Nodes without schema keys or the default (inferred) keys are keyed by all
+   # their properties and are not indexed.
+   planned = set()
+   shapes = set()
+   pending = []
+   schemas = [schema] if schema is not None else []
+   default_keys = frozenset(default_keys) if default_keys is not None else None
+
+   def known_keys(labels, keys) -> bool:
+      return keys==default_keys or any(known.find_keys(*labels)==keys for known in schemas)
+
+   def plan(definitions: list[IndexDefinition]) -> Iterator[IndexDefinition]:
+      for definition in definitions:
+         if definition in planned:
+            continue
+         planned.add(definition)
+         if deferred:
+            pending.append(definition)
+         else:
+            yield definition
+
+   def plan_shape(labels, keys, properties) -> Iterator[IndexDefinition]:
+      shape = (labels,keys)
+      if shape in shapes:
+         return
+      shapes.add(shape)
+      if keys.issuperset(properties) and not known_keys(labels,keys):
+         warnings.warn('No index for the nodes labeled {} as they have no schema keys'.format(':'.join(sorted(labels)) or '(none)'))
+         return
+      yield from plan(index_definitions(labels,keys,constraints=constraints))
+
+   if schema is not None:
+      yield from plan(schema_index_definitions(schema,constraints=constraints))
+   for item in stream:
+      match item:
+         case Schema():
+            schemas.append(item)
+            yield from plan(schema_index_definitions(item,constraints=constraints))
+         case NodeItem():
+            yield from plan_shape(frozenset(item.labels),frozenset(item.keys),item.properties.keys())
+         case NodeBatch():
+            yield from plan_shape(item.labels,frozenset(item.keys),item.columns.keys())
+         case EdgeRelationItem() | EdgeBatch() | EdgeDeletion() | EdgeRemoval():
+            if len(pending)>0:
+               yield from pending
+               pending = []
+      yield item
+   yield from pending
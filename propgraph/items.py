@@ -0,0 +1,159 @@
+from collections.abc import Mapping
+from dataclasses import dataclass
+from typing import Any, Iterator
+
+class NodeKey(Mapping):
+   # An immutable mapping of a node's key properties to their values. A single
+   # instance is shared by every edge that references the node.
+
+   __slots__ = ('pairs',)
+
+   def __init__(self, pairs: tuple[tuple[str,Any],...] | Mapping = ()):
+      self.pairs = tuple(pairs.items()) if isinstance(pairs,Mapping) else tuple(pairs)
+
+   def __getitem__(self, name: str) -> Any:
+      for key, value in self.pairs:
+         if key==name:
+            return value
+      raise KeyError(name)
+
+   def __iter__(self) -> Iterator[str]:
+      return (key for key, _ in self.pairs)
+
+   def __len__(self) -> int:
+      return len(self.pairs)
+
+   def __hash__(self) -> int:
+      return hash(frozenset(self.pairs))
+
+   def __repr__(self) -> str:
+      return repr(dict(self.pairs))
+
+class Interner:
+   # Shares one frozenset instance between all the items with the same labels or keys
+
+   __slots__ = ('values',)
+
+   def __init__(self):
+      self.values = {}
+
+   def __call__(self, values) -> frozenset:
+      value = frozenset(values)
+      return self.values.setdefault(value,value)
+
+@dataclass(slots=True)
+class NodeItem:
+   labels: frozenset | set
+   keys: frozenset | set
+   properties: dict
+
+@dataclass(slots=True)
+class EdgeRelationItem:
+   labels: frozenset | set
+   from_labels: frozenset | set
+   from_node: Mapping
+   to_labels: frozenset | set
+   to_node: Mapping
+   directed: bool
+   properties: dict
+
+class NodeIndex:
+   # Dense integer ids for node identities (labels and key values) so edges
+   # can refer to their endpoints by id
+
+   __slots__ = ('ids','entries')
+
+   def __init__(self):
+      self.ids = {}
+      self.entries = []
+
+   def id_of(self, labels: frozenset, key: Mapping) -> int:
+      identity = (frozenset(labels),tuple(sorted(key.items())))
+      id = self.ids.get(identity)
+      if id is None:
+         id = len(self.entries)
+         self.ids[identity] = id
+         self.entries.append(identity)
+      return id
+
+   def key(self, id: int) -> dict[str,Any]:
+      return dict(self.entries[id][1])
+
+   def __len__(self) -> int:
+      return len(self.entries)
+
+@dataclass(slots=True,eq=False)
+class NodeBatch:
+   labels: frozenset
+   keys: tuple
+   ids: Any
+   columns: dict
+
+   def __len__(self) -> int:
+      return len(self.ids)
+
+   def slice(self, start: int, stop: int) -> 'NodeBatch':
+      return NodeBatch(self.labels,self.keys,self.ids[start:stop],{name: values[start:stop] for name, values in self.columns.items()})
+
+@dataclass(slots=True,eq=False)
+class EdgeBatch:
+   labels: frozenset
+   from_labels: frozenset
+   from_keys: tuple
+   to_labels: frozenset
+   to_keys: tuple
+   directed: bool
+   source: Any
+   target: Any
+   columns: dict
+   nodes: NodeIndex
+
+   def __len__(self) -> int:
+      return len(self.source)
+
+   def slice(self, start: int, stop: int) -> 'EdgeBatch':
+      return EdgeBatch(
+         self.labels,
+         self.from_labels,self.from_keys,
+         self.to_labels,self.to_keys,
+         self.directed,
+         self.source[start:stop],self.target[start:stop],
+         {name: values[start:stop] for name, values in self.columns.items()},
+         self.nodes
+      )
+
+@dataclass(slots=True)
+class NodeDeletion:
+   labels: frozenset
+   key: dict
+
+@dataclass(slots=True)
+class EdgeDeletion:
+   labels: frozenset
+   from_labels: frozenset
+   from_node: dict
+   to_labels: frozenset
+   to_node: dict
+   directed: bool
+
+@dataclass(slots=True)
+class NodeRemoval:
+   labels: frozenset
+   key: dict
+   properties: tuple
+
+@dataclass(slots=True)
+class EdgeRemoval:
+   labels: frozenset
+   from_labels: frozenset
+   from_node: dict
+   to_labels: frozenset
+   to_node: dict
+   directed: bool
+   properties: tuple
+
+@dataclass(slots=True,frozen=True)
+class IndexDefinition:
+   label: str
+   properties: tuple
+   unique: bool = False
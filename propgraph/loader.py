@@ -0,0 +1,425 @@
+import asyncio
+import json
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Any, Iterable, Iterator, Callable
+
+from .cypher import cypher_for_item
+from .items import NodeItem, EdgeRelationItem, NodeBatch, EdgeBatch, NodeDeletion, NodeRemoval, IndexDefinition
+from .batch import item_shape, batch_items, cypher_for_batch
+from .util import stringify_param_value, quote_name
+
+@dataclass
+class LoadRequest:
+   start: int
+   end: int
+   items: list
+   query: str
+   parameters: dict[str,Any] | None = None
+   options: dict[str,Any] = field(default_factory=dict)
+   command: tuple | None = None
+
+   def describe(self) -> str:
+      return 'item {}'.format(self.start) if self.start==self.end else 'items {}-{}'.format(self.start,self.end)
+
+class LoadError(Exception):
+
+   def __init__(self, request: LoadRequest, error: Exception):
+      super().__init__('Failed query for {}: {}'.format(request.describe(),error))
+      self.request = request
+      self.error = error
+
+def connect(database: str = 'falkordb', host: str = '0.0.0.0', port: int = 6379, username: str | None = None, password: str | None = None, asynchronous: bool = False):
+   # Returns the underlying redis connection as both databases accept GRAPH.QUERY commands
+   match database:
+      case 'falkordb':
+         if asynchronous:
+            import falkordb.asyncio as falkordb
+         else:
+            import falkordb
+         return falkordb.FalkorDB(host=host,port=port,username=username,password=password).connection
+      case 'redis':
+         # Note: RedisGraph is no longer a product but accepts the same GRAPH.QUERY commands
+         if asynchronous:
+            import redis.asyncio as redis
+         else:
+            import redis
+         return redis.Redis(host=host,port=port,username=username,password=password)
+      case _:
+         raise ValueError('Unrecognized database {}'.format(database))
+
+def parameterized_query(query: str, parameters: dict[str,Any] | None = None) -> str:
+   # Note: the parameters are sent as a CYPHER header as the clients do for GRAPH.QUERY
+   if not parameters:
+      return query
+   params_header = "CYPHER "
+   for key, value in parameters.items():
+      params_header += quote_name(key) + "=" + stringify_param_value(value) + " "
+   return params_header + query
+
+def _command_size(command: tuple) -> int:
+   return sum(len(argument) for argument in command if type(argument)==str)
+
+def graph_query_command(graph: str, request: LoadRequest) -> tuple:
+   if request.command is not None:
+      # a command other than a query (the graph name is substituted for None)
+      return tuple(graph if argument is None else argument for argument in request.command)
+   return ('GRAPH.QUERY',graph,parameterized_query(request.query,request.parameters),'--compact')
+
+# The names of the exception classes (including those of the redis and falkordb
+# clients, which are not imported here) for errors that may succeed on retry
+TRANSIENT_ERRORS = {'ConnectionError','TimeoutError','BusyLoadingError','TryAgainError'}
+
+def reply_error(reply: Any) -> Exception | None:
+   # FalkorDB reports runtime errors (e.g., constraint violations) as an error
+   # in the last element of the reply rather than as an error reply
+   if isinstance(reply,Exception):
+      return reply
+   if isinstance(reply,(list,tuple)) and len(reply)>0 and isinstance(reply[-1],Exception):
+      return reply[-1]
+   return None
+
+def is_transient(error: Exception) -> bool:
+   return any(cls.__name__ in TRANSIENT_ERRORS for cls in type(error).__mro__)
+
+@dataclass
+class RetryPolicy:
+   retries: int = 3
+   backoff: float = 0.1
+   max_backoff: float = 10.0
+   multiplier: float = 2.0
+   jitter: float = 0.1
+
+   def delay(self, attempt: int) -> float:
+      delay = min(self.max_backoff,self.backoff*self.multiplier**attempt)
+      return delay*(1+random.uniform(-self.jitter,self.jitter)) if self.jitter>0 else delay
+
+@dataclass
+class LoadCounters:
+   queries: int = 0
+   retries: int = 0
+   bisections: int = 0
+   rejected: int = 0
+
+def _record(item: Any) -> dict[str,Any]:
+   match item:
+      case NodeItem():
+         return {'labels':sorted(item.labels),'keys':sorted(item.keys),'properties':item.properties}
+      case EdgeRelationItem():
+         return {
+            'labels':sorted(item.labels),
+            'from_labels':sorted(item.from_labels),'from':dict(item.from_node),
+            'to_labels':sorted(item.to_labels),'to':dict(item.to_node),
+            'directed':item.directed,
+            'properties':item.properties
+         }
+   return {'item':repr(item)}
+
+class DeadLetterFile:
+   # Appends the rejected items as JSON lines with their item number, the
+   # error, and the query that failed. Each record is a single write so the
+   # worker processes of a parallel load can share the file.
+
+   def __init__(self, path: str, source: str | None = None):
+      self.path = path
+      self.source = source
+      self.output = open(path,'a')
+
+   def __enter__(self):
+      return self
+
+   def __exit__(self, exc_type, exc_value, traceback):
+      self.close()
+      return False
+
+   def __call__(self, request: LoadRequest, error: Exception):
+      records = [_record(item) for item in request.items]
+      self.output.write(json.dumps({
+         'source':self.source,
+         'start':request.start,
+         'end':request.end,
+         'error':str(error),
+         'query':request.query,
+         'parameters':request.parameters,
+         'items':records
+      },default=str) + '\n')
+      self.output.flush()
+
+   def close(self):
+      self.output.close()
+
+def split_request(request: LoadRequest) -> list[LoadRequest]:
+   # Splits a batch request into two halves (an empty list for a single item)
+   items = request.items
+   if len(items)==1:
+      item = items[0]
+      if not isinstance(item,(NodeBatch,EdgeBatch)) or len(item)<2:
+         return []
+      middle = len(item)//2
+      parts = [(request.start,[item.slice(0,middle)]),(request.start+middle,[item.slice(middle,len(item))])]
+   else:
+      middle = len(items)//2
+      parts = [(request.start,items[:middle]),(request.start+middle,items[middle:])]
+   requests = []
+   for start, part in parts:
+      query = cypher_for_batch(part,**request.options)
+      parameters = None
+      if request.options.get('use_parameters'):
+         query, parameters = query
+      requests.append(LoadRequest(start,start+sum(map(_item_count,part))-1,part,query,parameters,request.options))
+   return requests
+
+class _Recovery:
+   # Decides what to do with a failed request: transient errors are retried
+   # with exponential backoff and other errors bisect a batch until the
+   # failing items are isolated and either rejected to the dead letter handler
+   # or, without one, reported as the failure.
+
+   def __init__(self, retry: RetryPolicy | None, dead_letter: Callable[[LoadRequest,Exception],None] | None, counters: LoadCounters):
+      self.retry = retry
+      self.dead_letter = dead_letter
+      self.counters = counters
+
+   def step(self, request: LoadRequest, error: Exception, attempt: int) -> float | list[LoadRequest]:
+      # returns the delay before retrying the request or the requests to run instead
+      if isinstance(request.items[0],IndexDefinition):
+         from .indexes import is_existing_index_error
+         if is_existing_index_error(error):
+            return []
+      if is_transient(error):
+         if self.retry is not None and attempt<self.retry.retries:
+            self.counters.retries += 1
+            return self.retry.delay(attempt)
+         raise LoadError(request,error) from error
+      parts = split_request(request)
+      if len(parts)>0:
+         self.counters.bisections += 1
+         return parts
+      if self.dead_letter is None:
+         raise LoadError(request,error) from error
+      self.counters.rejected += request.end-request.start+1
+      self.dead_letter(request,error)
+      return []
+
+def _item_count(item: Any) -> int:
+   return len(item) if isinstance(item,(NodeBatch,EdgeBatch)) else 1
+
+def _command(item: Any) -> tuple | None:
+   if isinstance(item,IndexDefinition):
+      from .indexes import index_command
+      return index_command(item)
+   return None
+
+def _phase(item: Any) -> str:
+   # the requests of different phases are not run concurrently
+   if isinstance(item,(NodeItem,NodeBatch,NodeDeletion,NodeRemoval)):
+      return 'nodes'
+   if isinstance(item,IndexDefinition):
+      return 'indexes'
+   return 'edges'
+
+def load_requests(stream: Iterable[Any], merge: bool = True, exact: bool = False, use_parameters: bool = False, batch_size: int | None = None, skip: int = 0) -> Iterator[LoadRequest]:
+   # items are numbered by their position in the stream (as reported by
+   # --show-property) and a columnar batch counts for each of its rows. The
+   # first `skip` items (e.g., already committed) are numbered but not loaded.
+   def numbered():
+      number = 1
+      for item in stream:
+         count = _item_count(item)
+         if item_shape(item) is not None and number+count-1>skip:
+            yield (number,number+count-1,item)
+         number += count
+
+   options = {'merge':merge,'exact':exact,'use_parameters':use_parameters}
+   if batch_size:
+      for batch in batch_items(numbered(),batch_size=batch_size,shape_of=lambda entry: item_shape(entry[2])):
+         items = [item for _, _, item in batch]
+         query = cypher_for_batch(items,merge=merge,exact=exact,use_parameters=use_parameters)
+         parameters = None
+         if use_parameters:
+            query, parameters = query
+         yield LoadRequest(batch[0][0],batch[-1][1],items,query,parameters,options,_command(items[0]))
+   else:
+      for start, end, item in numbered():
+         query = cypher_for_item(item,merge=merge,exact=exact,use_parameters=use_parameters)
+         parameters = None
+         if use_parameters:
+            query, parameters = query
+         yield LoadRequest(start,end,[item],query,parameters,options,_command(item))
+
+class GraphLoader:
+   # Sends GRAPH.QUERY commands over a redis connection, keeping up to
+   # `pipeline` queries in flight per round trip. The optional on_commit
+   # callback receives each request, in order, once it has completed.
+   # Transient errors are retried according to the retry policy and failing
+   # batches are bisected to the failing item, which is rejected to the dead
+   # letter handler (if any) rather than stopping the load. The round trips are measured
+   # when given stats (see propgraph.stats).
+
+   def __init__(self, connection, graph: str, pipeline: int = 1, on_commit: Callable[[LoadRequest],None] | None = None, retry: RetryPolicy | None = None, dead_letter: Callable[[LoadRequest,Exception],None] | None = None, sleep: Callable[[float],None] = time.sleep, stats: Any = None):
+      if pipeline<1:
+         raise ValueError('The pipeline depth must be at least 1: {}'.format(pipeline))
+      self.connection = connection
+      self.graph = graph
+      self.pipeline = pipeline
+      self.on_commit = on_commit
+      self.sleep = sleep
+      self.pending = []
+      self.counters = LoadCounters()
+      self.recovery = _Recovery(retry,dead_letter,self.counters)
+      self.round_trips = 0
+      self.stats = stats
+
+   @property
+   def queries(self) -> int:
+      return self.counters.queries
+
+   def __enter__(self):
+      return self
+
+   def __exit__(self, exc_type, exc_value, traceback):
+      if exc_type is None:
+         self.flush()
+      else:
+         self.pending = []
+      return False
+
+   def submit(self, request: LoadRequest):
+      self.pending.append(request)
+      if len(self.pending)>=self.pipeline:
+         self.flush()
+
+   def _execute(self, request: LoadRequest) -> Exception | None:
+      self.round_trips += 1
+      command = graph_query_command(self.graph,request)
+      start = time.perf_counter()
+      try:
+         reply = self.connection.execute_command(*command)
+      except Exception as err:
+         return err
+      finally:
+         if self.stats is not None:
+            self.stats.round_trip([_command_size(command)],time.perf_counter()-start)
+      return reply_error(reply)
+
+   def _complete(self, request: LoadRequest, error: Exception | None):
+      attempt = 0
+      while error is not None:
+         step = self.recovery.step(request,error,attempt)
+         if type(step)==list:
+            for part in step:
+               self._complete(part,self._execute(part))
+            return
+         self.sleep(step)
+         attempt += 1
+         error = self._execute(request)
+      self.counters.queries += 1
+
+   def flush(self):
+      pending = self.pending
+      self.pending = []
+      if len(pending)==0:
+         return
+      if len(pending)==1:
+         results = [self._execute(pending[0])]
+      else:
+         self.round_trips += 1
+         pipe = self.connection.pipeline(transaction=False)
+         commands = [graph_query_command(self.graph,request) for request in pending]
+         for command in commands:
+            pipe.execute_command(*command)
+         start = time.perf_counter()
+         try:
+            results = pipe.execute(raise_on_error=False)
+         except Exception as err:
+            # the round trip failed as a whole (e.g., the connection was reset)
+            results = [err]*len(pending)
+         if self.stats is not None:
+            self.stats.round_trip([_command_size(command) for command in commands],time.perf_counter()-start)
+      for request, result in zip(pending,results):
+         self._complete(request,reply_error(result))
+         if self.on_commit is not None:
+            self.on_commit(request)
+
+async def load_graph(stream: Iterable[Any], client, graph: str = 'test', concurrency: int = 8, merge: bool = True, exact: bool = False, use_parameters: bool = False, batch_size: int | None = None, on_request: Callable[[LoadRequest],None] | None = None, on_commit: Callable[[LoadRequest],None] | None = None, skip: int = 0, retry: RetryPolicy | None = None, dead_letter: Callable[[LoadRequest,Exception],None] | None = None, counters: LoadCounters | None = None, stats: Any = None) -> int:
+   # Keeps up to `concurrency` queries in flight on an asyncio redis client. All
+   # the queries for nodes complete before any query for edges is sent (and vice
+   # versa) so that edges never race the nodes they reference. Queries complete
+   # out of order so on_commit only receives a request once every request
+   # before it has completed.
+   if concurrency<1:
+      raise ValueError('The concurrency must be at least 1: {}'.format(concurrency))
+
+   in_flight = {}
+   completed = {}
+   next_commit = 0
+
+   recovery = _Recovery(retry,dead_letter,counters if counters is not None else LoadCounters())
+
+   async def execute(request: LoadRequest) -> Exception | None:
+      command = graph_query_command(graph,request)
+      start = time.perf_counter()
+      try:
+         reply = await client.execute_command(*command)
+      except Exception as err:
+         return err
+      finally:
+         if stats is not None:
+            # the latencies of concurrent queries overlap
+            stats.round_trip([_command_size(command)],time.perf_counter()-start)
+      return reply_error(reply)
+
+   async def run(request: LoadRequest):
+      error = await execute(request)
+      attempt = 0
+      while error is not None:
+         step = recovery.step(request,error,attempt)
+         if type(step)==list:
+            for part in step:
+               await run(part)
+            return
+         await asyncio.sleep(step)
+         attempt += 1
+         error = await execute(request)
+      recovery.counters.queries += 1
+
+   def commit(sequence: int, request: LoadRequest):
+      nonlocal next_commit
+      completed[sequence] = request
+      while next_commit in completed:
+         committed = completed.pop(next_commit)
+         next_commit += 1
+         if on_commit is not None:
+            on_commit(committed)
+
+   async def drain(limit: int):
+      while len(in_flight)>limit:
+         done, _ = await asyncio.wait(in_flight.keys(),return_when=asyncio.FIRST_COMPLETED)
+         for task in done:
+            sequence, request = in_flight.pop(task)
+            task.result()
+            commit(sequence,request)
+
+   count = 0
+   kind = None
+   try:
+      requests = load_requests(stream,merge=merge,exact=exact,use_parameters=use_parameters,batch_size=batch_size,skip=skip)
+      if stats is not None:
+         requests = stats.timed(requests,'generate')
+      for request in requests:
+         request_kind = _phase(request.items[0])
+         if kind is not None and request_kind!=kind:
+            await drain(0)
+         kind = request_kind
+         if on_request is not None:
+            on_request(request)
+         await drain(concurrency-1)
+         in_flight[asyncio.ensure_future(run(request))] = (count,request)
+         count += 1
+      await drain(0)
+   except BaseException:
+      for task in in_flight:
+         task.cancel()
+      raise
+   return count
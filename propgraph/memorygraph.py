@@ -0,0 +1,626 @@
+import re
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Callable, Iterator
+
+# An in-memory graph that runs the subset of Cypher generated by this package:
+#
+#   [CYPHER name=value ...]
+#   UNWIND expression AS name
+#   MERGE (n:Label {key: expression, ...})
+#   MERGE (from)-[r:Label]->(to)
+#   CREATE (n:Label)
+#   MATCH (n:Label {key: expression})  or  MATCH (from ...)-[r:Label]->(to ...)
+#   SET n.`name` = expression, n = expression, n += expression
+#   DELETE r, DETACH DELETE n
+#   CREATE INDEX FOR (n:Label) ON (n.name, ...)
+#
+# where the expressions are literals (including Python reprs of lists as
+# written for non-string property values), lists, maps, parameters, and
+# property access. It is used by the stand-in server (see propgraph.standin)
+# to verify loads end to end; anything else is rejected with a QueryError.
+
+class QueryError(ValueError):
+   pass
+
+class Node:
+   __slots__ = ('id','labels','properties')
+
+   def __init__(self, id: int, labels: set[str], properties: dict[str,Any]):
+      self.id = id
+      self.labels = labels
+      self.properties = properties
+
+   def __repr__(self):
+      return 'Node({},{},{})'.format(self.id,sorted(self.labels),self.properties)
+
+class Relationship:
+   __slots__ = ('id','labels','source','target','properties')
+
+   def __init__(self, id: int, labels: frozenset[str], source: int, target: int, properties: dict[str,Any]):
+      self.id = id
+      self.labels = labels
+      self.source = source
+      self.target = target
+      self.properties = properties
+
+   def __repr__(self):
+      return 'Relationship({},{},{}->{},{})'.format(self.id,sorted(self.labels),self.source,self.target,self.properties)
+
+@dataclass
+class QueryStatistics:
+   nodes_created: int = 0
+   nodes_deleted: int = 0
+   relationships_created: int = 0
+   relationships_deleted: int = 0
+   properties_set: int = 0
+   indices_created: int = 0
+
+   def lines(self) -> list[str]:
+      # as reported by FalkorDB (only the counts that are not zero)
+      names = [
+         ('Nodes created',self.nodes_created),
+         ('Nodes deleted',self.nodes_deleted),
+         ('Relationships created',self.relationships_created),
+         ('Relationships deleted',self.relationships_deleted),
+         ('Properties set',self.properties_set),
+         ('Indices created',self.indices_created)
+      ]
+      return ['{}: {}'.format(name,count) for name, count in names if count>0]
+
+# Parsing
+
+_TOKEN = re.compile(r'''
+   (?P<space>\s+)
+ | (?P<string>'(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*")
+ | (?P<number>-?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)
+ | (?P<name>`(?:[^`]|``)*`|[A-Za-z_][A-Za-z_0-9]*)
+ | (?P<parameter>\$[A-Za-z_][A-Za-z_0-9]*)
+ | (?P<symbol>\+=|->|<-|[-()\[\]{}:,.=>])
+''',re.VERBOSE|re.DOTALL)
+
+_ESCAPES = {'n': '\n', 't': '\t', 'r': '\r', 'b': '\b', 'f': '\f', '0': '\0'}
+
+def _unescape(text: str) -> str:
+   return re.sub(r'\\(.)',lambda match: _ESCAPES.get(match.group(1),match.group(1)),text[1:-1],flags=re.DOTALL)
+
+def _tokens(query: str) -> list[tuple[str,Any]]:
+   tokens = []
+   position = 0
+   while position<len(query):
+      match = _TOKEN.match(query,position)
+      if match is None:
+         raise QueryError('Unexpected character {!r} at {}'.format(query[position],position))
+      position = match.end()
+      kind = match.lastgroup
+      text = match.group()
+      match kind:
+         case 'space':
+            continue
+         case 'string':
+            tokens.append(('value',_unescape(text)))
+         case 'number':
+            tokens.append(('value',float(text) if any(c in text for c in '.eE') else int(text)))
+         case 'name':
+            if text[0]=='`':
+               tokens.append(('quoted',text[1:-1].replace('``','`')))
+            else:
+               tokens.append(('name',text))
+         case _:
+            tokens.append((kind,text))
+   tokens.append(('end',None))
+   return tokens
+
+@dataclass
+class _NodePattern:
+   variable: str | None
+   labels: frozenset[str]
+   properties: list[tuple[str,Callable]]
+
+@dataclass
+class _RelationshipPattern:
+   source: _NodePattern
+   variable: str | None
+   labels: frozenset[str]
+   properties: list[tuple[str,Callable]]
+   direction: str
+   target: _NodePattern
+
+_CONSTANTS = {'TRUE': True, 'FALSE': False, 'NULL': None}
+
+def _property_of(value: Any, name: str) -> Any:
+   if isinstance(value,(Node,Relationship)):
+      return value.properties.get(name)
+   if type(value)==dict:
+      return value.get(name)
+   if value is None:
+      return None
+   raise QueryError('Cannot access property {} of {}'.format(name,type(value).__name__))
+
+class _Parser:
+
+   def __init__(self, query: str):
+      self.tokens = _tokens(query)
+      self.position = 0
+
+   def peek(self, offset: int = 0) -> tuple[str,Any]:
+      return self.tokens[min(self.position+offset,len(self.tokens)-1)]
+
+   def next(self) -> tuple[str,Any]:
+      token = self.tokens[self.position]
+      if token[0]!='end':
+         self.position += 1
+      return token
+
+   def keyword(self, *words: str) -> bool:
+      # consumes the keywords if they are next
+      for offset, word in enumerate(words):
+         kind, text = self.peek(offset)
+         if kind!='name' or text.upper()!=word:
+            return False
+      self.position += len(words)
+      return True
+
+   def expect(self, symbol: str):
+      kind, text = self.next()
+      if kind!='symbol' or text!=symbol:
+         raise QueryError('Expected {} but found {}'.format(symbol,text if kind!='end' else 'the end of the query'))
+
+   def accept(self, symbol: str) -> bool:
+      kind, text = self.peek()
+      if kind=='symbol' and text==symbol:
+         self.position += 1
+         return True
+      return False
+
+   def identifier(self) -> str:
+      kind, text = self.next()
+      if kind not in ['name','quoted']:
+         raise QueryError('Expected a name but found {}'.format(text if kind!='end' else 'the end of the query'))
+      return text
+
+   def expression(self) -> Callable[[dict[str,Any],dict[str,Any]],Any]:
+      kind, text = self.next()
+      match kind:
+         case 'value':
+            value = text
+            expression = lambda row, parameters: value
+         case 'parameter':
+            name = text[1:]
+            def expression(row, parameters):
+               if name not in parameters:
+                  raise QueryError('Missing parameter {}'.format(name))
+               return parameters[name]
+         case 'name' if text.upper() in _CONSTANTS:
+            value = _CONSTANTS[text.upper()]
+            expression = lambda row, parameters: value
+         case 'name' | 'quoted':
+            variable = text
+            def expression(row, parameters):
+               if variable not in row:
+                  raise QueryError('Undefined variable {}'.format(variable))
+               return row[variable]
+         case 'symbol' if text=='[':
+            items = []
+            if not self.accept(']'):
+               items.append(self.expression())
+               while self.accept(','):
+                  items.append(self.expression())
+               self.expect(']')
+            expression = lambda row, parameters: [item(row,parameters) for item in items]
+         case 'symbol' if text=='{':
+            entries = self.map_entries()
+            expression = lambda row, parameters: {name: value(row,parameters) for name, value in entries}
+         case _:
+            raise QueryError('Unexpected {}'.format(text if kind!='end' else 'end of the query'))
+      while self.accept('.'):
+         expression = (lambda base, name: lambda row, parameters: _property_of(base(row,parameters),name))(expression,self.identifier())
+      return expression
+
+   def map_entries(self) -> list[tuple[str,Callable]]:
+      # after the opening brace
+      entries = []
+      if not self.accept('}'):
+         while True:
+            name = self.identifier()
+            self.expect(':')
+            entries.append((name,self.expression()))
+            if not self.accept(','):
+               break
+         self.expect('}')
+      return entries
+
+   def node_pattern(self) -> _NodePattern:
+      self.expect('(')
+      variable = None
+      if self.peek()[0] in ['name','quoted']:
+         variable = self.identifier()
+      labels = []
+      while self.accept(':'):
+         labels.append(self.identifier())
+      properties = self.map_entries() if self.accept('{') else []
+      self.expect(')')
+      return _NodePattern(variable,frozenset(labels),properties)
+
+   def pattern(self) -> _NodePattern | _RelationshipPattern:
+      source = self.node_pattern()
+      incoming = self.accept('<-')
+      if not incoming and not self.accept('-'):
+         return source
+      self.expect('[')
+      variable = None
+      if self.peek()[0] in ['name','quoted']:
+         variable = self.identifier()
+      labels = []
+      while self.accept(':'):
+         labels.append(self.identifier())
+      properties = self.map_entries() if self.accept('{') else []
+      self.expect(']')
+      outgoing = self.accept('->')
+      if not outgoing:
+         self.expect('-')
+      if incoming and outgoing:
+         raise QueryError('A relationship cannot have both directions')
+      target = self.node_pattern()
+      return _RelationshipPattern(source,variable,frozenset(labels),properties,'>' if outgoing else '<' if incoming else '',target)
+
+   def header(self) -> list[tuple[str,Callable]]:
+      # the parameters of a CYPHER name=value ... header
+      parameters = []
+      if self.keyword('CYPHER'):
+         while self.peek()[0] in ['name','quoted'] and self.peek(1)==('symbol','='):
+            name = self.identifier()
+            self.expect('=')
+            parameters.append((name,self.expression()))
+      return parameters
+
+   def clauses(self) -> list[tuple]:
+      clauses = []
+      while self.peek()[0]!='end':
+         if self.keyword('UNWIND'):
+            expression = self.expression()
+            if not self.keyword('AS'):
+               raise QueryError('Expected AS after UNWIND')
+            clauses.append(('unwind',expression,self.identifier()))
+         elif self.keyword('CREATE','INDEX','FOR'):
+            node = self.node_pattern()
+            if not self.keyword('ON') or len(node.labels)!=1:
+               raise QueryError('Expected an index on the properties of a label')
+            self.expect('(')
+            properties = []
+            while True:
+               if self.identifier()!=node.variable:
+                  raise QueryError('Undefined variable in an index')
+               self.expect('.')
+               properties.append(self.identifier())
+               if not self.accept(','):
+                  break
+            self.expect(')')
+            clauses.append(('index',next(iter(node.labels)),tuple(properties)))
+         elif self.keyword('MERGE'):
+            clauses.append(('merge',self.pattern()))
+         elif self.keyword('CREATE'):
+            pattern = self.pattern()
+            if type(pattern)!=_NodePattern:
+               raise QueryError('Only nodes can be created with CREATE')
+            clauses.append(('create',pattern))
+         elif self.keyword('MATCH'):
+            clauses.append(('match',self.pattern()))
+         elif self.keyword('SET'):
+            assignments = []
+            while True:
+               variable = self.identifier()
+               name = self.identifier() if self.accept('.') else None
+               if name is None and self.accept('+='):
+                  operator = '+='
+               else:
+                  self.expect('=')
+                  operator = '='
+               assignments.append((variable,name,operator,self.expression()))
+               if not self.accept(','):
+                  break
+            clauses.append(('set',assignments))
+         elif self.keyword('DETACH','DELETE') or self.keyword('DELETE'):
+            detach = self.tokens[self.position-2][1].upper()=='DETACH'
+            variables = [self.identifier()]
+            while self.accept(','):
+               variables.append(self.identifier())
+            clauses.append(('delete',variables,detach))
+         else:
+            kind, text = self.peek()
+            raise QueryError('Unsupported clause {}'.format(text))
+      return clauses
+
+@lru_cache(maxsize=1024)
+def parse_query(query: str) -> tuple[list[tuple[str,Callable]],list[tuple]]:
+   # the header parameters and the clauses (cached as queries repeat)
+   parser = _Parser(query)
+   return (parser.header(),parser.clauses())
+
+# Execution
+
+def _hashable(value: Any) -> Any:
+   # a lookup key for a value (booleans are distinct from 0 and 1)
+   if type(value)==bool:
+      return (bool,value)
+   if isinstance(value,(list,tuple)):
+      return tuple(map(_hashable,value))
+   if type(value)==dict:
+      return tuple(sorted((name,_hashable(item)) for name, item in value.items()))
+   return value
+
+class MemoryGraph:
+   # A property graph held in memory that queries are run against
+
+   def __init__(self, name: str = 'test'):
+      self.name = name
+      self.nodes = {}
+      self.relationships = {}
+      self.between = {}
+      self.indexes = set()
+      self.constraints = set()
+      # lookups of the node ids by the values of the properties for a shape
+      # (labels, property names); built on first use and kept up to date
+      self.lookups = {}
+      self.next_id = 0
+
+   def _shape_key(self, shape: tuple[frozenset[str],tuple[str,...]], node: Node) -> tuple | None:
+      labels, names = shape
+      if not labels<=node.labels:
+         return None
+      properties = node.properties
+      key = []
+      for name in names:
+         if name not in properties:
+            return None
+         key.append(_hashable(properties[name]))
+      return tuple(key)
+
+   def _index(self, node: Node):
+      for shape, lookup in self.lookups.items():
+         key = self._shape_key(shape,node)
+         if key is not None:
+            lookup.setdefault(key,set()).add(node.id)
+
+   def _unindex(self, node: Node):
+      for shape, lookup in self.lookups.items():
+         key = self._shape_key(shape,node)
+         if key is not None:
+            ids = lookup.get(key)
+            if ids is not None:
+               ids.discard(node.id)
+               if len(ids)==0:
+                  del lookup[key]
+
+   def find_nodes(self, labels: frozenset[str] | set[str] = frozenset(), properties: dict[str,Any] | None = None) -> list[Node]:
+      properties = properties or {}
+      shape = (frozenset(labels),tuple(sorted(properties)))
+      lookup = self.lookups.get(shape)
+      if lookup is None:
+         lookup = {}
+         for node in self.nodes.values():
+            key = self._shape_key(shape,node)
+            if key is not None:
+               lookup.setdefault(key,set()).add(node.id)
+         self.lookups[shape] = lookup
+      ids = lookup.get(tuple(_hashable(properties[name]) for name in shape[1]),())
+      return [self.nodes[id] for id in sorted(ids)]
+
+   def node(self, *labels: str, **properties: Any) -> Node | None:
+      # None unless there is exactly one node
+      nodes = self.find_nodes(frozenset(labels),properties)
+      return nodes[0] if len(nodes)==1 else None
+
+   def find_relationships(self, source: Node, target: Node, labels: frozenset[str] = frozenset(), direction: str = '>') -> list[Relationship]:
+      # in either direction when the direction is ''
+      found = []
+      pairs = [(source.id,target.id)] if direction=='>' else [(target.id,source.id)] if direction=='<' else [(source.id,target.id),(target.id,source.id)]
+      if direction=='' and source.id==target.id:
+         pairs = pairs[:1]
+      for pair in pairs:
+         for id in self.between.get(pair,()):
+            relationship = self.relationships[id]
+            if labels<=relationship.labels:
+               found.append(relationship)
+      return found
+
+   def create_node(self, labels: set[str], properties: dict[str,Any], statistics: QueryStatistics | None = None) -> Node:
+      node = Node(self.next_id,set(labels),{name: value for name, value in properties.items() if value is not None})
+      self.next_id += 1
+      self.nodes[node.id] = node
+      self._index(node)
+      if statistics is not None:
+         statistics.nodes_created += 1
+         statistics.properties_set += len(node.properties)
+      return node
+
+   def create_relationship(self, labels: frozenset[str], source: Node, target: Node, properties: dict[str,Any], statistics: QueryStatistics | None = None) -> Relationship:
+      relationship = Relationship(self.next_id,labels,source.id,target.id,{name: value for name, value in properties.items() if value is not None})
+      self.next_id += 1
+      self.relationships[relationship.id] = relationship
+      self.between.setdefault((source.id,target.id),[]).append(relationship.id)
+      if statistics is not None:
+         statistics.relationships_created += 1
+         statistics.properties_set += len(relationship.properties)
+      return relationship
+
+   def delete_relationship(self, relationship: Relationship, statistics: QueryStatistics | None = None):
+      if self.relationships.pop(relationship.id,None) is None:
+         return
+      pair = (relationship.source,relationship.target)
+      ids = self.between[pair]
+      ids.remove(relationship.id)
+      if len(ids)==0:
+         del self.between[pair]
+      if statistics is not None:
+         statistics.relationships_deleted += 1
+
+   def delete_node(self, node: Node, detach: bool = False, statistics: QueryStatistics | None = None):
+      if node.id not in self.nodes:
+         return
+      attached = [relationship for relationship in self.relationships.values() if node.id in (relationship.source,relationship.target)]
+      if len(attached)>0 and not detach:
+         raise QueryError('Cannot delete a node with relationships without DETACH')
+      for relationship in attached:
+         self.delete_relationship(relationship,statistics)
+      self._unindex(node)
+      del self.nodes[node.id]
+      if statistics is not None:
+         statistics.nodes_deleted += 1
+
+   def set_properties(self, element: Node | Relationship, properties: dict[str,Any], replace: bool = False, statistics: QueryStatistics | None = None):
+      # a null value removes a property
+      is_node = type(element)==Node
+      if is_node:
+         self._unindex(element)
+      if replace:
+         element.properties = {}
+      for name, value in properties.items():
+         if value is None:
+            element.properties.pop(name,None)
+         else:
+            element.properties[name] = value
+         if statistics is not None:
+            statistics.properties_set += 1
+      if is_node:
+         self._index(element)
+
+   def create_index(self, label: str, properties: tuple[str,...], statistics: QueryStatistics | None = None):
+      for name in properties:
+         if (label,name) in self.indexes:
+            raise QueryError("Attribute '{}' is already indexed".format(name))
+      for name in properties:
+         self.indexes.add((label,name))
+      if statistics is not None:
+         statistics.indices_created += len(properties)
+
+   def create_constraint(self, label: str, properties: tuple[str,...]):
+      # recorded but not enforced
+      constraint = (label,tuple(properties))
+      if constraint in self.constraints:
+         raise QueryError('Constraint already exists')
+      self.constraints.add(constraint)
+
+   def query(self, query: str, parameters: dict[str,Any] | None = None) -> QueryStatistics:
+      # returns the statistics of the changes
+      header, clauses = parse_query(query)
+      values = {name: expression({},{}) for name, expression in header}
+      if parameters:
+         values.update(parameters)
+      statistics = QueryStatistics()
+      rows = [{}]
+      for clause in clauses:
+         rows = list(self._run(clause,rows,values,statistics))
+      return statistics
+
+   def _run(self, clause: tuple, rows: list[dict[str,Any]], parameters: dict[str,Any], statistics: QueryStatistics) -> Iterator[dict[str,Any]]:
+      match clause:
+         case ('unwind',expression,name):
+            for row in rows:
+               values = expression(row,parameters)
+               if values is None:
+                  continue
+               if type(values)!=list:
+                  values = [values]
+               for value in values:
+                  yield {**row,name: value}
+         case ('merge',_NodePattern() as pattern):
+            for row in rows:
+               properties = self._values(pattern.properties,row,parameters,merge=True)
+               nodes = self.find_nodes(pattern.labels,properties)
+               if len(nodes)==0:
+                  nodes = [self.create_node(pattern.labels,properties,statistics)]
+               for node in nodes:
+                  yield self._bind(row,pattern.variable,node)
+         case ('merge',_RelationshipPattern() as pattern):
+            for row in rows:
+               source = self._bound(row,pattern.source)
+               target = self._bound(row,pattern.target)
+               properties = self._values(pattern.properties,row,parameters,merge=True)
+               found = [relationship for relationship in self.find_relationships(source,target,pattern.labels,pattern.direction) if self._matches(relationship,properties)]
+               if len(found)==0:
+                  if pattern.direction=='<':
+                     source, target = target, source
+                  found = [self.create_relationship(pattern.labels,source,target,properties,statistics)]
+               for relationship in found:
+                  yield self._bind(row,pattern.variable,relationship)
+         case ('create',pattern):
+            for row in rows:
+               node = self.create_node(pattern.labels,self._values(pattern.properties,row,parameters),statistics)
+               yield self._bind(row,pattern.variable,node)
+         case ('match',_NodePattern() as pattern):
+            for row in rows:
+               for node in self._match_node(row,pattern,parameters):
+                  yield self._bind(row,pattern.variable,node)
+         case ('match',_RelationshipPattern() as pattern):
+            for row in rows:
+               properties = self._values(pattern.properties,row,parameters)
+               for source in self._match_node(row,pattern.source,parameters):
+                  for target in self._match_node(row,pattern.target,parameters):
+                     for relationship in self.find_relationships(source,target,pattern.labels,pattern.direction):
+                        if self._matches(relationship,properties):
+                           yield self._bind(self._bind(self._bind(row,pattern.source.variable,source),pattern.target.variable,target),pattern.variable,relationship)
+         case ('set',assignments):
+            for row in rows:
+               for variable, name, operator, expression in assignments:
+                  element = row.get(variable)
+                  if not isinstance(element,(Node,Relationship)):
+                     raise QueryError('Cannot set the properties of {}'.format(variable))
+                  value = expression(row,parameters)
+                  if name is not None:
+                     self.set_properties(element,{name: value},statistics=statistics)
+                  elif isinstance(value,(Node,Relationship)):
+                     self.set_properties(element,dict(value.properties),replace=operator=='=',statistics=statistics)
+                  elif type(value)==dict:
+                     self.set_properties(element,value,replace=operator=='=',statistics=statistics)
+                  else:
+                     raise QueryError('Properties must be set from a map')
+               yield row
+         case ('delete',variables,detach):
+            for row in rows:
+               for variable in variables:
+                  element = row.get(variable)
+                  match element:
+                     case Node():
+                        self.delete_node(element,detach=detach,statistics=statistics)
+                     case Relationship():
+                        self.delete_relationship(element,statistics)
+                     case None:
+                        pass
+                     case _:
+                        raise QueryError('Cannot delete {}'.format(variable))
+               yield row
+         case ('index',label,properties):
+            self.create_index(label,properties,statistics)
+            yield from rows
+
+   def _values(self, properties: list[tuple[str,Callable]], row: dict[str,Any], parameters: dict[str,Any], merge: bool = False) -> dict[str,Any]:
+      values = {}
+      for name, expression in properties:
+         value = expression(row,parameters)
+         if value is None and merge:
+            raise QueryError('Cannot merge node using null property value')
+         values[name] = value
+      return values
+
+   def _matches(self, element: Node | Relationship, properties: dict[str,Any]) -> bool:
+      return all(name in element.properties and _hashable(element.properties[name])==_hashable(value) for name, value in properties.items())
+
+   def _bound(self, row: dict[str,Any], pattern: _NodePattern) -> Node:
+      # the end nodes of a merged relationship must already be bound
+      node = row.get(pattern.variable) if pattern.variable is not None else None
+      if type(node)!=Node or len(pattern.labels)>0 or len(pattern.properties)>0:
+         raise QueryError('The nodes of a merged relationship must be bound by a previous clause')
+      return node
+
+   def _match_node(self, row: dict[str,Any], pattern: _NodePattern, parameters: dict[str,Any]) -> list[Node]:
+      properties = self._values(pattern.properties,row,parameters)
+      node = row.get(pattern.variable) if pattern.variable is not None else None
+      if type(node)==Node:
+         return [node] if pattern.labels<=node.labels and self._matches(node,properties) else []
+      if any(value is None for value in properties.values()):
+         return []
+      return self.find_nodes(pattern.labels,properties)
+
+   def _bind(self, row: dict[str,Any], variable: str | None, value: Any) -> dict[str,Any]:
+      return {**row,variable: value} if variable is not None else row
@@ -0,0 +1,145 @@
+import io
+import json
+import os
+from typing import Any, BinaryIO, Iterable, Iterator, TextIO
+
+from .cypher import _KeyResolver, _node_item
+from .items import NodeItem, EdgeRelationItem, NodeKey
+from .schema import Schema
+
+# Each line is a JSON object for a node or an edge (with ~from and ~to):
+#
+#   {"~labels": ["Component"], "~keys": ["id"], "id": "A", "name": "..."}
+#   {"~labels": ["imports"], "~from": {"id": "A"}, "~to": {"id": "B"},
+#    "~from-labels": ["Component"], "~to-labels": ["Component"]}
+#
+# ~label can be used for ~labels (as in YAML) and ~keys, ~from-labels,
+# ~to-labels, and ~directed (true by default) are optional. Without ~keys, the
+# keys of a node are those of the schema for its labels (or all its
+# properties, as in YAML). A scalar ~from or ~to is the value of the endpoint's
+# schema key (or the default key, e.g., @id).
+
+def _labels(record: dict[str,Any], name: str) -> list[str]:
+   labels = record.get(name)
+   if labels is None:
+      return []
+   return labels if type(labels)==list else [labels]
+
+class NDJSONReader:
+   # Reads node and edge records, one per line, into graph items
+
+   def __init__(self, schema: Schema | None = None, infer: bool = False, default_key: str = '@id'):
+      self.infer = infer
+      self.keys_for = _KeyResolver(schema,infer=infer,default_key=default_key)
+
+   def endpoint(self, value: Any, labels: frozenset[str]) -> NodeKey:
+      # a scalar is the value of the single schema key of the labels or else of
+      # the default key (as assigned to the nodes by --infer)
+      if type(value)==dict:
+         return NodeKey(value)
+      keys = self.keys_for(labels) if len(labels)>0 else ()
+      return NodeKey({next(iter(keys)) if len(keys)==1 else self.keys_for.default_key: value})
+
+   def item(self, record: dict[str,Any]) -> NodeItem | EdgeRelationItem:
+      intern = self.keys_for.intern
+      if '~labels' in record:
+         record['~label'] = record.pop('~labels')
+      from_node = record.get('~from')
+      if from_node is None:
+         if '~to' in record:
+            raise ValueError('Missing source node (~from)')
+         node = _node_item(record,self.keys_for,infer=self.infer)
+         keys = record.get('~keys')
+         if keys is not None:
+            node.keys = intern(keys)
+         return node
+      to_node = record.get('~to')
+      if to_node is None:
+         raise ValueError('Missing target node (~to)')
+      properties = {name: value for name, value in record.items() if name[0]!='~'}
+      from_labels = intern(_labels(record,'~from-labels'))
+      to_labels = intern(_labels(record,'~to-labels'))
+      return EdgeRelationItem(
+         intern(_labels(record,'~label')),
+         from_labels,
+         self.endpoint(from_node,from_labels),
+         to_labels,
+         self.endpoint(to_node,to_labels),
+         record.get('~directed',True),
+         properties
+      )
+
+   def read(self, lines: Iterable[str | bytes], location: str | None = None) -> Iterator[NodeItem | EdgeRelationItem]:
+      for number, line in enumerate(lines,start=1):
+         if len(line.strip())==0:
+            continue
+         try:
+            record = json.loads(line)
+         except ValueError as err:
+            raise ValueError('{}line {}: {}'.format(location + ', ' if location else '',number,err)) from None
+         if type(record)!=dict:
+            raise ValueError('{}line {}: a record must be an object'.format(location + ', ' if location else '',number))
+         yield self.item(record)
+
+def _range(source: BinaryIO, part: int, parts: int) -> Iterator[bytes]:
+   # the lines that start within the part's share of the bytes
+   size = os.fstat(source.fileno()).st_size
+   start = size * part // parts
+   end = size * (part + 1) // parts
+   if start>0:
+      source.seek(start-1)
+      source.readline()
+   else:
+      source.seek(0)
+   position = source.tell()
+   while position<end:
+      line = source.readline()
+      if len(line)==0:
+         break
+      position += len(line)
+      yield line
+
+def read_ndjson(source: TextIO | BinaryIO, location: str = None, schema: Schema | None = None, infer: bool = False, default_key: str = '@id', part: int = 0, parts: int = 1) -> Iterator[NodeItem | EdgeRelationItem]:
+   # a file opened in binary mode can be read in parts (e.g., for parallel
+   # loading) split at line boundaries
+   if parts>1 and isinstance(source,io.TextIOBase):
+      raise ValueError('Only a file opened in binary mode can be read in parts')
+   reader = NDJSONReader(schema=schema,infer=infer,default_key=default_key)
+   lines = _range(source,part,parts) if parts>1 else source
+   yield from reader.read(lines,location=location)
+
+def ndjson_record(item: NodeItem | EdgeRelationItem) -> dict[str,Any] | None:
+   # the record of a node or edge (None for other items)
+   match item:
+      case NodeItem():
+         record = {'~labels': sorted(item.labels), '~keys': sorted(item.keys)}
+      case EdgeRelationItem():
+         record = {
+            '~labels': sorted(item.labels),
+            '~from': dict(item.from_node),
+            '~to': dict(item.to_node),
+         }
+         if len(item.from_labels)>0:
+            record['~from-labels'] = sorted(item.from_labels)
+         if len(item.to_labels)>0:
+            record['~to-labels'] = sorted(item.to_labels)
+         if not item.directed:
+            record['~directed'] = False
+      case _:
+         return None
+   record.update(item.properties)
+   return record
+
+def write_ndjson(stream: Iterable[Any], output: TextIO) -> int:
+   # returns the number of records; dates are written as strings and other
+   # items (e.g., a schema) are omitted
+   count = 0
+   encoder = json.JSONEncoder(ensure_ascii=False,separators=(',',':'),default=str)
+   for item in stream:
+      record = ndjson_record(item)
+      if record is None:
+         continue
+      output.write(encoder.encode(record))
+      output.write('\n')
+      count += 1
+   return count
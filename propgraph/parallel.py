@@ -0,0 +1,230 @@
+import os
+import tempfile
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+from .cypher import read_graph, NodeItem, EdgeRelationItem
+from .items import IndexDefinition
+from .loader import GraphLoader, LoadError, RetryPolicy, DeadLetterFile, load_requests, connect
+from .checkpoint import Checkpoint, source_fingerprint
+from .ndjson import read_ndjson
+from .snapshot import SnapshotWriter, read_snapshot
+
+PHASES = ['nodes','edges']
+
+def partition_of(item: NodeItem | EdgeRelationItem, partitions: int) -> int:
+   # a stable hash of the node key (or the edge's source node key) as the
+   # workers must agree on the partition of every item
+   if partitions<=1:
+      return 0
+   match item:
+      case NodeItem():
+         key = (sorted(item.labels),[(name,item.properties.get(name)) for name in sorted(item.keys)])
+      case EdgeRelationItem():
+         key = (sorted(item.from_labels),sorted(item.from_node.items()))
+      case _:
+         return 0
+   return zlib.crc32(repr(key).encode('utf-8')) % partitions
+
+@dataclass
+class PartitionTask:
+   source: str
+   phase: str
+   partition: int = 0
+   partitions: int = 1
+   graph: str = 'test'
+   pipeline: int = 1
+   read_options: dict[str,Any] = field(default_factory=dict)
+   query_options: dict[str,Any] = field(default_factory=dict)
+   connection: dict[str,Any] = field(default_factory=dict)
+   connect: Callable = connect
+   checkpoint: str | None = None
+   checkpoint_interval: float = 0.0
+   # the fingerprint of the source (computed once for all its partitions)
+   fingerprint: str | None = None
+   resume: bool = False
+   retry: RetryPolicy | None = None
+   dead_letter: str | None = None
+   # the items of the partition split from the source (see split_source)
+   input: str | None = None
+
+   def part(self) -> str:
+      return '{} {}/{}'.format(self.phase,self.partition+1,self.partitions)
+
+   def describe(self) -> str:
+      return '{} ({})'.format(self.source,self.part())
+
+@dataclass
+class PartitionResult:
+   task: PartitionTask
+   items: int = 0
+   queries: int = 0
+   failed: str | None = None
+   query: str | None = None
+   error: str | None = None
+   skipped: int = 0
+   retries: int = 0
+   rejected: int = 0
+
+def _ndjson_options(read_options: dict[str,Any]) -> dict[str,Any]:
+   return {name: read_options[name] for name in ['schema','infer','default_key'] if name in read_options}
+
+@dataclass
+class SplitTask:
+   source: str
+   directory: str
+   partitions: int = 1
+   read_options: dict[str,Any] = field(default_factory=dict)
+
+   def path(self, phase: str, partition: int) -> str:
+      return os.path.join(self.directory,'{}-{}.snapshot'.format(phase,partition))
+
+def split_source(task: SplitTask) -> str | None:
+   # Parses a source once and writes the nodes and edges of each partition to
+   # a snapshot file, so that the partitions are read without parsing the
+   # source again. Returns the error, if any.
+   format = task.read_options.get('format')
+   writers = {}
+   try:
+      with open(task.source,'rb' if format=='snapshot' else 'r') as input:
+         for phase in PHASES:
+            for partition in range(task.partitions):
+               writers[(phase,partition)] = SnapshotWriter(task.path(phase,partition))
+         for item in read_graph(input,**task.read_options):
+            match item:
+               case NodeItem():
+                  writers[('nodes',partition_of(item,task.partitions))].add(item)
+               case EdgeRelationItem():
+                  writers[('edges',partition_of(item,task.partitions))].add(item)
+         for writer in writers.values():
+            writer.close()
+   except Exception as err:
+      for writer in writers.values():
+         writer.output.close()
+      return str(err)
+   return None
+
+def load_partition(task: PartitionTask) -> PartitionResult:
+   item_type = NodeItem if task.phase=='nodes' else EdgeRelationItem
+   result = PartitionResult(task)
+
+   def selected(stream, partitioned: bool = True):
+      for item in stream:
+         if type(item)==item_type and (not partitioned or partition_of(item,task.partitions)==task.partition):
+            result.items += 1
+            yield item
+
+   checkpoint = None
+   dead_letter = None
+   loader = None
+   try:
+      skip = 0
+      on_commit = None
+      if task.checkpoint is not None:
+         checkpoint = Checkpoint(task.checkpoint,interval=task.checkpoint_interval)
+         position = checkpoint.track(task.source,part=task.part(),resume=task.resume,fingerprint=task.fingerprint)
+         if position.complete:
+            return result
+         skip = position.committed
+         result.skipped = skip
+         on_commit = position.commit
+      if task.dead_letter is not None:
+         dead_letter = DeadLetterFile(task.dead_letter,source=task.describe())
+      connection = task.connect(**task.connection)
+      format = 'snapshot' if task.input is not None else task.read_options.get('format')
+      with open(task.input or task.source,'rb' if format in ['snapshot','ndjson'] else 'r') as input:
+         if task.input is not None:
+            items = selected(read_snapshot(input),partitioned=False)
+         elif format=='ndjson':
+            # each partition reads its share of the lines
+            items = selected(read_ndjson(input,**_ndjson_options(task.read_options),part=task.partition,parts=task.partitions),partitioned=False)
+         else:
+            items = selected(read_graph(input,**task.read_options))
+         loader = GraphLoader(connection,task.graph,pipeline=task.pipeline,on_commit=on_commit,retry=task.retry,dead_letter=dead_letter)
+         with loader:
+            for request in load_requests(items,skip=skip,**task.query_options):
+               loader.submit(request)
+      if checkpoint is not None:
+         position.finish()
+   except LoadError as err:
+      # item numbers are relative to the items selected for the partition
+      result.failed = err.request.describe()
+      result.query = err.request.query
+      result.error = str(err.error)
+   except Exception as err:
+      result.error = str(err)
+   finally:
+      if loader is not None:
+         result.queries = loader.counters.queries
+         result.retries = loader.counters.retries
+         result.rejected = loader.counters.rejected
+      if dead_letter is not None:
+         dead_letter.close()
+      if checkpoint is not None:
+         checkpoint.close()
+   return result
+
+def partition_tasks(sources: list[str], phase: str, workers: int, partitions: int | None = None, **options) -> list[PartitionTask]:
+   if partitions is None:
+      # split the files so that every worker has a partition to load
+      partitions = max(1,-(-workers // max(1,len(sources))))
+   return [
+      PartitionTask(source,phase,partition=partition,partitions=partitions,**options)
+      for source in sources
+      for partition in range(partitions)
+   ]
+
+def create_indexes(definitions: list[IndexDefinition], graph: str = 'test', connection: dict[str,Any] | None = None, connect: Callable = connect, retry: RetryPolicy | None = None, **options) -> int:
+   with GraphLoader(connect(**(connection or {})),graph,retry=retry) as loader:
+      for request in load_requests(definitions):
+         loader.submit(request)
+   return loader.queries
+
+def parallel_load(sources: list[str], workers: int, partitions: int | None = None, on_result: Callable[[PartitionResult],None] | None = None, indexes: list[IndexDefinition] | None = None, deferred_indexes: bool = False, directory: str | None = None, **options) -> list[PartitionResult]:
+   # Each source is parsed once by the worker pool and split into a snapshot
+   # file per phase and partition in a temporary directory (NDJSON sources are
+   # instead read by byte range). All the nodes are then loaded before any of
+   # the edges. The edge phase is skipped if any node partition fails. The
+   # indexes are created before the nodes or, when deferred, between the two
+   # phases.
+   if partitions is None:
+      partitions = max(1,-(-workers // max(1,len(sources))))
+   read_options = options.get('read_options',{})
+   results = []
+   with ProcessPoolExecutor(max_workers=workers) as pool, tempfile.TemporaryDirectory(prefix='propgraph-',dir=directory) as spill:
+      fingerprints = {}
+      if options.get('checkpoint') is not None:
+         # each source is hashed once rather than by each of its partitions
+         fingerprints = dict(zip(sources,pool.map(source_fingerprint,[[source] for source in sources])))
+      splits = {}
+      if read_options.get('format')!='ndjson':
+         for index, source in enumerate(sources):
+            splits[source] = SplitTask(source,os.path.join(spill,str(index)),partitions=partitions,read_options=read_options)
+            os.mkdir(splits[source].directory)
+         for split, error in zip(splits.values(),pool.map(split_source,splits.values())):
+            if error is not None:
+               result = PartitionResult(PartitionTask(split.source,'nodes',partitions=partitions,**options),error=error)
+               if on_result is not None:
+                  on_result(result)
+               results.append(result)
+         if len(results)>0:
+            return results
+      for phase in PHASES:
+         if indexes and (phase=='edges')==deferred_indexes:
+            create_indexes(indexes,**options)
+         tasks = partition_tasks(sources,phase,workers,partitions=partitions,**options)
+         for task in tasks:
+            task.fingerprint = fingerprints.get(task.source)
+            if task.source in splits:
+               task.input = splits[task.source].path(phase,task.partition)
+         phase_results = []
+         for result in pool.map(load_partition,tasks):
+            if on_result is not None:
+               on_result(result)
+            phase_results.append(result)
+         results.extend(phase_results)
+         if any(result.error is not None for result in phase_results):
+            break
+   return results
@@ -1,7 +1,5 @@
 from typing import TextIO
 
-from lark import Lark
-
 grammar = r"""
 ?schema: prolog? (_NEWLINE | node)*
 prolog : LONG_STRING | STRING
@@ -186,6 +184,7 @@ class Schema:
       self.description = description
       self.label_index = {}
       self.nodes = []
+      self.resolved = {}
 
    def add_node(self, node: NodeDefinition):
       for label in node.labels:
@@ -194,25 +193,31 @@ class Schema:
             self.label_index[label] = indexed
          indexed.append(node)
       self.nodes.append(node)
+      self.resolved.clear()
 
-   def find(self, *labels: list[str]):
-      if len(labels)==0:
-         return []
-      for label in labels:
-         indexed = self.label_index.get(label)
-         if indexed is not None:
-            break
-      if indexed is None:
-         return []
-      if len(labels)==1:
-         return indexed
-      label_set = set(labels)
+   def _find(self, label_set: frozenset[str]) -> list[NodeDefinition]:
+      if len(label_set)==1:
+         return self.label_index.get(next(iter(label_set)),[])
       candidates = []
-      for node in indexed:
-         if node.labels.issubset(label_set):
+      for node in self.nodes:
+         if len(node.labels)>0 and node.labels.issubset(label_set):
             candidates.append(node)
       return candidates
 
+   def find(self, *labels: list[str]) -> list[NodeDefinition]:
+      if len(labels)==0:
+         return []
+      label_set = frozenset(labels)
+      found = self.resolved.get(label_set)
+      if found is None:
+         found = self._find(label_set)
+         self.resolved[label_set] = found
+      return found
+
+   def find_keys(self, *labels: list[str]) -> set[str] | None:
+      found = self.find(*labels)
+      return found[0].keys if len(found)>0 else None
+
    def documentation(self, output: TextIO):
 
       print(self.description,file=output)
@@ -242,10 +247,22 @@ def _process_property(target,property):
          description = _decode_literal(facet.children[0].value)
    target.add_property(name,datatype,description)
 
+_parsers = {}
+
+def schema_grammar_parser(cache: bool | str = True):
+   # The LALR tables are built once per process (for each cache argument) and,
+   # with cache, serialized to a temporary file (or the given file) that is
+   # shared by later processes.
+   parser = _parsers.get(cache)
+   if parser is None:
+      from lark import Lark
+      parser = _parsers[cache] = Lark(grammar,parser='lalr',start='schema',cache=cache)
+   return parser
+
 class SchemaParser:
 
    def __init__(self):
-      self.parser = Lark(grammar,parser='lalr',start='schema')
+      self.parser = schema_grammar_parser()
 
    def parse(self,source):
 
@@ -0,0 +1,470 @@
+import datetime
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from typing import Any, BinaryIO, Iterable, Iterator
+
+from .items import NodeItem, EdgeRelationItem, NodeKey, Interner
+from .schema import Schema, NodeDefinition
+
+# A snapshot is a parsed graph in a binary file that can be read (memory
+# mapped) without parsing the source again. All the integers are little
+# endian. The file is:
+#
+#   header    magic, version, and the offsets and sizes of the sections
+#   records   the items in stream order, each a tag followed by its fields
+#   strings   u32 count, then a u32 length and UTF-8 bytes per string
+#   sets      u32 count, then a u16 size and u32 string ids per set
+#   nodes     u64 offset of each node record (by node number)
+#
+# A node record has its label and key set ids and its properties. An edge
+# record has its label set id, the node numbers of its endpoints, its
+# direction, and its properties; an endpoint that is not a node of the
+# snapshot (or has other labels than the node) is written as its labels and
+# key values instead. A schema is written as JSON. Labels, property names, and
+# sets are in the string and set tables; property values are written inline
+# (dates and large integers as text). Nothing is unpickled or evaluated when a
+# snapshot is read, so other items and values are refused when writing.
+
+MAGIC = b'PGSNAP'
+VERSION = 2
+
+_HEADER = struct.Struct('<6sH7Q')
+_U8 = struct.Struct('<B')
+_U16 = struct.Struct('<H')
+_U32 = struct.Struct('<I')
+_I64 = struct.Struct('<q')
+_F64 = struct.Struct('<d')
+_NODE_HEADER = struct.Struct('<BII')
+_EDGE_HEADER = struct.Struct('<BI')
+
+NODE = 0
+EDGE = 1
+SCHEMA = 2
+
+_NONE = 0
+_FALSE = 1
+_TRUE = 2
+_INT = 3
+_FLOAT = 4
+_STRING = 5
+_LIST = 6
+_DATE = 7
+_DATETIME = 8
+_BIGINT = 9
+_MAP = 10
+
+_EXTERNAL = 0xFFFFFFFF
+
+def _identity(labels: frozenset, pairs: Iterable[tuple[str,Any]]) -> tuple:
+   key = tuple(sorted(pairs))
+   try:
+      hash(key)
+   except TypeError:
+      # key values that are lists (or other unhashable values)
+      key = repr(key)
+   return (labels,key)
+
+def _property_records(properties: dict[str,tuple[str,str,str]]) -> list[list[str]]:
+   return [list(property) for property in properties.values()]
+
+def _schema_record(schema: Schema) -> dict[str,Any]:
+   return {
+      'description': schema.description,
+      'nodes': [
+         {
+            'description': node.description,
+            'labels': sorted(node.labels),
+            'keys': sorted(node.keys),
+            'properties': _property_records(node.properties),
+            'relations': [
+               {
+                  'labels': sorted(edge.labels),
+                  'directed': edge.directed,
+                  'description': edge.description,
+                  'related': [sorted(labels) for labels in edge.related],
+                  'properties': _property_records(edge.properties)
+               }
+               for edge in node.relations
+            ]
+         }
+         for node in schema.nodes
+      ]
+   }
+
+def _schema(record: dict[str,Any]) -> Schema:
+   schema = Schema(record['description'])
+   for node_record in record['nodes']:
+      node = NodeDefinition(node_record['description'],node_record['labels'],node_record['keys'])
+      for name, datatype, description in node_record['properties']:
+         node.add_property(name,datatype,description)
+      for edge_record in node_record['relations']:
+         edge = node.add_relation(edge_record['labels'],edge_record['directed'],edge_record['description'])
+         for labels in edge_record['related']:
+            edge.add_related(labels)
+         for name, datatype, description in edge_record['properties']:
+            edge.add_property(name,datatype,description)
+      schema.add_node(node)
+   return schema
+
+class SnapshotWriter:
+   # Writes the records as the items are added; the string and set tables and
+   # the node identities are kept in memory until closed.
+
+   def __init__(self, path: str):
+      self.path = path
+      self.output = open(path,'wb')
+      self.output.write(b'\0' * _HEADER.size)
+      self.position = _HEADER.size
+      self.strings = {}
+      self.sets = {}
+      self.node_ids = {}
+      self.node_offsets = array('Q')
+      self.nodes = 0
+      self.edges = 0
+      self.items = 0
+
+   def __enter__(self):
+      return self
+
+   def __exit__(self, exc_type, exc_value, traceback):
+      if exc_type is None:
+         self.close()
+      else:
+         self.output.close()
+         os.unlink(self.path)
+      return False
+
+   def _string(self, value: str) -> int:
+      id = self.strings.get(value)
+      if id is None:
+         id = len(self.strings)
+         self.strings[value] = id
+      return id
+
+   def _set(self, values: Iterable[str]) -> int:
+      ids = tuple(sorted(self._string(value) for value in values))
+      id = self.sets.get(ids)
+      if id is None:
+         id = len(self.sets)
+         self.sets[ids] = id
+      return id
+
+   def _value(self, out: list[bytes], value: Any):
+      value_type = type(value)
+      if value is None:
+         out.append(_U8.pack(_NONE))
+      elif value_type==bool:
+         out.append(_U8.pack(_TRUE if value else _FALSE))
+      elif value_type==int and -(1<<63)<=value<(1<<63):
+         out.append(_U8.pack(_INT))
+         out.append(_I64.pack(value))
+      elif value_type==float:
+         out.append(_U8.pack(_FLOAT))
+         out.append(_F64.pack(value))
+      elif value_type==str:
+         encoded = value.encode('utf-8')
+         out.append(_U8.pack(_STRING))
+         out.append(_U32.pack(len(encoded)))
+         out.append(encoded)
+      elif value_type==list:
+         out.append(_U8.pack(_LIST))
+         out.append(_U32.pack(len(value)))
+         for item in value:
+            self._value(out,item)
+      elif value_type==dict:
+         out.append(_U8.pack(_MAP))
+         self._properties(out,value.items(),len(value))
+      else:
+         if value_type==datetime.datetime:
+            tag = _DATETIME
+         elif value_type==datetime.date:
+            tag = _DATE
+         elif value_type==int:
+            tag = _BIGINT
+         else:
+            raise ValueError('A {} value cannot be written to a snapshot: {!r}'.format(value_type.__name__,value))
+         encoded = (value.isoformat() if tag!=_BIGINT else str(value)).encode('utf-8')
+         out.append(_U8.pack(tag))
+         out.append(_U32.pack(len(encoded)))
+         out.append(encoded)
+
+   def _properties(self, out: list[bytes], properties: Iterable[tuple[str,Any]], count: int):
+      out.append(_U32.pack(count))
+      for name, value in properties:
+         out.append(_U32.pack(self._string(name)))
+         self._value(out,value)
+
+   def _endpoint(self, out: list[bytes], labels: frozenset, key: Any):
+      id = self.node_ids.get(_identity(frozenset(labels),key.items()))
+      if id is not None:
+         out.append(_U32.pack(id))
+         return
+      out.append(_U32.pack(_EXTERNAL))
+      out.append(_U32.pack(self._set(labels)))
+      self._properties(out,key.items(),len(key))
+
+   def _write(self, out: list[bytes]):
+      data = b''.join(out)
+      self.output.write(data)
+      self.position += len(data)
+      self.items += 1
+
+   def add(self, item: Any):
+      match item:
+         case NodeItem():
+            properties = item.properties
+            identity = _identity(frozenset(item.labels),((name,properties.get(name)) for name in item.keys))
+            # the first of the nodes with the same identity is the endpoint
+            self.node_ids.setdefault(identity,self.nodes)
+            self.node_offsets.append(self.position)
+            self.nodes += 1
+            out = [_NODE_HEADER.pack(NODE,self._set(item.labels),self._set(item.keys))]
+            self._properties(out,properties.items(),len(properties))
+         case EdgeRelationItem():
+            self.edges += 1
+            out = [_EDGE_HEADER.pack(EDGE,self._set(item.labels))]
+            self._endpoint(out,item.from_labels,item.from_node)
+            self._endpoint(out,item.to_labels,item.to_node)
+            out.append(_U8.pack(1 if item.directed else 0))
+            self._properties(out,item.properties.items(),len(item.properties))
+         case Schema():
+            encoded = json.dumps(_schema_record(item)).encode('utf-8')
+            out = [_U8.pack(SCHEMA),_U32.pack(len(encoded)),encoded]
+         case _:
+            raise ValueError('A {} cannot be written to a snapshot'.format(type(item).__name__))
+      self._write(out)
+
+   def close(self):
+      records_end = self.position
+      out = [_U32.pack(len(self.strings))]
+      for value in self.strings.keys():
+         encoded = value.encode('utf-8')
+         out.append(_U32.pack(len(encoded)))
+         out.append(encoded)
+      strings = b''.join(out)
+      out = [_U32.pack(len(self.sets))]
+      for ids in self.sets.keys():
+         out.append(_U16.pack(len(ids)))
+         out.append(struct.pack('<{}I'.format(len(ids)),*ids))
+      sets = b''.join(out)
+      strings_offset = records_end
+      sets_offset = strings_offset + len(strings)
+      nodes_offset = sets_offset + len(sets)
+      padding = -nodes_offset % 8
+      nodes_offset += padding
+      self.output.write(strings)
+      self.output.write(sets)
+      self.output.write(b'\0' * padding)
+      if sys.byteorder!='little':
+         self.node_offsets.byteswap()
+      self.output.write(self.node_offsets.tobytes())
+      self.output.seek(0)
+      self.output.write(_HEADER.pack(MAGIC,VERSION,records_end,strings_offset,sets_offset,nodes_offset,self.nodes,self.edges,self.items))
+      self.output.close()
+
+def write_snapshot(stream: Iterable[Any], path: str) -> SnapshotWriter:
+   # returns the writer with its nodes, edges, and items counts
+   with SnapshotWriter(path) as writer:
+      for item in stream:
+         writer.add(item)
+   return writer
+
+class Snapshot:
+   # A memory-mapped snapshot whose records are decoded as they are iterated,
+   # sharing the label and key sets and the endpoint NodeKeys.
+
+   def __init__(self, source: str | BinaryIO | bytes):
+      self.file = None
+      self.map = None
+      if type(source)==str:
+         self.file = open(source,'rb')
+         source = self.file
+      if isinstance(source,(bytes,bytearray,memoryview)):
+         self.buffer = source
+      else:
+         try:
+            self.map = mmap.mmap(source.fileno(),0,access=mmap.ACCESS_READ)
+            self.buffer = self.map
+         except (AttributeError,OSError,ValueError):
+            # e.g., stdin or an in-memory stream
+            self.buffer = source.read()
+      if len(self.buffer)<_HEADER.size:
+         raise ValueError('Not a snapshot file')
+      magic, version, self.records_end, strings_offset, sets_offset, nodes_offset, self.nodes, self.edges, self.items = _HEADER.unpack_from(self.buffer,0)
+      if magic!=MAGIC:
+         raise ValueError('Not a snapshot file')
+      if version!=VERSION:
+         raise ValueError('Unsupported snapshot version {}'.format(version))
+      self.strings = self._strings(strings_offset)
+      self.sets = self._sets(sets_offset)
+      if self.nodes==0:
+         self.node_offsets = []
+      elif sys.byteorder!='little':
+         self.node_offsets = array('Q',bytes(self.buffer[nodes_offset:nodes_offset+8*self.nodes]))
+         self.node_offsets.byteswap()
+      else:
+         # the node offsets are used in place
+         self.node_offsets = memoryview(self.buffer)[nodes_offset:nodes_offset+8*self.nodes].cast('Q')
+      self.endpoints = {}
+
+   def __enter__(self):
+      return self
+
+   def __exit__(self, exc_type, exc_value, traceback):
+      self.close()
+      return False
+
+   def __len__(self) -> int:
+      return self.items
+
+   def _strings(self, offset: int) -> list[str]:
+      buffer = self.buffer
+      count, = _U32.unpack_from(buffer,offset)
+      offset += 4
+      strings = []
+      for _ in range(count):
+         length, = _U32.unpack_from(buffer,offset)
+         offset += 4
+         strings.append(str(buffer[offset:offset+length],'utf-8'))
+         offset += length
+      return strings
+
+   def _sets(self, offset: int) -> list[frozenset]:
+      buffer = self.buffer
+      strings = self.strings
+      intern = Interner()
+      count, = _U32.unpack_from(buffer,offset)
+      offset += 4
+      sets = []
+      for _ in range(count):
+         size, = _U16.unpack_from(buffer,offset)
+         offset += 2
+         ids = struct.unpack_from('<{}I'.format(size),buffer,offset)
+         offset += 4*size
+         sets.append(intern(strings[id] for id in ids))
+      return sets
+
+   def _value(self, offset: int) -> tuple[Any,int]:
+      buffer = self.buffer
+      tag = buffer[offset]
+      offset += 1
+      if tag==_STRING:
+         length, = _U32.unpack_from(buffer,offset)
+         offset += 4
+         return str(buffer[offset:offset+length],'utf-8'), offset+length
+      if tag==_INT:
+         return _I64.unpack_from(buffer,offset)[0], offset+8
+      if tag==_FLOAT:
+         return _F64.unpack_from(buffer,offset)[0], offset+8
+      if tag==_NONE:
+         return None, offset
+      if tag==_TRUE:
+         return True, offset
+      if tag==_FALSE:
+         return False, offset
+      if tag==_LIST:
+         count, = _U32.unpack_from(buffer,offset)
+         offset += 4
+         values = []
+         for _ in range(count):
+            value, offset = self._value(offset)
+            values.append(value)
+         return values, offset
+      if tag==_MAP:
+         return self._properties(offset)
+      if tag in (_DATE,_DATETIME,_BIGINT):
+         length, = _U32.unpack_from(buffer,offset)
+         offset += 4
+         text = str(buffer[offset:offset+length],'utf-8')
+         if tag==_DATE:
+            value = datetime.date.fromisoformat(text)
+         elif tag==_DATETIME:
+            value = datetime.datetime.fromisoformat(text)
+         else:
+            value = int(text)
+         return value, offset+length
+      raise ValueError('Invalid value tag {} at offset {}'.format(tag,offset-1))
+
+   def _properties(self, offset: int) -> tuple[dict[str,Any],int]:
+      count, = _U32.unpack_from(self.buffer,offset)
+      offset += 4
+      strings = self.strings
+      properties = {}
+      for _ in range(count):
+         name, = _U32.unpack_from(self.buffer,offset)
+         value, offset = self._value(offset+4)
+         properties[strings[name]] = value
+      return properties, offset
+
+   def _node(self, offset: int) -> tuple[NodeItem,int]:
+      _, labels, keys = _NODE_HEADER.unpack_from(self.buffer,offset)
+      properties, offset = self._properties(offset+_NODE_HEADER.size)
+      return NodeItem(self.sets[labels],self.sets[keys],properties), offset
+
+   def node(self, number: int) -> NodeItem:
+      # a node by its position among the nodes
+      return self._node(self.node_offsets[number])[0]
+
+   def _endpoint(self, offset: int) -> tuple[frozenset,NodeKey,int]:
+      id, = _U32.unpack_from(self.buffer,offset)
+      offset += 4
+      if id==_EXTERNAL:
+         labels, = _U32.unpack_from(self.buffer,offset)
+         key, offset = self._properties(offset+4)
+         return self.sets[labels], NodeKey(key), offset
+      endpoint = self.endpoints.get(id)
+      if endpoint is None:
+         node = self.node(id)
+         endpoint = (node.labels,NodeKey(tuple((name,node.properties.get(name)) for name in sorted(node.keys))))
+         self.endpoints[id] = endpoint
+      return endpoint[0], endpoint[1], offset
+
+   def __iter__(self) -> Iterator[Any]:
+      buffer = self.buffer
+      sets = self.sets
+      offset = _HEADER.size
+      end = self.records_end
+      while offset<end:
+         tag = buffer[offset]
+         if tag==NODE:
+            item, offset = self._node(offset)
+         elif tag==EDGE:
+            _, labels = _EDGE_HEADER.unpack_from(buffer,offset)
+            from_labels, from_node, offset = self._endpoint(offset+_EDGE_HEADER.size)
+            to_labels, to_node, offset = self._endpoint(offset)
+            directed = buffer[offset]!=0
+            properties, offset = self._properties(offset+1)
+            item = EdgeRelationItem(sets[labels],from_labels,from_node,to_labels,to_node,directed,properties)
+         elif tag==SCHEMA:
+            length, = _U32.unpack_from(buffer,offset+1)
+            offset += 5
+            item = _schema(json.loads(str(buffer[offset:offset+length],'utf-8')))
+            offset += length
+         else:
+            raise ValueError('Invalid record tag {} at offset {}'.format(tag,offset))
+         yield item
+
+   def close(self):
+      self.endpoints = {}
+      if isinstance(self.node_offsets,memoryview):
+         self.node_offsets.release()
+      self.node_offsets = []
+      if self.map is not None:
+         self.map.close()
+         self.map = None
+      if self.file is not None:
+         self.file.close()
+         self.file = None
+
+def read_snapshot(source: str | BinaryIO | bytes, batch_size: int | None = None) -> Iterator[Any]:
+   # the items (or columnar batches of at most batch_size items)
+   with Snapshot(source) as snapshot:
+      if batch_size is not None:
+         from .columnar import columnar_batches
+         yield from columnar_batches(snapshot,batch_size=batch_size)
+      else:
+         yield from snapshot
@@ -0,0 +1,390 @@
+import argparse
+import random
+import re
+import signal
+import socket
+import socketserver
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any
+
+from .memorygraph import MemoryGraph, QueryError
+
+# A local stand-in for FalkorDB that speaks enough RESP (the redis protocol)
+# for the loader: GRAPH.QUERY runs the queries against in-memory graphs (see
+# propgraph.memorygraph) and GRAPH.CONSTRAINT, GRAPH.DELETE, GRAPH.LIST, and
+# the connection commands of the redis clients (PING, CLIENT, AUTH, ...) are
+# accepted. Latency and failures can be injected to exercise batching,
+# pipelining, concurrency, retries, and dead letters without a database.
+#
+# As for FalkorDB, a name that is not a Cypher identifier (e.g., @id) must be
+# quoted with backticks in a query (including its CYPHER parameters).
+
+@dataclass
+class Faults:
+   # The rates of injected query errors (rejected), runtime errors (in the
+   # result), transient LOADING errors, and dropped connections. Queries
+   # matching `fail_matching` always fail.
+
+   error_rate: float = 0.0
+   runtime_error_rate: float = 0.0
+   transient_rate: float = 0.0
+   disconnect_rate: float = 0.0
+   fail_matching: str | None = None
+   seed: int | None = None
+
+@dataclass(slots=True)
+class ReceivedQuery:
+   graph: str
+   query: str
+   error: str | None = None
+
+class _Status(str):
+   # a simple string reply (+OK)
+   pass
+
+class _ReplyError(Exception):
+
+   def __init__(self, message: str, prefix: str = 'ERR'):
+      super().__init__(message)
+      self.prefix = prefix
+
+class _Disconnect(Exception):
+   pass
+
+def _encode(value: Any, output: bytearray, protocol: int = 2):
+   # the reply in RESP2 or RESP3 (which has its own null and map types)
+   match value:
+      case _Status():
+         output += b'+' + value.encode('utf-8') + b'\r\n'
+      case _ReplyError():
+         output += '-{} {}\r\n'.format(value.prefix,str(value).replace('\r',' ').replace('\n',' ')).encode('utf-8')
+      case None:
+         output += b'_\r\n' if protocol==3 else b'$-1\r\n'
+      case bool() | int():
+         output += b':%d\r\n' % int(value)
+      case str() | bytes():
+         data = value.encode('utf-8') if type(value)==str else value
+         output += b'$%d\r\n' % len(data) + data + b'\r\n'
+      case list() | tuple():
+         output += b'*%d\r\n' % len(value)
+         for item in value:
+            _encode(item,output,protocol)
+      case dict():
+         output += (b'%%%d\r\n' if protocol==3 else b'*%d\r\n') % (len(value) if protocol==3 else 2*len(value))
+         for name, item in value.items():
+            _encode(name,output,protocol)
+            _encode(item,output,protocol)
+      case _:
+         _encode(str(value),output,protocol)
+
+def _read_commands(buffer: bytearray) -> tuple[list[list[bytes]],int]:
+   # the complete commands in the buffer (arrays of bulk strings or inline
+   # commands) and the number of bytes they use
+   commands = []
+   position = 0
+   size = len(buffer)
+   while position<size:
+      if buffer[position]!=ord('*'):
+         end = buffer.find(b'\n',position)
+         if end<0:
+            break
+         arguments = bytes(buffer[position:end]).split()
+         position = end+1
+         if len(arguments)>0:
+            commands.append(arguments)
+         continue
+      end = buffer.find(b'\r\n',position)
+      if end<0:
+         break
+      count = int(buffer[position+1:end])
+      cursor = end+2
+      arguments = []
+      for _ in range(count):
+         end = buffer.find(b'\r\n',cursor)
+         if end<0:
+            break
+         if buffer[cursor]!=ord('$'):
+            raise ValueError('Expected a bulk string')
+         length = int(buffer[cursor+1:end])
+         start = end+2
+         if start+length+2>size:
+            break
+         arguments.append(bytes(buffer[start:start+length]))
+         cursor = start+length+2
+      if len(arguments)<count:
+         break
+      commands.append(arguments)
+      position = cursor
+   return (commands,position)
+
+class _Handler(socketserver.BaseRequestHandler):
+
+   def handle(self):
+      server = self.server.standin
+      connection = self.request
+      connection.setsockopt(socket.IPPROTO_TCP,socket.TCP_NODELAY,1)
+      buffer = bytearray()
+      protocol = 2
+      with server.lock:
+         server.connections += 1
+      while True:
+         try:
+            data = connection.recv(65536)
+         except OSError:
+            return
+         if len(data)==0:
+            return
+         buffer += data
+         try:
+            commands, used = _read_commands(buffer)
+         except ValueError:
+            connection.sendall(b'-ERR Protocol error\r\n')
+            return
+         del buffer[:used]
+         if len(commands)==0:
+            continue
+         # the latency of the round trip applies once to the commands read together
+         server.delay()
+         output = bytearray()
+         try:
+            for command in commands:
+               if command[0].upper()==b'HELLO':
+                  # the clients negotiate the protocol version (RESP3 by default for redis-py 6+)
+                  version = int(command[1]) if len(command)>1 else protocol
+                  if version not in (2,3):
+                     _encode(_ReplyError('unsupported protocol version',prefix='NOPROTO'),output,protocol)
+                     continue
+                  protocol = version
+                  _encode(server.hello(protocol),output,protocol)
+                  continue
+               _encode(server.execute(command),output,protocol)
+         except _Disconnect:
+            connection.sendall(output)
+            connection.close()
+            return
+         connection.sendall(output)
+         if commands[-1][0].upper()==b'QUIT':
+            return
+
+class _TCPServer(socketserver.ThreadingTCPServer):
+   daemon_threads = True
+   allow_reuse_address = True
+
+class StandinServer:
+   # A RESP server running GRAPH.QUERY against in-memory graphs in a background
+   # thread. Each round trip is delayed by `latency` plus `jitter`, each query
+   # takes at least `query_time`, and the queries are recorded with their error.
+
+   def __init__(self, host: str = '127.0.0.1', port: int = 0, latency: float = 0.0, jitter: float = 0.0, query_time: float = 0.0, faults: Faults | None = None, record: bool = True):
+      self.latency = latency
+      self.jitter = jitter
+      self.query_time = query_time
+      self.faults = faults or Faults()
+      self.fail_matching = re.compile(self.faults.fail_matching) if self.faults.fail_matching else None
+      self.random = random.Random(self.faults.seed)
+      self.record = record
+      self.graphs = {}
+      self.queries = []
+      self.commands = 0
+      self.round_trips = 0
+      self.connections = 0
+      self.lock = threading.Lock()
+      self.server = _TCPServer((host,port),_Handler,bind_and_activate=False)
+      self.server.standin = self
+      self.thread = None
+      self.host = host
+      self.port = port
+
+   @property
+   def address(self) -> tuple[str,int]:
+      return (self.host,self.port)
+
+   def start(self) -> 'StandinServer':
+      self.server.server_bind()
+      self.server.server_activate()
+      self.host, self.port = self.server.server_address[:2]
+      self.thread = threading.Thread(target=self.server.serve_forever,name='standin',daemon=True)
+      self.thread.start()
+      return self
+
+   def stop(self):
+      if self.thread is not None:
+         self.server.shutdown()
+         self.thread.join()
+         self.thread = None
+      self.server.server_close()
+
+   def __enter__(self):
+      return self.start()
+
+   def __exit__(self, exc_type, exc_value, traceback):
+      self.stop()
+      return False
+
+   def connection_options(self) -> dict[str,Any]:
+      # the arguments of propgraph.loader.connect (e.g., for a parallel load)
+      return {'database':'redis','host':self.host,'port':self.port}
+
+   def connect(self, asynchronous: bool = False):
+      from .loader import connect
+      return connect(asynchronous=asynchronous,**self.connection_options())
+
+   def graph(self, name: str = 'test') -> MemoryGraph:
+      with self.lock:
+         return self._graph(name)
+
+   def hello(self, protocol: int) -> dict[str,Any]:
+      return {'server':'redis','version':'7.2.0','proto':protocol,'id':self.connections,'mode':'standalone','role':'master','modules':[]}
+
+   def delay(self):
+      with self.lock:
+         self.round_trips += 1
+         delay = self.latency + (self.random.uniform(0,self.jitter) if self.jitter>0 else 0)
+      if delay>0:
+         time.sleep(delay)
+
+   def _fault(self, query: str) -> str | None:
+      if self.fail_matching is not None and self.fail_matching.search(query):
+         return 'error'
+      faults = self.faults
+      if faults.error_rate<=0 and faults.runtime_error_rate<=0 and faults.transient_rate<=0 and faults.disconnect_rate<=0:
+         return None
+      draw = self.random.random()
+      for kind, rate in [('error',faults.error_rate),('runtime',faults.runtime_error_rate),('transient',faults.transient_rate),('disconnect',faults.disconnect_rate)]:
+         if draw<rate:
+            return kind
+         draw -= rate
+      return None
+
+   def execute(self, command: list[bytes]) -> Any:
+      # returns the reply (an error is returned as a _ReplyError) once the
+      # query time has passed; the graphs are only locked while the command runs
+      start = time.perf_counter()
+      try:
+         return self._execute(command)
+      finally:
+         if self.query_time>0 and command[0].upper() in (b'GRAPH.QUERY',b'GRAPH.RO_QUERY'):
+            remaining = self.query_time - (time.perf_counter() - start)
+            if remaining>0:
+               time.sleep(remaining)
+
+   def _execute(self, command: list[bytes]) -> Any:
+      name = command[0].decode('utf-8').upper()
+      arguments = [argument.decode('utf-8') for argument in command[1:]]
+      with self.lock:
+         self.commands += 1
+         try:
+            match name:
+               case 'GRAPH.QUERY' | 'GRAPH.RO_QUERY':
+                  if len(arguments)<2:
+                     raise _ReplyError("wrong number of arguments for '{}' command".format(name.lower()))
+                  return self._query(arguments[0],arguments[1])
+               case 'GRAPH.CONSTRAINT':
+                  # CREATE graph UNIQUE NODE label PROPERTIES count name ...
+                  if len(arguments)<7 or arguments[0].upper()!='CREATE':
+                     raise _ReplyError('Unsupported constraint command')
+                  self._graph(arguments[1]).create_constraint(arguments[4],tuple(arguments[7:]))
+                  return _Status('PENDING')
+               case 'GRAPH.DELETE':
+                  if self.graphs.pop(arguments[0] if arguments else '',None) is None:
+                     raise _ReplyError('Invalid graph operation on empty key')
+                  return _Status('OK')
+               case 'GRAPH.LIST':
+                  return sorted(self.graphs)
+               case 'PING':
+                  return arguments[0] if arguments else _Status('PONG')
+               case 'ECHO':
+                  return arguments[0]
+               case 'FLUSHALL' | 'FLUSHDB':
+                  self.graphs.clear()
+                  return _Status('OK')
+               case 'CLIENT' | 'AUTH' | 'SELECT' | 'QUIT' | 'READONLY':
+                  return _Status('OK')
+               case 'COMMAND':
+                  return []
+               case 'INFO':
+                  return '# Server\r\nredis_version:7.2.0\r\n'
+               case _:
+                  raise _ReplyError("unknown command '{}'".format(name.lower()))
+         except _ReplyError as err:
+            return err
+         except (QueryError,ValueError) as err:
+            return _ReplyError(str(err))
+
+   def _graph(self, name: str) -> MemoryGraph:
+      graph = self.graphs.get(name)
+      if graph is None:
+         graph = MemoryGraph(name)
+         self.graphs[name] = graph
+      return graph
+
+   def _query(self, graph_name: str, query: str) -> Any:
+      start = time.perf_counter()
+      received = ReceivedQuery(graph_name,query)
+      if self.record:
+         self.queries.append(received)
+      fault = self._fault(query)
+      try:
+         match fault:
+            case 'error':
+               raise _ReplyError('Injected query failure')
+            case 'runtime':
+               # the reply is a result whose last element is the error
+               received.error = 'Injected runtime failure'
+               return [_ReplyError(received.error)]
+            case 'transient':
+               raise _ReplyError('Graph is loading the dataset in memory',prefix='LOADING')
+            case 'disconnect':
+               received.error = 'disconnected'
+               raise _Disconnect()
+         try:
+            statistics = self._graph(graph_name).query(query)
+         except (QueryError,ValueError) as err:
+            raise _ReplyError(str(err)) from err
+      except _ReplyError as err:
+         received.error = str(err)
+         return err
+      elapsed = (time.perf_counter() - start) * 1000
+      return [statistics.lines() + ['Query internal execution time: {:.6f} milliseconds'.format(elapsed)]]
+
+def main():
+   argparser = argparse.ArgumentParser(description='A local stand-in for FalkorDB that runs the loaded queries against in-memory graphs')
+   argparser.add_argument('--host',help='The host to listen on (defaults to 127.0.0.1)',default='127.0.0.1')
+   argparser.add_argument('--port',help='The port to listen on (defaults to 6379)',type=int,default=6379)
+   argparser.add_argument('--latency',help='The delay of each round trip in seconds',type=float,default=0.0)
+   argparser.add_argument('--jitter',help='A random delay of up to this many seconds added to each round trip',type=float,default=0.0)
+   argparser.add_argument('--query-time',help='The minimum time of each query in seconds',type=float,default=0.0)
+   argparser.add_argument('--error-rate',help='The rate of injected query errors',type=float,default=0.0)
+   argparser.add_argument('--runtime-error-rate',help='The rate of injected runtime errors (in the query result)',type=float,default=0.0)
+   argparser.add_argument('--transient-rate',help='The rate of injected transient (LOADING) errors',type=float,default=0.0)
+   argparser.add_argument('--disconnect-rate',help='The rate of dropped connections',type=float,default=0.0)
+   argparser.add_argument('--fail-matching',help='A regular expression for queries that always fail')
+   argparser.add_argument('--seed',help='The random seed of the injected failures and jitter',type=int)
+   args = argparser.parse_args()
+
+   faults = Faults(error_rate=args.error_rate,runtime_error_rate=args.runtime_error_rate,transient_rate=args.transient_rate,disconnect_rate=args.disconnect_rate,fail_matching=args.fail_matching,seed=args.seed)
+   server = StandinServer(host=args.host,port=args.port,latency=args.latency,jitter=args.jitter,query_time=args.query_time,faults=faults,record=False)
+   server.start()
+   print('Listening on {}:{}'.format(*server.address),file=sys.stderr)
+
+   def interrupt(signum, frame):
+      raise KeyboardInterrupt()
+
+   # stops with a summary when terminated too (e.g., as a background process)
+   signal.signal(signal.SIGTERM,interrupt)
+   try:
+      while server.thread.is_alive():
+         server.thread.join(0.5)
+   except KeyboardInterrupt:
+      pass
+   finally:
+      server.stop()
+   for name, graph in sorted(server.graphs.items()):
+      print('{}: {} nodes, {} relationships'.format(name,len(graph.nodes),len(graph.relationships)),file=sys.stderr)
+   print('{} commands in {} round trips on {} connections'.format(server.commands,server.round_trips,server.connections),file=sys.stderr)
+
+if __name__ == '__main__':
+   main()
@@ -0,0 +1,212 @@
+import json
+import random
+import sys
+import time
+from array import array
+from typing import Any, Iterable, Iterator, TextIO
+
+try:
+   import resource
+except ModuleNotFoundError:
+   # not available on Windows
+   resource = None
+
+class StatsHook:
+   # Receives the measurements of a run (e.g., for a metrics pipeline); the
+   # methods do nothing by default.
+
+   def query(self, stats: 'Stats', size: int, seconds: float):
+      # the size (characters) and latency of each query (shared by a pipeline)
+      pass
+
+   def progress(self, stats: 'Stats'):
+      # every interval seconds while items are processed
+      pass
+
+   def finish(self, stats: 'Stats', summary: dict[str,Any]):
+      # once with the summary at the end of the run
+      pass
+
+class ProgressLines(StatsHook):
+   # Writes a progress line per interval and the summary as JSON at the end
+
+   def __init__(self, output: TextIO = sys.stderr, progress: bool = True):
+      self.output = output
+      self.show_progress = progress
+
+   def progress(self, stats: 'Stats'):
+      if not self.show_progress:
+         return
+      elapsed = stats.elapsed()
+      stages = ', '.join('{} {:.1f}s'.format(name,stage.seconds) for name, stage in stats.stages.items())
+      print('{:.1f}s: {} items ({:.0f}/s), {} queries; {}'.format(elapsed,stats.items,stats.items/elapsed if elapsed>0 else 0,stats.query_count,stages),file=self.output)
+
+   def finish(self, stats: 'Stats', summary: dict[str,Any]):
+      print(json.dumps(summary),file=self.output)
+
+class Stage:
+   __slots__ = ('seconds','items')
+
+   def __init__(self):
+      self.seconds = 0.0
+      self.items = 0
+
+def _bucket(size: int) -> int:
+   # the power of two at or above the size
+   return 1 << max(0,(size-1).bit_length())
+
+class Stats:
+   # Measures the time (excluding that of the stages consumed), items, input
+   # bytes, query sizes, sampled query latencies, and peak memory of the stages
+   # of a run. The hooks receive each query, the progress, and the summary.
+
+   def __init__(self, hooks: Iterable[StatsHook] = (), interval: float = 5.0, samples: int = 100000, trace_memory: bool = False):
+      self.hooks = list(hooks)
+      self.interval = interval
+      self.samples = samples
+      self.trace_memory = trace_memory
+      self.stages = {}
+      self.items = 0
+      self.bytes = 0
+      self.query_count = 0
+      self.query_bytes = 0
+      self.sizes = {}
+      self.latencies = array('d')
+      self.latency_count = 0
+      self.random = random.Random(0)
+      self.stack = []
+      self.started = time.perf_counter()
+      self.reported = self.started
+      if trace_memory:
+         import tracemalloc
+         tracemalloc.start()
+
+   def stage(self, name: str) -> Stage:
+      stage = self.stages.get(name)
+      if stage is None:
+         stage = Stage()
+         self.stages[name] = stage
+      return stage
+
+   def elapsed(self) -> float:
+      return time.perf_counter() - self.started
+
+   def timed(self, stream: Iterable[Any], name: str, count: bool = False) -> Iterator[Any]:
+      # adds the time spent producing the items to the stage (and, with count,
+      # counts them as the items of the run)
+      stage = self.stage(name)
+      iterator = iter(stream)
+      stack = self.stack
+      clock = time.perf_counter
+      while True:
+         stack.append(0.0)
+         start = clock()
+         try:
+            item = next(iterator)
+         except StopIteration:
+            self._exit(stage,start,clock())
+            return
+         except BaseException:
+            self._exit(stage,start,clock())
+            raise
+         now = clock()
+         self._exit(stage,start,now)
+         stage.items += 1
+         if count:
+            self.items += 1
+         if now-self.reported>=self.interval:
+            self.reported = now
+            for hook in self.hooks:
+               hook.progress(self)
+         yield item
+
+   def _exit(self, stage: Stage, start: float, end: float):
+      elapsed = end - start
+      stage.seconds += elapsed - self.stack.pop()
+      if len(self.stack)>0:
+         self.stack[-1] += elapsed
+
+   def query_size(self, size: int):
+      # the size of a query (e.g., one that is generated but not sent)
+      self.query_count += 1
+      self.query_bytes += size
+      bucket = _bucket(size)
+      self.sizes[bucket] = self.sizes.get(bucket,0) + 1
+
+   def query(self, size: int, seconds: float):
+      self.query_size(size)
+      self.latency_count += 1
+      if len(self.latencies)<self.samples:
+         self.latencies.append(seconds)
+      else:
+         # a uniform sample of the latencies (reservoir sampling)
+         index = self.random.randrange(self.latency_count)
+         if index<self.samples:
+            self.latencies[index] = seconds
+      for hook in self.hooks:
+         hook.query(self,size,seconds)
+
+   def round_trip(self, sizes: list[int], seconds: float):
+      # the queries of a round trip (its time is added to the query stage)
+      stage = self.stage('query')
+      stage.seconds += seconds
+      stage.items += len(sizes)
+      if len(self.stack)>0:
+         self.stack[-1] += seconds
+      for size in sizes:
+         self.query(size,seconds)
+
+   def percentiles(self, percentiles: Iterable[float] = (50,90,99)) -> dict[str,float]:
+      if len(self.latencies)==0:
+         return {}
+      latencies = sorted(self.latencies)
+      values = {'p{}'.format(int(p) if p==int(p) else p): latencies[min(len(latencies)-1,int(len(latencies)*p/100))] for p in percentiles}
+      values['max'] = latencies[-1]
+      return values
+
+   def memory(self) -> dict[str,int]:
+      memory = {}
+      if resource is not None:
+         peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+         # kilobytes except on macOS
+         memory['peak_rss'] = peak if sys.platform=='darwin' else peak*1024
+      if self.trace_memory:
+         import tracemalloc
+         if tracemalloc.is_tracing():
+            memory['peak_traced'] = tracemalloc.get_traced_memory()[1]
+      return memory
+
+   def summary(self) -> dict[str,Any]:
+      elapsed = self.elapsed()
+      return {
+         'elapsed': elapsed,
+         'items': self.items,
+         'items_per_second': self.items/elapsed if elapsed>0 else 0,
+         'bytes': self.bytes,
+         'bytes_per_second': self.bytes/elapsed if elapsed>0 else 0,
+         'stages': {
+            name: {
+               'seconds': stage.seconds,
+               'items': stage.items,
+               'items_per_second': stage.items/stage.seconds if stage.seconds>0 else 0
+            }
+            for name, stage in self.stages.items()
+         },
+         'queries': {
+            'count': self.query_count,
+            'bytes': self.query_bytes,
+            'sizes': {str(bucket): count for bucket, count in sorted(self.sizes.items())},
+            'latency': self.percentiles()
+         },
+         'memory': self.memory()
+      }
+
+   def finish(self) -> dict[str,Any]:
+      # returns the summary after passing it to the hooks
+      summary = self.summary()
+      for hook in self.hooks:
+         hook.finish(self,summary)
+      if self.trace_memory:
+         import tracemalloc
+         tracemalloc.stop()
+      return summary
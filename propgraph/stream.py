@@ -0,0 +1,100 @@
+import pickle
+import tempfile
+from typing import TextIO, Any, Iterator
+
+import yaml
+
+from .schema import Schema
+from .cypher import NodeItem, EdgeRelationItem, _KeyResolver, _read_schema, _node_item, _node_identity, _node_edges, _read_edges
+
+if yaml.__with_libyaml__:
+   class CStreamLoader(yaml.cyaml.CParser, yaml.composer.Composer, yaml.constructor.Constructor, yaml.resolver.Resolver):
+      # libyaml events with the python composer so that entries can be composed one at a time
+
+      def __init__(self, stream):
+         yaml.cyaml.CParser.__init__(self, stream)
+         yaml.composer.Composer.__init__(self)
+         yaml.constructor.Constructor.__init__(self)
+         yaml.resolver.Resolver.__init__(self)
+
+def _stream_loader(loader: type) -> type:
+   if yaml.__with_libyaml__ and loader is yaml.CLoader:
+      return CStreamLoader
+   return loader
+
+class GraphEventReader:
+   # Composes and constructs each top-level key/value pair of the graph mapping
+   # separately so that only one entry is materialized at a time.
+
+   def __init__(self, source: TextIO, loader: type = yaml.Loader):
+      self.loader = _stream_loader(loader)(source)
+
+   def entries(self) -> Iterator[tuple[Any,Any]]:
+      loader = self.loader
+      try:
+         loader.get_event() # stream start
+         if loader.check_event(yaml.StreamEndEvent):
+            return
+         loader.get_event() # document start
+         if not loader.check_event(yaml.MappingStartEvent):
+            raise ValueError('The graph must be a mapping at the top level')
+         loader.get_event()
+         while not loader.check_event(yaml.MappingEndEvent):
+            key_node = loader.compose_node(None, None)
+            value_node = loader.compose_node(key_node, None)
+            key = loader.construct_object(key_node, deep=True)
+            value = loader.construct_object(value_node, deep=True)
+            # only the composed anchors are retained between entries
+            loader.constructed_objects = {}
+            loader.recursive_objects = {}
+            yield key, value
+      finally:
+         loader.dispose()
+
+def _spilled(spill) -> Iterator[Any]:
+   spill.seek(0)
+   while True:
+      try:
+         yield pickle.load(spill)
+      except EOFError:
+         return
+
+def read_yaml_stream(source: TextIO, location: str = None, schema: Schema = None, infer: bool = False, default_key: str = "@id", loader: type = yaml.Loader) -> Iterator[Schema | NodeItem | EdgeRelationItem]:
+   # only the node identities (labels & key values) are kept for edge
+   # resolution; the edge specifications are spilled to a temporary file until
+   # all the nodes have been read
+   identities = {}
+   keys_for = _KeyResolver(schema, infer=infer, default_key=default_key)
+   node_count = 0
+   with tempfile.TemporaryFile(prefix='propgraph-') as spill:
+      def spill_edges(*edges):
+         for edge in edges:
+            pickle.dump(edge, spill, protocol=pickle.HIGHEST_PROTOCOL)
+
+      for id, node in GraphEventReader(source, loader=loader).entries():
+         if id == '~schema':
+            if schema is not None:
+               continue
+            if node_count>0:
+               raise ValueError('The ~schema key must precede all nodes when streaming')
+            schema = _read_schema(node, location)
+            if schema is not None:
+               keys_for = _KeyResolver(schema, infer=infer, default_key=default_key)
+               yield schema
+            continue
+         if id == '~edges':
+            spill_edges((node,None,None))
+            continue
+         if id[0] == ':':
+            spill_edges((node,id[1:],None))
+         if id[0] == '~':
+            continue
+
+         spill_edges(*_node_edges(id, node))
+
+         identities[id] = _node_identity(node, keys_for, infer=infer)
+         node_count += 1
+
+         yield _node_item(node, keys_for, infer=infer)
+
+      yield from _read_edges(_spilled(spill), identities.get, keys_for.intern)
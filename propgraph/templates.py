@@ -0,0 +1,114 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from io import StringIO
+from typing import Any, Callable
+
+from .items import NodeItem, EdgeRelationItem
+
+def _labels_expr(labels) -> str:
+   return ':' + ':'.join(labels) if len(labels)>0 else ''
+
+@dataclass
+class QueryTemplate:
+   query: str
+   extract: Callable[[Any],dict[str,Any]]
+
+def _key_extractor(names: tuple[str,...], parameters: tuple[str,...], message: str) -> Callable[[dict[str,Any],dict[str,Any]],None]:
+   pairs = tuple(zip(names,parameters))
+   def extract(values: dict[str,Any], target: dict[str,Any]):
+      for name, parameter in pairs:
+         value = values.get(name)
+         if value is None:
+            raise ValueError(message.format(property=name))
+         target[parameter] = value
+   return extract
+
+def _node_template(labels: tuple[str,...], keys: tuple[str,...], merge: bool) -> QueryTemplate:
+   q = StringIO()
+   parameters = tuple('k{}'.format(index) for index in range(len(keys)))
+   if merge:
+      q.write('MERGE (n{labels}'.format(labels=_labels_expr(labels)))
+      if len(keys)>0:
+         q.write(' {' + ', '.join(f'`{key}`: ${parameter}' for key, parameter in zip(keys,parameters)) + '}')
+      q.write(')')
+   else:
+      q.write('CREATE (n{labels})'.format(labels=_labels_expr(labels)))
+   q.write('\n SET n = $properties\n')
+
+   extract_keys = _key_extractor(keys if merge else (),parameters,'Node is missing id property {property}')
+   def extract(node: NodeItem) -> dict[str,Any]:
+      values = {'properties':node.properties}
+      extract_keys(node.properties,values)
+      return values
+
+   return QueryTemplate(q.getvalue(),extract)
+
+def _edge_template(labels: tuple[str,...], from_labels: tuple[str,...], from_keys: tuple[str,...], to_labels: tuple[str,...], to_keys: tuple[str,...], directed: bool, has_properties: bool) -> QueryTemplate:
+   q = StringIO()
+   extractors = []
+   for label, node_labels, keys in [('from',from_labels,from_keys),('to',to_labels,to_keys)]:
+      parameters = tuple('{}{}'.format(label,index) for index in range(len(keys)))
+      q.write('MERGE ({label}{labels}'.format(label=label,labels=_labels_expr(node_labels)))
+      q.write(' {' + ', '.join(f'`{key}`: ${parameter}' for key, parameter in zip(keys,parameters)) + '})\n')
+      extractors.append(_key_extractor(keys,parameters,'Node does not have id property {property} value'))
+   q.write('MERGE (from)-[r{labels}]-{directed}(to)'.format(labels=_labels_expr(labels),directed='>' if directed else ''))
+   if has_properties:
+      q.write('\n SET r = $properties\n')
+
+   extract_from, extract_to = extractors
+   def extract(relation: EdgeRelationItem) -> dict[str,Any]:
+      values = {'properties':relation.properties} if has_properties else {}
+      extract_from(relation.from_node,values)
+      extract_to(relation.to_node,values)
+      return values
+
+   return QueryTemplate(q.getvalue(),extract)
+
+class TemplateCache:
+   # Parameterized queries keyed by the item shape (labels, key names, and
+   # direction) so the query text is built once per shape and is identical
+   # for every item of that shape.
+
+   def __init__(self, maxsize: int = 1024):
+      self.maxsize = maxsize
+      self.templates = OrderedDict()
+      self.hits = 0
+      self.misses = 0
+
+   def clear(self):
+      self.templates.clear()
+      self.hits = 0
+      self.misses = 0
+
+   def get(self, item: NodeItem | EdgeRelationItem, merge: bool = True) -> QueryTemplate:
+      match item:
+         case NodeItem():
+            shape = ('node',merge,tuple(sorted(item.labels)),tuple(sorted(item.keys)))
+         case EdgeRelationItem():
+            shape = (
+               'edge',
+               tuple(sorted(item.labels)),
+               tuple(sorted(item.from_labels)),tuple(sorted(item.from_node.keys())),
+               tuple(sorted(item.to_labels)),tuple(sorted(item.to_node.keys())),
+               item.directed,
+               len(item.properties)>0
+            )
+         case _:
+            raise ValueError('Unsupported item type {}'.format(type(item).__name__))
+      template = self.templates.get(shape)
+      if template is not None:
+         self.hits += 1
+         self.templates.move_to_end(shape)
+         return template
+      self.misses += 1
+      template = _node_template(shape[2],shape[3],merge) if shape[0]=='node' else _edge_template(*shape[1:])
+      self.templates[shape] = template
+      if len(self.templates)>self.maxsize:
+         self.templates.popitem(last=False)
+      return template
+
+   def query(self, item: NodeItem | EdgeRelationItem, merge: bool = True) -> tuple[str,dict[str,Any]]:
+      template = self.get(item,merge=merge)
+      return (template.query,template.extract(item))
+
+template_cache = TemplateCache()
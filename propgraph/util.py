@@ -11,6 +11,11 @@ def quote_string(v : str):
     return '"{}"'.format(v)
 
 
+def quote_name(name) -> str:
+    # a parameter name or map key as a Cypher identifier
+    return '`' + str(name).replace('`', '``') + '`'
+
+
 def stringify_param_value(value):
     if isinstance(value, str):
         return quote_string(value)
@@ -19,6 +24,20 @@ def stringify_param_value(value):
     elif isinstance(value, (list, tuple)):
         return f'[{",".join(map(stringify_param_value, value))}]'
     elif isinstance(value, dict):
-        return f'{{{",".join(f"{k}:{stringify_param_value(v)}" for k, v in value.items())}}}'
+        return f'{{{",".join(f"{quote_name(k)}:{stringify_param_value(v)}" for k, v in value.items())}}}'
     else:
-        return str(value)
\ No newline at end of file
+        return str(value)
+
+def yaml_loader(mode : str = 'auto') -> type:
+    import yaml
+    match mode:
+        case 'auto':
+            return yaml.CLoader if yaml.__with_libyaml__ else yaml.Loader
+        case 'c':
+            if not yaml.__with_libyaml__:
+                raise ValueError('The C YAML loader is not available (pyyaml was built without libyaml)')
+            return yaml.CLoader
+        case 'python':
+            return yaml.Loader
+        case _:
+            raise ValueError('Unrecognized YAML loader {}'.format(mode))
@@ -0,0 +1,245 @@
+import hashlib
+import itertools
+import pickle
+import tempfile
+import time
+from dataclasses import dataclass, field
+from typing import Any, Iterable, Iterator
+
+from .items import NodeItem, EdgeRelationItem
+from .schema import Schema
+
+DATATYPES = {
+   'int': int,
+   'integer': int,
+   'long': int,
+   'float': (int,float),
+   'double': (int,float),
+   'string': str,
+   'bool': bool,
+   'boolean': bool,
+}
+
+@dataclass
+class ValidationIssue:
+   kind: str
+   item: int
+   message: str
+
+@dataclass
+class ValidationReport:
+   source: str | None = None
+   nodes: int = 0
+   edges: int = 0
+   counts: dict[str,int] = field(default_factory=dict)
+   issues: list[ValidationIssue] = field(default_factory=list)
+   elapsed: float = 0.0
+
+   @property
+   def items(self) -> int:
+      return self.nodes + self.edges
+
+   @property
+   def throughput(self) -> float:
+      return self.items/self.elapsed if self.elapsed>0 else 0.0
+
+   @property
+   def valid(self) -> bool:
+      return len(self.counts)==0
+
+   def to_dict(self) -> dict[str,Any]:
+      return {
+         'source': self.source,
+         'nodes': self.nodes,
+         'edges': self.edges,
+         'counts': self.counts,
+         'issues': [{'kind':issue.kind,'item':issue.item,'message':issue.message} for issue in self.issues],
+         'elapsed': self.elapsed,
+         'throughput': self.throughput
+      }
+
+class GraphValidator:
+   # Checks the referential integrity of a graph in one pass. Nodes are indexed
+   # by an 8 byte digest of their key names and values (or the key tuple itself
+   # when hashed is false) mapped to the interned label set ids of the nodes
+   # with that key (a tuple when nodes with different labels share it). An
+   # edge endpoint resolves to a node with its key and (at least) its labels
+   # or, without labels, to any node with its key. Endpoints that do not
+   # resolve are kept until the end as the node may appear later. Beyond
+   # `max_pending`, the endpoints resolved since are dropped and the rest are
+   # spilled to a temporary file.
+
+   def __init__(self, schema: Schema | None = None, source: str | None = None, max_issues: int = 1000, hashed: bool = True, max_pending: int | None = 100000, directory: str | None = None):
+      self.schema = schema
+      self.max_issues = max_issues
+      self.hashed = hashed
+      self.max_pending = max_pending
+      self.directory = directory
+      self.report = ValidationReport(source)
+      self.label_ids = {}
+      self.label_sets = []
+      self.keys = {}
+      self.loose_keys = {}
+      self.key_types = {}
+      self.pending = []
+      self.spill = None
+      self.started = None
+
+   def _digest(self, key: tuple) -> Any:
+      if not self.hashed:
+         return key
+      return int.from_bytes(hashlib.blake2b(repr(key).encode('utf-8'),digest_size=8).digest(),'little')
+
+   def _label_id(self, labels: set[str]) -> int:
+      label_set = frozenset(labels)
+      label_id = self.label_ids.get(label_set)
+      if label_id is None:
+         label_id = len(self.label_ids)
+         self.label_ids[label_set] = label_id
+         self.label_sets.append(label_set)
+      return label_id
+
+   def _add_key(self, keys: dict[Any,Any], key: Any, label_id: int) -> bool:
+      # false when a node with the key and labels exists
+      found = keys.get(key)
+      if found is None:
+         keys[key] = label_id
+      elif type(found)==int:
+         if found==label_id:
+            return False
+         keys[key] = (found,label_id)
+      elif label_id in found:
+         return False
+      else:
+         keys[key] = found + (label_id,)
+      return True
+
+   def _resolves(self, keys: dict[Any,Any], key: Any, labels: frozenset[str]) -> bool:
+      found = keys.get(key)
+      if found is None:
+         return False
+      if len(labels)==0:
+         return True
+      label_sets = self.label_sets
+      return any(labels<=label_sets[label_id] for label_id in ((found,) if type(found)==int else found))
+
+   def _issue(self, kind: str, number: int, message: str):
+      self.report.counts[kind] = self.report.counts.get(kind,0) + 1
+      if len(self.report.issues)<self.max_issues:
+         self.report.issues.append(ValidationIssue(kind,number,message))
+
+   def _types(self, label_set: frozenset[str]) -> dict[str,Any]:
+      types = self.key_types.get(label_set)
+      if types is None:
+         types = {}
+         found = self.schema.find(*label_set) if self.schema is not None and len(label_set)>0 else []
+         if len(found)>0:
+            for name, datatype, _ in found[0].properties.values():
+               datatype = DATATYPES.get(datatype.lower()) if datatype is not None else None
+               if datatype is not None:
+                  types[name] = datatype
+         self.key_types[label_set] = types
+      return types
+
+   def _keys(self, names: tuple[str,...], values: tuple) -> tuple[Any,Any]:
+      return (self._digest((names,values)),self._digest((names,tuple(map(str,values)))))
+
+   def add_node(self, number: int, node: NodeItem):
+      self.report.nodes += 1
+      label_id = self._label_id(node.labels)
+      names = tuple(sorted(node.keys))
+      values = tuple(node.properties.get(name) for name in names)
+      for name, value in zip(names,values):
+         if value is None:
+            self._issue('missing-key',number,'Node {} is missing key property {}.'.format(':'.join(sorted(node.labels)),name))
+            return
+      types = self._types(frozenset(node.labels))
+      for name, value in zip(names,values):
+         datatype = types.get(name)
+         if datatype is not None and (not isinstance(value,datatype) or (datatype is int and isinstance(value,bool))):
+            self._issue('key-type',number,'Node key {} has value {} which is not of the schema type.'.format(name,repr(value)))
+      key, loose_key = self._keys(names,values)
+      if not self._add_key(self.keys,key,label_id):
+         self._issue('duplicate',number,'Duplicate node {} with keys {}.'.format(':'.join(sorted(node.labels)),dict(zip(names,values))))
+         return
+      self._add_key(self.loose_keys,loose_key,label_id)
+
+   def _pending(self, key: Any, labels: frozenset[str]) -> bool:
+      if key is None:
+         return labels not in self.label_ids
+      return not self._resolves(self.keys,key,labels)
+
+   def _spill_pending(self):
+      self.pending = [endpoint for endpoint in self.pending if self._pending(endpoint[1],endpoint[4])]
+      if len(self.pending)<=self.max_pending//2:
+         return
+      if self.spill is None:
+         self.spill = tempfile.TemporaryFile(prefix='propgraph-',dir=self.directory)
+      for endpoint in self.pending:
+         pickle.dump(endpoint,self.spill,protocol=pickle.HIGHEST_PROTOCOL)
+      self.pending = []
+
+   def _spilled(self) -> Iterator[tuple]:
+      if self.spill is None:
+         return
+      try:
+         self.spill.seek(0)
+         while True:
+            try:
+               yield pickle.load(self.spill)
+            except EOFError:
+               break
+      finally:
+         self.spill.close()
+         self.spill = None
+
+   def add_edge(self, number: int, edge: EdgeRelationItem):
+      self.report.edges += 1
+      for ids, labels in [(edge.from_node,edge.from_labels),(edge.to_node,edge.to_labels)]:
+         if len(ids)>0:
+            names = tuple(sorted(ids.keys()))
+            key, loose_key = self._keys(names,tuple(ids[name] for name in names))
+            if not self._resolves(self.keys,key,frozenset(labels)):
+               self.pending.append((number,key,loose_key,ids,frozenset(labels)))
+         elif frozenset(labels) not in self.label_ids:
+            self.pending.append((number,None,frozenset(labels),ids,frozenset(labels)))
+      if self.max_pending is not None and len(self.pending)>self.max_pending:
+         self._spill_pending()
+
+   def add(self, number: int, item: Any):
+      if self.started is None:
+         self.started = time.perf_counter()
+      match item:
+         case Schema():
+            if self.schema is None:
+               self.schema = item
+         case NodeItem():
+            self.add_node(number,item)
+         case EdgeRelationItem():
+            self.add_edge(number,item)
+
+   def finish(self) -> ValidationReport:
+      for number, key, loose_key, ids, labels in itertools.chain(self._spilled(),self.pending):
+         if key is None:
+            if labels not in self.label_ids:
+               self._issue('undefined-labels',number,'Undefined node with labels {}.'.format(':'.join(sorted(labels))))
+         elif self._resolves(self.keys,key,labels):
+            continue
+         elif self._resolves(self.loose_keys,loose_key,labels):
+            self._issue('key-type',number,'Node with properties {} differs in key type from the node it references.'.format(str(ids)))
+         else:
+            self._issue('dangling',number,'Undefined node {} with properties {}.'.format(':'.join(sorted(labels)),str(ids)))
+      self.pending = []
+      if self.started is not None:
+         self.report.elapsed = time.perf_counter() - self.started
+      return self.report
+
+   def validate(self, stream: Iterable[Any]) -> ValidationReport:
+      if self.started is None:
+         self.started = time.perf_counter()
+      for number, item in enumerate(stream,start=1):
+         self.add(number,item)
+      return self.finish()
+
+def validate_graph(stream: Iterable[Any], schema: Schema | None = None, source: str | None = None, max_issues: int = 1000, hashed: bool = True, max_pending: int | None = 100000, directory: str | None = None) -> ValidationReport:
+   return GraphValidator(schema=schema,source=source,max_issues=max_issues,hashed=hashed,max_pending=max_pending,directory=directory).validate(stream)
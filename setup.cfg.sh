@@ -37,4 +37,8 @@ redis =
    redis
 falkordb =
    FalkorDB
+numpy =
+   numpy
+benchmark =
+   pytest-benchmark
 EOF
@@ -0,0 +1,70 @@
+import asyncio
+
+import pytest
+
+class FakePipeline:
+
+   def __init__(self, connection):
+      self.connection = connection
+      self.commands = []
+
+   def execute_command(self, *args):
+      self.commands.append(args)
+
+   def execute(self, raise_on_error=True):
+      self.connection.round_trips += 1
+      results = []
+      for command in self.commands:
+         try:
+            results.append(self.connection.run(command))
+         except Exception as err:
+            results.append(err)
+      return results
+
+class FakeConnection:
+   # records the commands and fails the queries containing `fail_on`
+
+   def __init__(self, fail_on=None, error='Invalid query'):
+      self.fail_on = fail_on
+      self.error = error
+      self.commands = []
+      self.round_trips = 0
+
+   @property
+   def queries(self):
+      return [command[2] for command in self.commands]
+
+   def run(self, command):
+      self.commands.append(command)
+      if self.fail_on is not None and self.fail_on in command[2]:
+         raise ValueError(self.error)
+      return []
+
+   def execute_command(self, *args):
+      self.round_trips += 1
+      return self.run(args)
+
+   def pipeline(self, transaction=True):
+      return FakePipeline(self)
+
+class FakeAsyncConnection:
+
+   def __init__(self, fail_on=None):
+      self.fail_on = fail_on
+      self.active = 0
+      self.max_active = 0
+      self.events = []
+
+   async def execute_command(self, *args):
+      self.active += 1
+      self.max_active = max(self.max_active,self.active)
+      self.events.append(('start',args[2]))
+      await asyncio.sleep(0.01 if 'MERGE (n' in args[2] else 0)
+      self.active -= 1
+      self.events.append(('end',args[2]))
+      if self.fail_on is not None and self.fail_on in args[2]:
+         raise ValueError('Invalid query')
+
+@pytest.fixture
+def connection():
+   return FakeConnection()
@@ -91,3 +91,37 @@ def test_read_graph_with_schema(graph_a) -> None:
 def test_read_graph_with_default_key(graph_a) -> None:
    for item_a, item_b in zip(read_graph(graph_a,infer=True,default_key='id'),GRAPH_A_STREAM_SCHEMA):
       assert item_a==item_b, f'With default_key - item not equal: {item_a}!={item_b}'
+
+def test_read_graph_stream(graph_a) -> None:
+   items = list(read_graph(GRAPH_A,stream=True))
+   assert len(items)==len(GRAPH_A_STREAM_NO_INFER)
+   for item_a, item_b in zip(items,GRAPH_A_STREAM_NO_INFER):
+      assert item_a==item_b, f'Stream - item not equal: {item_a}!={item_b}'
+
+   schema = generate_schema({'Component'},{'':'id'})
+   for item_a, item_b in zip(read_graph(GRAPH_A,schema=schema,stream=True),GRAPH_A_STREAM_SCHEMA):
+      assert item_a==item_b, f'Stream with schema - item not equal: {item_a}!={item_b}'
+
+def test_read_graph_stream_schema_order() -> None:
+   with pytest.raises(ValueError):
+      list(read_graph('A:\n id: 1\n~schema: "(:A {id})"\n',stream=True))
+
+@pytest.mark.parametrize('stream',[False,True])
+def test_read_graph_loaders(stream) -> None:
+   if not yaml.__with_libyaml__:
+      pytest.skip('pyyaml was built without libyaml')
+   python_items = list(read_graph(GRAPH_A,loader='python',stream=stream))
+   c_items = list(read_graph(GRAPH_A,loader='c',stream=stream))
+   assert python_items==c_items
+   assert python_items==GRAPH_A_STREAM_NO_INFER
+
+@pytest.mark.parametrize('stream',[False,True])
+def test_read_graph_shared_identity(stream) -> None:
+   items = list(read_graph(GRAPH_A if stream else yaml.load(GRAPH_A,Loader=yaml.Loader),stream=stream))
+   nodes, edges = items[:3], items[3:]
+   assert nodes[0].labels is nodes[1].labels
+   assert edges[0].from_node is edges[1].from_node
+   assert edges[0].to_node is edges[2].to_node
+   assert edges[0].from_labels is nodes[0].labels
+   assert dict(edges[0].to_node)=={'id': 'B', 'use': 6, 'name': 'Component B'}
+   assert not hasattr(nodes[0],'__dict__')
@@ -0,0 +1,66 @@
+import pytest
+
+from propgraph import read_graph, graph_to_cypher, NodeItem, EdgeRelationItem
+from propgraph.batch import batch_items, cypher_for_batch
+
+GRAPH = """
+~schema: |
+  'Components and modules'
+  (:Component {id})
+  (:Module {id})
+A:
+ ~label: Component
+ id: 'A'
+ name: 'Component A'
+ ~edges:
+ - ~to: B
+   ~label: imports
+ - ~to: M
+   ~label: contains
+   weight: 2
+B:
+ ~label: Component
+ id: 'B'
+ use: 6
+M:
+ ~label: Module
+ id: 'M'
+C:
+ ~label: Component
+ id: 'C'
+"""
+
+def test_batch_items_by_shape() -> None:
+   batches = list(batch_items(read_graph(GRAPH),batch_size=100))
+   assert [len(batch) for batch in batches]==[2,1,1,1,1]
+   assert [len(batch) for batch in batch_items(read_graph(GRAPH),batch_size=1)]==[1]*6
+
+@pytest.mark.parametrize('exact,use_parameters,op',[(False,False,'+='),(True,False,'='),(False,True,'=')])
+def test_graph_to_cypher_batched(exact,use_parameters,op) -> None:
+   queries = list(graph_to_cypher(read_graph(GRAPH),exact=exact,use_parameters=use_parameters,batch_size=100))
+   assert len(queries)==5
+   query = queries[0]
+   if use_parameters:
+      query, parameters = query
+      assert [row['keys'] for row in parameters['rows']]==[{'id':'A'},{'id':'B'}]
+   else:
+      assert "'Component A'" in query
+   assert query.startswith('UNWIND $rows AS row\n' if use_parameters else 'UNWIND [')
+   assert 'MERGE (n:Component {`id`: row.`keys`.`id`})' in query
+   assert f'SET n {op} row.`properties`' in query
+
+def test_cypher_for_batch_edges() -> None:
+   edge = EdgeRelationItem({'contains'},{'Component'},{'id':'A'},{'Module'},{'id':'M'},True,{'weight':2})
+   query, parameters = cypher_for_batch([edge,edge],use_parameters=True)
+   assert query.splitlines()==[
+      'UNWIND $rows AS row',
+      'MERGE (from:Component {`id`: row.`from`.`id`})',
+      'MERGE (to:Module {`id`: row.`to`.`id`})',
+      'MERGE (from)-[r:contains]->(to)',
+      ' SET r = row.`properties`'
+   ]
+   assert parameters['rows'][0]=={'from':{'id':'A'},'to':{'id':'M'},'properties':{'weight':2}}
+
+def test_cypher_for_batch_missing_key() -> None:
+   with pytest.raises(ValueError):
+      cypher_for_batch([NodeItem({'Component'},{'id'},{'name':'A'})])
@@ -0,0 +1,77 @@
+import csv
+
+import pytest
+
+from propgraph import read_graph
+from propgraph.items import NodeItem, EdgeRelationItem
+from propgraph.bulkexport import bulk_export, bulk_arguments, bulk_value
+
+GRAPH = """
+A:
+ ~label: Component
+ id: 'A'
+ ~edges:
+ - ~to: B
+   ~label: imports
+   weight: 2
+ - ~to: C
+   ~label: imports
+B:
+ ~label: Component
+ id: 'B'
+ size: 10
+C:
+ ~label: [Component, Module]
+ id: 'C'
+ tags: [x, y]
+"""
+
+def read_rows(path):
+   with open(path,newline='') as input:
+      return list(csv.reader(input))
+
+def test_bulk_export(tmp_path) -> None:
+   exporter = bulk_export(read_graph(GRAPH),str(tmp_path))
+   assert (exporter.nodes,exporter.edges,exporter.missing)==(3,2,0)
+   files = {name: path for _, name, path in exporter.files}
+   assert read_rows(files['Component'])==[['_id:ID','id:STRING','size:INT'],['0','A',''],['1','B','10']]
+   assert read_rows(files['Component:Module'])==[['_id:ID','id:STRING','tags:ARRAY'],['2','C',"['x', 'y']"]]
+   assert read_rows(files['imports'])==[[':START_ID',':END_ID','weight:INT'],['0','1','2'],['0','2','']]
+   assert bulk_arguments('test',exporter.files)[:4]==['test','--enforce-schema','--nodes-with-label','Component']
+   # only the output files remain
+   assert sorted(path.name for path in tmp_path.iterdir())==['nodes','relations']
+
+def test_bulk_export_spill(tmp_path) -> None:
+   # edges are resolved after all the nodes and the spill files are reopened
+   labels = [frozenset({'L{}'.format(index)}) for index in range(4)]
+   items = [EdgeRelationItem(frozenset({'next'}),labels[0],{'id':0},frozenset(),{'id':3},True,{})]
+   items += [NodeItem(labels[index % 4],frozenset({'id'}),{'id':index}) for index in range(8)]
+   items.append(EdgeRelationItem(frozenset({'next'}),labels[0],{'id':0},labels[1],{'id':100},True,{}))
+   exporter = bulk_export(items,str(tmp_path),max_open_files=2)
+   assert (exporter.nodes,exporter.edges,exporter.missing,exporter.duplicates)==(8,1,1,0)
+   files = {name: path for _, name, path in exporter.files}
+   assert read_rows(files['L3'])==[['_id:ID','id:INT'],['3','3'],['7','7']]
+   assert read_rows(files['next'])==[[':START_ID',':END_ID'],['0','3']]
+
+def test_bulk_export_errors(tmp_path) -> None:
+   node = NodeItem(frozenset({'A'}),frozenset({'id'}),{'id':1})
+   exporter = bulk_export([node,NodeItem(node.labels,node.keys,{'id':1,'name':'duplicate'})],str(tmp_path))
+   assert exporter.duplicates==1
+   with pytest.raises(ValueError):
+      bulk_export([NodeItem(frozenset(),frozenset({'id'}),{'id':1})],str(tmp_path))
+
+def test_bulk_export_types(tmp_path) -> None:
+   # strings that look like numbers or booleans stay strings
+   items = [
+      NodeItem(frozenset({'A'}),frozenset({'id'}),{'id':'007','flag':'true','size':1}),
+      NodeItem(frozenset({'A'}),frozenset({'id'}),{'id':'008','flag':True,'size':1.5,'on':False}),
+   ]
+   exporter = bulk_export(items,str(tmp_path))
+   [(_, _, path)] = exporter.files
+   assert read_rows(path)==[['_id:ID','id:STRING','flag:STRING','size:DOUBLE','on:BOOLEAN'],['0','007','true','1',''],['1','008','true','1.5','false']]
+
+def test_bulk_value() -> None:
+   assert bulk_value(True)=='true'
+   assert bulk_value(None)==''
+   assert bulk_value(1.5)=='1.5'
+   assert bulk_value(['a',1,False])=="['a', 1, False]"
@@ -0,0 +1,100 @@
+import asyncio
+
+import pytest
+
+from propgraph import read_graph
+from propgraph.checkpoint import Checkpoint
+from propgraph.loader import GraphLoader, LoadError, load_requests, load_graph
+
+from conftest import FakeConnection, FakeAsyncConnection
+from test_loader import GRAPH
+
+def load(source, checkpoint_path, connection, resume, pipeline=1):
+   with Checkpoint(checkpoint_path) as checkpoint:
+      position = checkpoint.track(source,resume=resume)
+      if position.complete:
+         return position
+      with open(source,'r') as input:
+         try:
+            with GraphLoader(connection,'test',pipeline=pipeline,on_commit=position.commit) as loader:
+               for request in load_requests(read_graph(input),skip=position.committed):
+                  loader.submit(request)
+         finally:
+            checkpoint.flush()
+      position.finish()
+      return position
+
+@pytest.mark.parametrize('pipeline',[1,10])
+def test_resume(tmp_path,pipeline) -> None:
+   source = tmp_path / 'graph.yaml'
+   source.write_text(GRAPH)
+   checkpoint_path = str(tmp_path / 'test.checkpoint')
+   failing = FakeConnection(fail_on="'C'")
+   with pytest.raises(LoadError):
+      load(str(source),checkpoint_path,failing,resume=False,pipeline=pipeline)
+
+   with Checkpoint(checkpoint_path) as checkpoint:
+      assert checkpoint.track(str(source),resume=True).committed==2
+
+   connection = FakeConnection()
+   position = load(str(source),checkpoint_path,connection,resume=True)
+   assert position.complete
+   # only item 3 (node C) and the edge are loaded again
+   assert len(connection.commands)==2 and "'C'" in connection.commands[0][2]
+
+   connection = FakeConnection()
+   load(str(source),checkpoint_path,connection,resume=True)
+   assert len(connection.commands)==0
+
+   # without resuming, the load starts over
+   load(str(source),checkpoint_path,connection,resume=False)
+   assert len(connection.commands)==4
+
+def test_changed_source(tmp_path) -> None:
+   source = tmp_path / 'graph.yaml'
+   source.write_text(GRAPH)
+   checkpoint_path = str(tmp_path / 'test.checkpoint')
+   with Checkpoint(checkpoint_path) as checkpoint:
+      checkpoint.track(str(source))
+   source.write_text(GRAPH + 'D:\n ~label: Component\n id: D\n')
+   with Checkpoint(checkpoint_path) as checkpoint:
+      with pytest.raises(ValueError):
+         checkpoint.track(str(source),resume=True)
+
+class Committed:
+
+   def __init__(self, end):
+      self.end = end
+
+def test_commit_is_recorded(tmp_path) -> None:
+   source = tmp_path / 'graph.yaml'
+   source.write_text(GRAPH)
+   checkpoint_path = str(tmp_path / 'test.checkpoint')
+   # every commit is recorded unless an interval is given
+   for interval, recorded in [(0.0,3),(60.0,0)]:
+      with Checkpoint(checkpoint_path,interval=interval) as checkpoint:
+         checkpoint.track(str(source)).commit(Committed(3))
+         with Checkpoint(checkpoint_path) as reader:
+            assert reader.track(str(source),resume=True).committed==recorded
+
+def test_fingerprint(tmp_path) -> None:
+   from propgraph.checkpoint import source_fingerprint
+   # a change anywhere in a large file (and not only at its ends) is detected
+   source = tmp_path / 'large.bin'
+   content = bytearray(3 << 20)
+   source.write_bytes(content)
+   before = source_fingerprint([str(source)])
+   content[len(content) // 2] = 1
+   source.write_bytes(content)
+   assert source_fingerprint([str(source)])!=before
+
+def test_async_commit_order() -> None:
+   # the node queries complete out of order but are committed in order
+   committed = []
+   connection = FakeAsyncConnection(fail_on='imports')
+   with pytest.raises(LoadError):
+      asyncio.run(load_graph(read_graph(GRAPH),connection,concurrency=3,on_commit=lambda request: committed.append(request.end)))
+   assert committed==[1,2,3]
+   committed = []
+   asyncio.run(load_graph(read_graph(GRAPH),FakeAsyncConnection(),concurrency=3,skip=2,on_commit=lambda request: committed.append(request.end)))
+   assert committed==[3,4]
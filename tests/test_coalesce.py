@@ -0,0 +1,64 @@
+import pytest
+
+from propgraph import read_graph, NodeItem, EdgeRelationItem
+from propgraph.coalesce import Coalescer, coalesce
+
+FIRST = """
+A:
+ ~label: Component
+ id: 'A'
+ name: 'first'
+ ~edges:
+ - ~to: B
+   ~label: imports
+B:
+ ~label: Component
+ id: 'B'
+"""
+
+SECOND = """
+A:
+ ~label: Component
+ id: 'A'
+ name: 'second'
+ use: 3
+ ~edges:
+ - ~to: B
+   ~label: imports
+   weight: 2
+B:
+ ~label: Component
+ id: 'B'
+C:
+ ~label: Module
+ id: 'A'
+"""
+
+def items() -> list:
+   return [item for source in [FIRST,SECOND] for item in read_graph(source,infer=True,default_key='id')]
+
+@pytest.mark.parametrize('policy,name',[('last','second'),('first','first'),('union',['first','second'])])
+def test_coalesce(policy,name) -> None:
+   coalesced = list(coalesce(items(),policy=policy))
+   assert [type(item) for item in coalesced]==[NodeItem,NodeItem,NodeItem,EdgeRelationItem]
+   assert coalesced[0].properties=={'id':'A','name':name,'use':3}
+   # a node with other labels is another node
+   assert coalesced[2].labels==frozenset(['Module'])
+   assert coalesced[3].properties=={'weight':2}
+
+def test_conflict() -> None:
+   with pytest.raises(ValueError):
+      list(coalesce(items(),policy='error'))
+   combined = list(coalesce(items(),policy=lambda name, current, value: current + '+' + value))
+   assert combined[0].properties['name']=='first+second'
+
+def test_spill(tmp_path) -> None:
+   coalescer = Coalescer(max_entities=1,partitions=3,directory=str(tmp_path))
+   for item in items():
+      coalescer.add(item)
+   assert coalescer.spilled
+   coalesced = list(coalescer.entities())
+   assert len(coalesced)==4 and coalescer.merged==3
+   assert [type(item) for item in coalesced].index(EdgeRelationItem)==3
+   assert next(item for item in coalesced if item.labels==frozenset(['Component']) and item.properties['id']=='A').properties['name']=='second'
+   assert list(tmp_path.iterdir())==[]
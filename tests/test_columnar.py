@@ -0,0 +1,101 @@
+import pytest
+
+from propgraph import read_graph, read_graph_batches, graph_to_cypher, NodeBatch, EdgeBatch
+from propgraph.columnar import columnar_batches, batch_rows, column
+from propgraph.loader import load_requests
+
+GRAPH = """
+~schema: |
+  'Components and modules'
+  (:Component {id})
+  (:Module {id})
+A:
+ ~label: Component
+ id: 'A'
+ use: 12
+ ~edges:
+ - ~to: B
+   ~label: imports
+ - ~to: M
+   ~label: contains
+   weight: 2
+B:
+ ~label: Component
+ id: 'B'
+ name: 'Component B'
+ use: 6
+M:
+ ~label: Module
+ id: 'M'
+C:
+ ~label: Component
+ id: 'C'
+ use: 1
+~edges:
+ - ~from: C
+   ~to: B
+   ~label: imports
+"""
+
+def test_batches_by_shape() -> None:
+   batches = list(read_graph_batches(GRAPH,batch_size=2))
+   assert [(type(batch).__name__,len(batch)) for batch in batches]==[
+      ('NodeBatch',2),('NodeBatch',1),('NodeBatch',1),
+      ('EdgeBatch',2),('EdgeBatch',1)
+   ]
+   components = batches[0]
+   assert components.labels==frozenset(['Component'])
+   assert components.keys==('id',)
+   assert list(components.columns['id'])==['A','B']
+   assert list(components.columns['name'])==[None,'Component B']
+   imports = batches[3]
+   assert [imports.nodes.key(id) for id in imports.source]==[{'id':'A'},{'id':'C'}]
+   assert [imports.nodes.key(id) for id in imports.target]==[{'id':'B'},{'id':'B'}]
+   assert list(batches[4].columns['weight'])==[2]
+
+def test_nodes_before_edges() -> None:
+   # the edges are interleaved with the nodes when read from the document
+   kinds = [type(batch) for batch in read_graph_batches(GRAPH,batch_size=100)]
+   assert kinds==[NodeBatch,NodeBatch,EdgeBatch,EdgeBatch]
+
+def test_typed_columns() -> None:
+   numpy = pytest.importorskip('numpy')
+   assert column([1,2,3]).dtype==numpy.int64
+   assert column([1.0,2.5]).dtype==numpy.float64
+   # mixed ints and floats keep their types
+   assert column([1,2.5]).dtype==object
+   assert column([1,2.5,2**60+1]).tolist()==[1,2.5,2**60+1]
+   assert type(column([1,2.5]).tolist()[0])==int
+   assert column([True,False]).dtype==numpy.bool_
+   assert column(['a',1]).dtype==object
+   assert column([1,None]).dtype==object
+   batch = next(iter(read_graph_batches(GRAPH,batch_size=100)))
+   assert batch.ids.dtype==numpy.int64
+   assert batch.columns['use'].dtype==numpy.int64
+
+def test_rows_match_items() -> None:
+   items = [item for item in read_graph(GRAPH) if type(item).__name__=='NodeItem']
+   rows = [row for batch in columnar_batches(items) for row in batch_rows(batch,additive=False)]
+   assert [row['properties'] for row in rows]==[
+      {'id':'A','use':12},{'id':'B','name':'Component B','use':6},{'id':'C','use':1},{'id':'M'}
+   ]
+
+def test_batch_cypher() -> None:
+   queries = list(graph_to_cypher(read_graph_batches(GRAPH),use_parameters=True))
+   assert len(queries)==4
+   query, parameters = queries[0]
+   assert query.startswith('UNWIND $rows AS row\nMERGE (n:Component {`id`: row.`keys`.`id`})')
+   assert parameters['rows'][0]=={'keys':{'id':'A'},'properties':{'id':'A','use':12}}
+   query, parameters = queries[2]
+   assert 'MERGE (from)-[r:imports]->(to)' in query
+   assert parameters['rows']==[{'from':{'id':'A'},'to':{'id':'B'},'properties':{}},{'from':{'id':'C'},'to':{'id':'B'},'properties':{}}]
+   literal = list(graph_to_cypher(read_graph_batches(GRAPH)))[1]
+   assert "row.`properties`" in literal and "'M'" in literal
+
+def test_load_requests_numbering() -> None:
+   requests = list(load_requests(read_graph_batches(GRAPH,batch_size=2)))
+   assert [(request.start,request.end) for request in requests]==[(1,2),(3,3),(4,4),(5,6),(7,7)]
+
+def test_batch_size() -> None:
+   with pytest.raises(ValueError):
+      list(read_graph_batches(GRAPH,batch_size=0))
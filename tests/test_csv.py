@@ -0,0 +1,80 @@
+import io
+
+import pytest
+
+from propgraph import read_graph, NodeItem, EdgeRelationItem, SchemaParser
+from propgraph.csvgraph import read_csv_files, converter, expand_sources, CSVGraphReader
+
+NODES = r"""~id,~label,name,age:Int,score:Double,active:Bool,tags:String[],counts:Long[],born:Date
+1,Person,Alice,30,1.5,true,a;b,1;2,2001-02-03
+2,Person;Employee,"Bob, Jr",,2,FALSE,x\;y,,2001-02-03T04:05:06Z
+"""
+
+EDGES = """~id,~from,~to,~label,since:Long
+e1,1,2,knows,2020
+"""
+
+def write(path, text):
+   path.write_text(text)
+   return str(path)
+
+def test_converters() -> None:
+   assert converter('Bool')('TRUE') is True
+   assert converter('long')('12')==12
+   assert converter('Double[]')('1;2.5')==[1.0,2.5]
+   assert converter('Date')('2001-02-03')=='2001-02-03'
+   assert converter(None) is None
+   with pytest.raises(ValueError):
+      converter('Point')
+   with pytest.raises(ValueError):
+      converter('Bool')('yes')
+
+def test_read_types() -> None:
+   items = list(read_graph(io.StringIO(NODES),format='csv',chunk_size=1))
+   assert items==[
+      NodeItem(
+         frozenset(['Person']),frozenset(['id']),
+         {'id':'1','name':'Alice','age':30,'score':1.5,'active':True,'tags':['a','b'],'counts':[1,2],'born':'2001-02-03'}
+      ),
+      NodeItem(
+         frozenset(['Person','Employee']),frozenset(['id']),
+         {'id':'2','name':'Bob, Jr','score':2.0,'active':False,'tags':['x;y'],'born':'2001-02-03T04:05:06+00:00'}
+      )
+   ]
+
+def test_file_set(tmp_path) -> None:
+   write(tmp_path / 'a-edges.csv',EDGES)
+   write(tmp_path / 'b-nodes.csv',NODES)
+   items = list(read_csv_files([str(tmp_path / '*.csv')]))
+   assert [type(item) for item in items]==[NodeItem,NodeItem,EdgeRelationItem]
+   edge = items[2]
+   assert dict(edge.from_node)=={'id':'1'} and dict(edge.to_node)=={'id':'2'}
+   assert edge.from_labels==frozenset(['Person']) and edge.to_labels==frozenset(['Person','Employee'])
+   assert edge.properties=={'id':'e1','since':2020}
+   with pytest.raises(FileNotFoundError):
+      expand_sources([str(tmp_path / '*.tsv')])
+
+def test_schema_keys_and_types() -> None:
+   schema = SchemaParser().parse("""
+'people'
+(:Person {code})
+.code = string
+.age = int
+""")
+   items = list(CSVGraphReader(schema=schema).read(io.StringIO('~id,~label,code,age\n1,Person,P1,42\n')))
+   assert items[0].keys==frozenset(['code'])
+   assert items[0].properties=={'id':'1','code':'P1','age':42}
+
+def test_schema_keyed_endpoints() -> None:
+   schema = SchemaParser().parse("""
+'people'
+(:Person {code})
+""")
+   reader = CSVGraphReader(schema=schema)
+   items = list(reader.read(io.StringIO('~id,~label,code\n1,Person,P1\n2,Person,P2\n')))
+   items += list(reader.read(io.StringIO('~from,~to,~label\n1,2,knows\n1,3,knows\n')))
+   # the endpoints are keyed as the nodes with the same ~id
+   assert (items[2].from_labels,dict(items[2].from_node))==(frozenset(['Person']),{'code':'P1'})
+   assert dict(items[2].to_node)=={'code':'P2'}
+   # a node that was not read is matched by its id property
+   assert (items[3].to_labels,dict(items[3].to_node))==(frozenset(),{'id':'3'})
@@ -0,0 +1,16 @@
+import subprocess
+import sys
+
+import propgraph
+
+def test_lazy_imports() -> None:
+   result = subprocess.run(
+      [sys.executable,'-c','import sys, propgraph; print(" ".join(sorted(set(sys.modules) & {"yaml","lark","csv","propgraph.cypher","propgraph.schema"})))'],
+      capture_output=True,text=True,check=True
+   )
+   assert result.stdout.strip()==''
+
+def test_exports() -> None:
+   for name in propgraph.__all__:
+      assert getattr(propgraph,name) is not None
+      assert name in dir(propgraph)
@@ -0,0 +1,90 @@
+import pytest
+
+from propgraph import read_graph, graph_to_cypher, NodeItem, EdgeRelationItem
+from propgraph.incremental import Manifest, content_hash, cypher_for_deletion, cypher_for_removal
+from propgraph.items import NodeDeletion, EdgeDeletion, NodeRemoval, EdgeRemoval
+
+GRAPH = """
+A:
+ ~label: Component
+ id: 'A'
+ use: 1
+ ~edges:
+ - ~to: B
+   ~label: imports
+ - ~to: C
+   ~label: imports
+B:
+ ~label: Component
+ id: 'B'
+C:
+ ~label: Component
+ id: 'C'
+"""
+
+def items(graph: str) -> list:
+   return list(read_graph(graph,infer=True,default_key='id'))
+
+def test_content_hash() -> None:
+   first = NodeItem({'A'},{'id'},{'id':'x','b':1,'a':[1,2]})
+   second = NodeItem({'A'},{'id'},{'a':[1,2],'id':'x','b':1})
+   assert content_hash(first)==content_hash(second)
+   assert content_hash(first)!=content_hash(NodeItem({'A'},{'id'},{'id':'x','b':2,'a':[1,2]}))
+
+def test_diff(tmp_path) -> None:
+   path = str(tmp_path / 'manifest.db')
+   with Manifest(path) as manifest:
+      assert len(list(manifest.diff(items(GRAPH))))==5
+      manifest.commit()
+      assert len(manifest)==5
+
+   with Manifest(path) as manifest:
+      assert list(manifest.diff(items(GRAPH)))==[]
+      manifest.commit()
+
+   changed = GRAPH.replace('use: 1','use: 2').replace(""" - ~to: C
+   ~label: imports
+""","")
+   with Manifest(path) as manifest:
+      diff = list(manifest.diff(items(changed),deletes=True))
+      manifest.commit()
+   assert [type(item) for item in diff]==[NodeItem,EdgeDeletion]
+   assert diff[0].properties['use']==2
+   assert (diff[1].from_node,diff[1].to_node)==({'id':'A'},{'id':'C'})
+   assert (manifest.created,manifest.updated,manifest.unchanged,manifest.deleted)==(0,1,3,1)
+
+   with Manifest(path) as manifest:
+      assert len(manifest)==4
+
+def test_rollback(tmp_path) -> None:
+   path = str(tmp_path / 'manifest.db')
+   with Manifest(path) as manifest:
+      assert len(list(manifest.diff(items(GRAPH))))==5
+      # not committed as the load did not complete
+   with Manifest(path) as manifest:
+      assert len(list(manifest.diff(items(GRAPH))))==5
+
+def test_scopes(tmp_path) -> None:
+   with Manifest(str(tmp_path / 'manifest.db')) as manifest:
+      list(manifest.diff(items(GRAPH),scope='a.yaml'))
+      assert list(manifest.diff(items(GRAPH),deletes=True,scope='b.yaml'))==items(GRAPH)
+      assert list(manifest.diff([],deletes=True,scope='a.yaml'))[-1]==NodeDeletion(frozenset(['Component']),{'id':'C'})
+
+def test_deletion_cypher() -> None:
+   assert cypher_for_deletion(NodeDeletion(frozenset(['Component']),{'id':'A'}))=="MATCH (n:Component {`id`: 'A'})\nDETACH DELETE n"
+   query, parameters = list(graph_to_cypher(iter([EdgeDeletion(frozenset(['imports']),frozenset(),{'id':'A'},frozenset(),{'id':'B'},False)]),use_parameters=True))[0]
+   assert query=='MATCH (from {`id`: $from0})-[r:imports]-(to {`id`: $to0})\nDELETE r'
+   assert parameters=={'from0':'A','to0':'B'}
+
+def test_removed_properties(tmp_path) -> None:
+   path = str(tmp_path / 'manifest.db')
+   with Manifest(path) as manifest:
+      list(manifest.diff(items(GRAPH)))
+      manifest.commit()
+   with Manifest(path) as manifest:
+      diff = list(manifest.diff(items(GRAPH.replace(' use: 1\n',' size: 2\n'))))
+   assert [type(item) for item in diff]==[NodeItem,NodeRemoval]
+   assert diff[1]==NodeRemoval(frozenset(['Component']),{'id':'A'},('use',))
+   assert list(graph_to_cypher(iter(diff[1:])))==["MATCH (n:Component {`id`: 'A'})\nREMOVE n.`use`"]
+   removal = EdgeRemoval(frozenset(['imports']),frozenset(),{'id':'A'},frozenset(),{'id':'B'},True,('weight','since'))
+   assert cypher_for_removal(removal)=="MATCH (from {`id`: 'A'})-[r:imports]->(to {`id`: 'B'})\nREMOVE r.`weight`, r.`since`"
@@ -0,0 +1,65 @@
+import pytest
+
+from propgraph import read_graph, Schema, NodeDefinition
+from propgraph.items import NodeItem, EdgeRelationItem, IndexDefinition
+from propgraph.indexes import index_definitions, schema_index_definitions, cypher_for_index, with_indexes
+from propgraph.loader import GraphLoader, load_requests, graph_query_command
+
+from conftest import FakeConnection
+
+GRAPH = """
+A:
+ ~label: Component
+ id: 'A'
+ ~edges:
+ - ~to: B
+   ~label: imports
+B:
+ ~label: Component
+ id: 'B'
+"""
+
+def test_index_definitions() -> None:
+   schema = Schema()
+   schema.add_node(NodeDefinition(labels={'Component'},keys={'name','id'}))
+   assert schema_index_definitions(schema)==[IndexDefinition('Component',('id','name'))]
+   assert index_definitions(['Module'],['id'],constraints=True)==[IndexDefinition('Module',('id',)),IndexDefinition('Module',('id',),unique=True)]
+   assert index_definitions(['Module'],[])==[]
+   assert cypher_for_index(IndexDefinition('Component',('id','name')))=='CREATE INDEX FOR (n:`Component`) ON (n.`id`, n.`name`)'
+
+def test_with_indexes() -> None:
+   items = list(with_indexes(read_graph(GRAPH,infer=True,default_key='id'),default_keys=['id']))
+   assert [type(item) for item in items]==[IndexDefinition,NodeItem,NodeItem,EdgeRelationItem]
+   assert items[0]==IndexDefinition('Component',('id',))
+
+   # deferred indexes follow the nodes
+   items = list(with_indexes(read_graph(GRAPH,infer=True,default_key='id'),deferred=True,default_keys=['id']))
+   assert [type(item) for item in items]==[NodeItem,NodeItem,IndexDefinition,EdgeRelationItem]
+
+   # nodes keyed by all their properties (no schema or inferred keys) are not indexed
+   with pytest.warns(UserWarning,match='Component'):
+      items = list(with_indexes(read_graph(GRAPH + ' name: b\n')))
+   assert [type(item) for item in items]==[NodeItem,NodeItem,EdgeRelationItem]
+
+   # the schema indexes precede all the items
+   schema = Schema()
+   schema.add_node(NodeDefinition(labels={'Module'},keys={'name'}))
+   schema.add_node(NodeDefinition(labels={'Component'},keys={'id'}))
+   items = list(with_indexes(read_graph(GRAPH,schema=schema),schema=schema))
+   assert items[:2]==[IndexDefinition('Module',('name',)),IndexDefinition('Component',('id',))]
+
+def test_constraint_command() -> None:
+   requests = list(load_requests([IndexDefinition('Component',('id',),unique=True)]))
+   assert graph_query_command('test',requests[0])==('GRAPH.CONSTRAINT','CREATE','test','UNIQUE','NODE','Component','PROPERTIES','1','id')
+
+def test_existing_index_ignored() -> None:
+   connection = FakeConnection(fail_on='CREATE INDEX',error='Attribute \'id\' is already indexed')
+   with GraphLoader(connection,'test') as loader:
+      for request in load_requests(with_indexes(read_graph(GRAPH,infer=True,default_key='id'),constraints=True,default_keys=['id'])):
+         loader.submit(request)
+   assert [command[0] for command in connection.commands]==['GRAPH.QUERY','GRAPH.CONSTRAINT','GRAPH.QUERY','GRAPH.QUERY','GRAPH.QUERY']
+   assert loader.counters.rejected==0
+
+def test_create_nodes() -> None:
+   items = list(read_graph(GRAPH))
+   assert [request.query for request in load_requests(items[:1],merge=False)]==["CREATE (n:Component) SET n.`id` = 'A'"]
@@ -0,0 +1,172 @@
+import asyncio
+import json
+
+import pytest
+
+from propgraph import read_graph
+from propgraph.loader import GraphLoader, LoadError, LoadCounters, RetryPolicy, DeadLetterFile, load_requests, load_graph, parameterized_query, split_request
+
+from conftest import FakeConnection, FakeAsyncConnection
+
+GRAPH = """
+A:
+ ~label: Component
+ id: 'A'
+ ~edges:
+ - ~to: B
+   ~label: imports
+B:
+ ~label: Component
+ id: 'B'
+C:
+ ~label: Component
+ id: 'C'
+"""
+
+def test_parameterized_query() -> None:
+   assert parameterized_query('RETURN $x',{'x':'a'})=='CYPHER `x`="a" RETURN $x'
+   # names and map keys are quoted
+   assert parameterized_query('SET n = $properties',{'properties':{'@id':'A','my name':'x'}})=='CYPHER `properties`={`@id`:"A",`my name`:"x"} SET n = $properties'
+   assert parameterized_query('RETURN 1')=='RETURN 1'
+
+@pytest.mark.parametrize('pipeline,round_trips',[(1,4),(2,2),(10,1)])
+def test_pipelined_load(connection,pipeline,round_trips) -> None:
+   with GraphLoader(connection,'test',pipeline=pipeline) as loader:
+      for request in load_requests(read_graph(GRAPH)):
+         loader.submit(request)
+   assert loader.queries==4
+   assert connection.round_trips==round_trips
+   assert [command[:2] for command in connection.commands]==[('GRAPH.QUERY','test')]*4
+
+def test_batched_load(connection) -> None:
+   requests = list(load_requests(read_graph(GRAPH),use_parameters=True,batch_size=10))
+   assert [(request.start,request.end) for request in requests]==[(1,3),(4,4)]
+   with GraphLoader(connection,'test',pipeline=10) as loader:
+      for request in requests:
+         loader.submit(request)
+   assert connection.commands[0][2].startswith('CYPHER `rows`=[')
+
+def test_load_reports_failed_item() -> None:
+   connection = FakeConnection(fail_on="'B'")
+   with pytest.raises(LoadError) as info:
+      with GraphLoader(connection,'test',pipeline=10) as loader:
+         for request in load_requests(read_graph(GRAPH)):
+            loader.submit(request)
+   assert info.value.request.start==2
+   assert info.value.request.describe()=='item 2'
+
+def test_async_load() -> None:
+   connection = FakeAsyncConnection()
+   count = asyncio.run(load_graph(read_graph(GRAPH),connection,concurrency=2))
+   assert count==4
+   assert connection.max_active==2
+   # the edge is only sent after every node query has completed
+   edge_start = connection.events.index(('start',connection.events[-1][1]))
+   assert [event for event, _ in connection.events[:edge_start]].count('end')==3
+
+def test_async_load_reports_failed_item() -> None:
+   connection = FakeAsyncConnection(fail_on="'C'")
+   with pytest.raises(LoadError) as info:
+      asyncio.run(load_graph(read_graph(GRAPH),connection,concurrency=4))
+   assert info.value.request.start==3
+
+class FlakyConnection(FakeConnection):
+
+   def __init__(self, failures, fail_on=None):
+      super().__init__(fail_on=fail_on)
+      self.failures = failures
+
+   def run(self, command):
+      if self.failures>0:
+         self.failures -= 1
+         raise ConnectionResetError('Connection reset by peer')
+      return super().run(command)
+
+def test_retry_transient_errors() -> None:
+   connection = FlakyConnection(2)
+   delays = []
+   with GraphLoader(connection,'test',retry=RetryPolicy(retries=3,backoff=0.5,jitter=0),sleep=delays.append) as loader:
+      for request in load_requests(read_graph(GRAPH)):
+         loader.submit(request)
+   assert loader.queries==4
+   assert loader.counters.retries==2
+   assert delays==[0.5,1.0]
+
+   connection = FlakyConnection(3)
+   with pytest.raises(LoadError):
+      with GraphLoader(connection,'test',retry=RetryPolicy(retries=2,backoff=0),sleep=delays.append) as loader:
+         for request in load_requests(read_graph(GRAPH)):
+            loader.submit(request)
+
+class ReplyErrorConnection(FakeConnection):
+   # reports the failure in the reply (as FalkorDB does for runtime errors)
+
+   def run(self, command):
+      self.commands.append(command)
+      if self.fail_on in command[2]:
+         return [['Nodes created: 0'],ValueError('unique constraint violation')]
+      return [['Nodes created: 1']]
+
+@pytest.mark.parametrize('pipeline',[1,10])
+def test_error_in_reply(pipeline) -> None:
+   connection = ReplyErrorConnection(fail_on="'B'")
+   committed = []
+   with pytest.raises(LoadError) as info:
+      with GraphLoader(connection,'test',pipeline=pipeline,on_commit=committed.append) as loader:
+         for request in load_requests(read_graph(GRAPH)):
+            loader.submit(request)
+   assert info.value.request.start==2
+   assert 'unique constraint violation' in str(info.value)
+   assert [request.start for request in committed]==[1]
+
+def test_async_error_in_reply() -> None:
+   class Client:
+      async def execute_command(self, *args):
+         return ReplyErrorConnection(fail_on="'C'").run(args)
+   with pytest.raises(LoadError) as info:
+      asyncio.run(load_graph(read_graph(GRAPH),Client(),concurrency=2))
+   assert info.value.request.start==3
+
+@pytest.mark.parametrize('pipeline',[1,3])
+def test_bisect_failing_batch(tmp_path,pipeline) -> None:
+   connection = FakeConnection(fail_on="'C'")
+   path = tmp_path / 'rejected.jsonl'
+   committed = []
+   with DeadLetterFile(str(path)) as dead_letter:
+      with GraphLoader(connection,'test',pipeline=pipeline,dead_letter=dead_letter,on_commit=lambda request: committed.append(request.end)) as loader:
+         for request in load_requests(read_graph(GRAPH),batch_size=10):
+            loader.submit(request)
+   assert loader.counters.rejected==1
+   assert loader.counters.bisections==2
+   # the node batch (1-3) and the edge (4) are committed
+   assert committed==[3,4]
+   rejected = [json.loads(line) for line in path.read_text().splitlines()]
+   assert len(rejected)==1
+   assert rejected[0]['start']==3 and rejected[0]['items'][0]['properties']=={'id':'C'}
+   assert 'Invalid query' in rejected[0]['error']
+
+@pytest.mark.parametrize('pipeline',[1,3])
+def test_bisect_without_dead_letter(pipeline) -> None:
+   # the failure names the failing item rather than the batch
+   connection = FakeConnection(fail_on="'C'")
+   with pytest.raises(LoadError) as info:
+      with GraphLoader(connection,'test',pipeline=pipeline) as loader:
+         for request in load_requests(read_graph(GRAPH),batch_size=10):
+            loader.submit(request)
+   assert (info.value.request.start,info.value.request.end)==(3,3)
+   assert loader.counters.bisections==2
+
+def test_split_request() -> None:
+   request = next(load_requests(read_graph(GRAPH),use_parameters=True,batch_size=10))
+   first, second = split_request(request)
+   assert (first.start,first.end,second.start,second.end)==(1,1,2,3)
+   assert second.parameters=={'rows':[{'keys':{'id':'B'},'properties':{'id':'B'}},{'keys':{'id':'C'},'properties':{'id':'C'}}]}
+   assert split_request(first)==[]
+
+def test_async_bisect() -> None:
+   connection = FakeAsyncConnection(fail_on="'C'")
+   rejected = []
+   counters = LoadCounters()
+   asyncio.run(load_graph(read_graph(GRAPH),connection,batch_size=10,dead_letter=lambda request, error: rejected.append(request.start),counters=counters))
+   assert rejected==[3]
+   assert counters.rejected==1 and counters.queries==3
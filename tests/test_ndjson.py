@@ -0,0 +1,73 @@
+from io import StringIO
+
+import pytest
+
+from propgraph import read_graph, Schema, NodeDefinition
+from propgraph.items import NodeItem, EdgeRelationItem
+from propgraph.ndjson import read_ndjson, write_ndjson
+
+GRAPH = """
+A:
+ ~label: Component
+ id: 'A'
+ name: 'a'
+ ~edges:
+ - ~to: B
+   ~label: imports
+   ~directed: false
+   weight: 2
+B:
+ ~label: [Component, Module]
+ id: 'B'
+"""
+
+RECORDS = """{"~label": "Component", "id": "A", "name": "a"}
+
+{"~labels": ["Component"], "id": "B"}
+{"~labels": ["imports"], "~from": "A", "~from-labels": "Component", "~to": {"id": "B"}, "since": 2020}
+"""
+
+def test_round_trip() -> None:
+   schema = Schema()
+   schema.add_node(NodeDefinition(labels={'Component'},keys={'id'}))
+   items = list(read_graph(GRAPH,schema=schema))
+   output = StringIO()
+   assert write_ndjson(items,output)==3
+   output.seek(0)
+   records = list(read_graph(output,format='ndjson'))
+   assert records[:2]==items[:2]
+   edge = records[2]
+   assert (edge.labels,edge.from_labels,dict(edge.from_node),edge.to_labels,dict(edge.to_node),edge.directed,edge.properties)==(items[2].labels,items[2].from_labels,{'id':'A'},items[2].to_labels,{'id':'B'},False,{'weight':2})
+
+def test_read_records() -> None:
+   schema = Schema()
+   schema.add_node(NodeDefinition(labels={'Component'},keys={'id'}))
+   items = list(read_ndjson(StringIO(RECORDS),schema=schema))
+   assert items[0]==NodeItem(frozenset({'Component'}),frozenset({'id'}),{'id':'A','name':'a'})
+   assert items[0].labels is items[1].labels
+   assert items[2].from_node=={'id':'A'} and items[2].directed
+   with pytest.raises(ValueError,match='line 2'):
+      list(read_ndjson(StringIO('{"id": 1}\n[1]\n')))
+   with pytest.raises(ValueError):
+      list(read_ndjson(StringIO('{"~to": "A"}\n')))
+
+def test_scalar_endpoints() -> None:
+   # a scalar endpoint is the value of the default key without a schema key
+   records = '{"~label": "C", "@id": "A"}\n{"~from": "A", "~to": "A", "~label": "self"}\n'
+   node, edge = read_ndjson(StringIO(records),infer=True)
+   assert node.keys==frozenset({'@id'})
+   assert edge.from_node==node.properties and edge.to_node==node.properties
+   node, edge = read_ndjson(StringIO(records.replace('@id','key')),default_key='key')
+   assert edge.from_node=={'key':'A'}
+
+def test_read_parts(tmp_path) -> None:
+   path = tmp_path / 'graph.ndjson'
+   path.write_text(''.join('{{"~labels": ["N"], "id": {}, "name": "{}"}}\n'.format(id,'x'*(id % 7)) for id in range(100)))
+   for parts in [1,2,3,7,200]:
+      ids = []
+      for part in range(parts):
+         with open(path,'rb') as input:
+            ids.extend(item.properties['id'] for item in read_ndjson(input,part=part,parts=parts))
+      assert ids==list(range(100))
+   with open(path,'r') as input, pytest.raises(ValueError):
+      list(read_ndjson(input,parts=2))
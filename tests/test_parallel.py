@@ -0,0 +1,132 @@
+from propgraph import read_graph
+from propgraph.items import NodeItem, EdgeRelationItem
+from propgraph.parallel import PartitionTask, load_partition, partition_of, parallel_load
+
+from conftest import FakeConnection
+
+GRAPH = """
+A:
+ ~label: Component
+ id: 'A'
+ ~edges:
+ - ~to: B
+   ~label: imports
+ - ~to: C
+   ~label: imports
+B:
+ ~label: Component
+ id: 'B'
+ ~edges:
+ - ~to: C
+   ~label: imports
+C:
+ ~label: Component
+ id: 'C'
+D:
+ ~label: Component
+ id: 'D'
+"""
+
+connections = []
+
+def recording_connect(**kwargs):
+   connection = FakeConnection()
+   connections.append(connection)
+   return connection
+
+def test_partition_of() -> None:
+   items = [item for item in read_graph(GRAPH)]
+   for partitions in [1,2,3]:
+      assignments = [partition_of(item,partitions) for item in items]
+      assert all(0<=partition<partitions for partition in assignments)
+      assert assignments==[partition_of(item,partitions) for item in read_graph(GRAPH)]
+
+def test_load_partitions(tmp_path) -> None:
+   source = tmp_path / 'graph.yaml'
+   source.write_text(GRAPH)
+   connections.clear()
+   results = []
+   for phase in ['nodes','edges']:
+      for partition in range(3):
+         results.append(load_partition(PartitionTask(str(source),phase,partition=partition,partitions=3,connect=recording_connect)))
+   assert all(result.error is None for result in results)
+   assert sum(result.items for result in results[:3])==4
+   assert sum(result.items for result in results[3:])==3
+   queries = [query for connection in connections for query in connection.queries]
+   assert len(queries)==7 and len(set(queries))==7
+
+def test_parallel_load_failure(tmp_path) -> None:
+   source = tmp_path / 'graph.yaml'
+   source.write_text(GRAPH)
+   # the edge phase is skipped when the nodes fail to load
+   results = parallel_load([str(source)],2,connection={'database':'none'})
+   assert len(results)==2
+   assert all(result.task.phase=='nodes' and result.error is not None for result in results)
+
+def test_load_partition_checkpoint(tmp_path) -> None:
+   source = tmp_path / 'graph.yaml'
+   source.write_text(GRAPH)
+   checkpoint = str(tmp_path / 'test.checkpoint')
+   connections.clear()
+   task = PartitionTask(str(source),'nodes',partition=0,partitions=1,connect=recording_connect,checkpoint=checkpoint)
+   assert load_partition(task).queries==4
+   task.resume = True
+   # the completed partition is not loaded again
+   assert load_partition(task).queries==0
+   assert len(connections)==1
+
+def test_load_ndjson_partitions(tmp_path) -> None:
+   from propgraph.ndjson import write_ndjson
+   source = tmp_path / 'graph.ndjson'
+   with open(source,'w') as output:
+      write_ndjson(read_graph(GRAPH),output)
+   connections.clear()
+   results = []
+   for phase in ['nodes','edges']:
+      for partition in range(3):
+         results.append(load_partition(PartitionTask(str(source),phase,partition=partition,partitions=3,read_options={'format':'ndjson'},connect=recording_connect)))
+   assert all(result.error is None for result in results)
+   # each partition reads its share of the lines
+   assert sum(result.items for result in results[:3])==4
+   assert sum(result.items for result in results[3:])==3
+
+def test_split_source(tmp_path) -> None:
+   from propgraph.parallel import SplitTask, split_source
+   source = tmp_path / 'graph.yaml'
+   source.write_text(GRAPH)
+   split = SplitTask(str(source),str(tmp_path),partitions=3)
+   assert split_source(split) is None
+   connections.clear()
+   results = []
+   for phase in ['nodes','edges']:
+      for partition in range(3):
+         # the partitions are read from the split instead of the source
+         task = PartitionTask(str(source),phase,partition=partition,partitions=3,connect=recording_connect,input=split.path(phase,partition))
+         results.append(load_partition(task))
+   assert all(result.error is None for result in results)
+   assert [result.items for result in results]==[sum(partition_of(item,3)==partition for item in read_graph(GRAPH) if type(item)==type_name) for type_name in [NodeItem,EdgeRelationItem] for partition in range(3)]
+   queries = [query for connection in connections for query in connection.queries]
+   assert len(queries)==7 and len(set(queries))==7
+   assert split_source(SplitTask(str(tmp_path / 'missing.yaml'),str(tmp_path))) is not None
+
+def test_parallel_load(tmp_path) -> None:
+   source = tmp_path / 'graph.yaml'
+   source.write_text(GRAPH)
+   results = parallel_load([str(source)],2,partitions=3,connect=recording_connect,directory=str(tmp_path))
+   assert all(result.error is None for result in results)
+   assert [result.task.phase for result in results]==['nodes'] * 3 + ['edges'] * 3
+   assert sum(result.items for result in results[:3])==4
+   assert sum(result.items for result in results[3:])==3
+   # the split files are removed
+   assert sorted(path.name for path in tmp_path.iterdir())==['graph.yaml']
+
+def test_parallel_load_checkpoint(tmp_path) -> None:
+   source = tmp_path / 'graph.yaml'
+   source.write_text(GRAPH)
+   checkpoint = str(tmp_path / 'test.checkpoint')
+   results = parallel_load([str(source)],2,partitions=2,connect=recording_connect,checkpoint=checkpoint)
+   # the source is hashed once for all its partitions
+   assert len({result.task.fingerprint for result in results})==1 and results[0].task.fingerprint is not None
+   assert sum(result.queries for result in results)==7
+   results = parallel_load([str(source)],2,partitions=2,connect=recording_connect,checkpoint=checkpoint,resume=True)
+   assert sum(result.queries for result in results)==0
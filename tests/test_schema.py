@@ -0,0 +1,46 @@
+from propgraph import Schema, SchemaParser, NodeDefinition, read_graph
+from propgraph.schema import schema_grammar_parser
+
+def test_find_index() -> None:
+   schema = Schema()
+   component = NodeDefinition(labels={'Component'},keys={'id'})
+   schema.add_node(component)
+   assert schema.find('Component')==[component]
+   assert schema.find('Component','Module')==[component]
+   assert schema.find_keys('Module') is None
+   assert frozenset({'Component','Module'}) in schema.resolved
+
+   # adding a definition invalidates the resolved label sets
+   module = NodeDefinition(labels={'Module'},keys={'name'})
+   schema.add_node(module)
+   assert len(schema.resolved)==0
+   assert schema.find('Module','Component')==[component,module]
+   assert schema.find_keys('Module')=={'name'}
+
+def test_read_graph_resolves_keys_once() -> None:
+   schema = Schema()
+   schema.add_node(NodeDefinition(labels={'Component'},keys={'id'}))
+   calls = []
+   find = schema.find
+   schema.find = lambda *labels: calls.append(labels) or find(*labels)
+   graph = {
+      'A': {'~label':'Component','id':'A','~edges':[{'~to':'B','~label':'imports'}]},
+      'B': {'~label':'Component','id':'B'}
+   }
+   items = list(read_graph(graph,schema=schema))
+   assert len(items)==3
+   assert items[2].from_node=={'id':'A'}
+   assert calls==[('Component',)]
+
+def test_shared_parser() -> None:
+   parser = SchemaParser()
+   assert SchemaParser().parser is parser.parser
+   schema = parser.parse("(:Component {id})\n.id = 'the identifier'\n")
+   assert schema.find_keys('Component')=={'id'}
+
+def test_parser_per_cache(tmp_path) -> None:
+   cache = str(tmp_path / 'schema.lark')
+   parser = schema_grammar_parser(cache=cache)
+   assert schema_grammar_parser(cache=cache) is parser
+   assert schema_grammar_parser(cache=False) is not parser
+   assert (tmp_path / 'schema.lark').exists()
@@ -0,0 +1,95 @@
+import datetime
+from io import BytesIO
+
+import pytest
+
+from propgraph import read_graph, Schema, NodeDefinition
+from propgraph.items import NodeItem, EdgeRelationItem, NodeBatch, EdgeBatch
+from propgraph.snapshot import Snapshot, write_snapshot, read_snapshot
+
+GRAPH = """
+~schema: |
+  (:Component {id})
+A:
+ ~label: Component
+ id: 'A'
+ tags: [x, 1, true]
+ created: 2024-01-02
+ ~edges:
+ - ~to: B
+   ~label: imports
+   weight: 0.5
+B:
+ ~label: [Component, Module]
+ id: 'B'
+ size: 10
+ large: 123456789012345678901234567890
+ missing: null
+"""
+
+def endpoints(item):
+   return (item.from_labels,dict(item.from_node),item.to_labels,dict(item.to_node)) if isinstance(item,EdgeRelationItem) else None
+
+def test_round_trip(tmp_path) -> None:
+   path = str(tmp_path / 'graph.snapshot')
+   items = list(read_graph(GRAPH))
+   writer = write_snapshot(items,path)
+   assert (writer.nodes,writer.edges,writer.items)==(2,1,4)
+   snapshot = list(read_snapshot(path))
+   assert type(snapshot[0])==Schema
+   assert snapshot[0].find_keys('Component')=={'id'}
+   assert snapshot[1:3]==items[1:3]
+   assert [endpoints(item) for item in snapshot]==[endpoints(item) for item in items]
+   assert snapshot[1].properties['created']==datetime.date(2024,1,2)
+   assert snapshot[1].properties['tags']==['x',1,True]
+   assert snapshot[3].from_node=={'id':'A'}
+   # the sets are shared by the items
+   assert snapshot[1].labels is snapshot[3].from_labels
+
+def test_values(tmp_path) -> None:
+   # dates, large integers, and maps are written without pickling and other
+   # values are refused
+   properties = {
+      'date': datetime.date(2024,1,2),
+      'time': datetime.datetime(2024,1,2,3,4,5,tzinfo=datetime.timezone.utc),
+      'large': -(1<<70),
+      'map': {'a': [1,{'b': None}]}
+   }
+   node = NodeItem(frozenset({'A'}),frozenset(),properties)
+   [item] = read_snapshot(write_bytes([node],tmp_path))
+   assert item.properties==properties
+   with pytest.raises(ValueError):
+      write_bytes([NodeItem(frozenset({'A'}),frozenset(),{'set': {1,2}})],tmp_path)
+   with pytest.raises(ValueError):
+      write_bytes([object()],tmp_path)
+
+def write_bytes(items, tmp_path) -> bytes:
+   path = tmp_path / 'graph.snapshot'
+   write_snapshot(items,str(path))
+   return path.read_bytes()
+
+def test_external_endpoints(tmp_path) -> None:
+   # an edge to a node that is not in the snapshot keeps its endpoint
+   edge = EdgeRelationItem(frozenset({'uses'}),frozenset({'A'}),{'id':1},frozenset({'B'}),{'id':2},False,{})
+   node = NodeItem(frozenset({'A'}),frozenset({'id'}),{'id':1})
+   with Snapshot(write_bytes([edge,node],tmp_path)) as snapshot:
+      items = list(snapshot)
+      assert len(snapshot)==2
+      assert snapshot.node(0)==node
+   assert endpoints(items[0])==(frozenset({'A'}),{'id':1},frozenset({'B'}),{'id':2})
+   assert items[0].directed==False
+
+def test_batches(tmp_path) -> None:
+   schema = Schema()
+   schema.add_node(NodeDefinition(labels={'Component'},keys={'id'}))
+   data = write_bytes(read_graph(GRAPH,schema=schema),tmp_path)
+   batches = [item for item in read_snapshot(BytesIO(data),batch_size=10) if isinstance(item,(NodeBatch,EdgeBatch))]
+   assert [len(batch) for batch in batches]==[1,1,1]
+
+def test_invalid_snapshot(tmp_path) -> None:
+   with pytest.raises(ValueError):
+      list(read_snapshot(b'not a snapshot'))
+   path = tmp_path / 'empty.snapshot'
+   path.write_bytes(b'')
+   with pytest.raises(ValueError):
+      list(read_snapshot(str(path)))
@@ -0,0 +1,176 @@
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+
+from propgraph import read_graph
+from propgraph.items import NodeDeletion, EdgeDeletion, IndexDefinition
+from propgraph.loader import GraphLoader, RetryPolicy, DeadLetterFile, load_requests, load_graph, parameterized_query
+from propgraph.memorygraph import MemoryGraph, QueryError
+from propgraph.standin import StandinServer, Faults, _read_commands
+
+GRAPH = """
+~schema: |
+  (:Component {id})
+A:
+ ~label: Component
+ id: 'A'
+ name: "it's A"
+ tags: [x, y]
+ ~edges:
+ - ~to: B
+   ~label: imports
+   weight: 2
+ - ~to: C
+   ~label: imports
+B:
+ ~label: Component
+ id: 'B'
+ active: true
+C:
+ ~label: Component
+ id: 'C'
+ size: 1.5
+"""
+
+def load(graph: MemoryGraph, items, **options):
+   for request in load_requests(iter(items),**options):
+      graph.query(parameterized_query(request.query,request.parameters))
+
+@pytest.mark.parametrize('options',[{},{'use_parameters':True},{'batch_size':10},{'batch_size':10,'use_parameters':True},{'exact':True}])
+def test_memory_graph_load(options) -> None:
+   graph = MemoryGraph()
+   items = list(read_graph(GRAPH))
+   load(graph,items,**options)
+   # merging is idempotent
+   load(graph,items,**options)
+   assert len(graph.nodes)==3
+   assert len(graph.relationships)==2
+   a = graph.node('Component',id='A')
+   assert a.properties=={'id':'A','name':"it's A",'tags':['x','y']}
+   assert graph.node('Component',id='B').properties['active'] is True
+   assert graph.node('Component',id='C').properties['size']==1.5
+   [imports] = graph.find_relationships(a,graph.node('Component',id='B'),frozenset(['imports']))
+   assert imports.properties=={'weight':2}
+
+def test_memory_graph_create_and_set() -> None:
+   graph = MemoryGraph()
+   graph.query("CREATE (n:A)\n SET n.`id` = 'x', n.`count` = 1")
+   graph.query("CREATE (n:A)\n SET n.`id` = 'x'")
+   assert len(graph.find_nodes({'A'},{'id':'x'}))==2
+   statistics = graph.query("MATCH (n:A {`id`: 'x'})\n SET n += {`count`: 2, `old`: null}")
+   assert statistics.properties_set==4
+   assert [node.properties.get('count') for node in graph.find_nodes({'A'},{'id':'x'})]==[2,2]
+   with pytest.raises(QueryError):
+      graph.query('MERGE (n:A {`id`: $id})')
+   with pytest.raises(QueryError):
+      graph.query('MATCH (n) RETURN n')
+
+def test_memory_graph_deletions_and_indexes() -> None:
+   graph = MemoryGraph()
+   load(graph,read_graph(GRAPH))
+   load(graph,[
+      EdgeDeletion(frozenset(['imports']),frozenset(['Component']),{'id':'A'},frozenset(['Component']),{'id':'C'},True),
+      NodeDeletion(frozenset(['Component']),{'id':'B'})
+   ])
+   assert graph.node('Component',id='B') is None
+   assert len(graph.relationships)==0
+   load(graph,[IndexDefinition('Component',('id',))])
+   with pytest.raises(QueryError,match='already indexed'):
+      load(graph,[IndexDefinition('Component',('id',))])
+
+def test_memory_graph_names() -> None:
+   # names that are not identifiers must be quoted, as in FalkorDB
+   graph = MemoryGraph()
+   with pytest.raises(QueryError):
+      graph.query('CYPHER properties={@id:"A"} MERGE (n:C {`@id`: $properties.`@id`})')
+   graph.query('CYPHER `properties`={`@id`:"A"} MERGE (n:C {`@id`: $properties.`@id`})')
+   assert graph.node('C',**{'@id':'A'}) is not None
+
+def test_read_commands() -> None:
+   buffer = bytearray(b'*2\r\n$4\r\nPING\r\n$2\r\nhi\r\nPING\r\n*1\r\n$4\r\nPI')
+   commands, used = _read_commands(buffer)
+   assert commands==[[b'PING',b'hi'],[b'PING']]
+   assert buffer[used:]==b'*1\r\n$4\r\nPI'
+
+@pytest.fixture
+def server():
+   pytest.importorskip('redis')
+   with StandinServer() as server:
+      yield server
+
+def test_pipelined_load(server) -> None:
+   with GraphLoader(server.connect(),'test',pipeline=10) as loader:
+      for request in load_requests(read_graph(GRAPH),use_parameters=True):
+         loader.submit(request)
+   assert loader.queries==5
+   assert [query.graph for query in server.queries]==['test']*5
+   assert server.queries[0].query.startswith('CYPHER ')
+   graph = server.graph('test')
+   assert len(graph.nodes)==3
+   assert len(graph.relationships)==2
+
+def test_async_load(server) -> None:
+   async def run():
+      client = server.connect(asynchronous=True)
+      try:
+         return await load_graph(read_graph(GRAPH),client,concurrency=4,batch_size=10)
+      finally:
+         await client.aclose()
+   assert asyncio.run(run())==3
+   assert len(server.graph('test').relationships)==2
+
+def test_rejected_queries(tmp_path) -> None:
+   pytest.importorskip('redis')
+   path = tmp_path / 'rejected.jsonl'
+   with StandinServer(faults=Faults(fail_matching="'B'")) as server:
+      with DeadLetterFile(str(path)) as dead_letter:
+         with GraphLoader(server.connect(),'test',pipeline=10,dead_letter=dead_letter) as loader:
+            for request in load_requests(read_graph(GRAPH)):
+               loader.submit(request)
+   assert loader.counters.rejected==2
+   assert [json.loads(line)['start'] for line in path.read_text().splitlines()]==[3,5]
+   assert [query.error for query in server.queries if query.error]==['Injected query failure']*2
+   assert len(server.graph('test').nodes)==2
+
+def test_transient_failures_are_retried() -> None:
+   pytest.importorskip('redis')
+   with StandinServer(latency=0.001,faults=Faults(transient_rate=0.3,seed=7)) as server:
+      with GraphLoader(server.connect(),'test',pipeline=2,retry=RetryPolicy(retries=20,backoff=0.001)) as loader:
+         for request in load_requests(read_graph(GRAPH)):
+            loader.submit(request)
+   # the client retries some of the errors itself
+   assert any(query.error is not None for query in server.queries)
+   assert len(server.graph('test').nodes)==3
+   assert len(server.graph('test').relationships)==2
+
+def test_runtime_errors(tmp_path) -> None:
+   pytest.importorskip('redis')
+   path = tmp_path / 'rejected.jsonl'
+   # an error in the query result is a failed query
+   with StandinServer(faults=Faults(runtime_error_rate=1.0)) as server:
+      with DeadLetterFile(str(path)) as dead_letter:
+         with GraphLoader(server.connect(),'test',pipeline=2,dead_letter=dead_letter) as loader:
+            for request in load_requests(read_graph(GRAPH)):
+               loader.submit(request)
+   assert loader.counters.rejected==5
+   assert [query.error for query in server.queries]==['Injected runtime failure']*5
+
+def test_query_time_is_concurrent() -> None:
+   pytest.importorskip('redis')
+   # the query time of concurrent connections overlaps
+   with StandinServer(query_time=0.2) as server:
+      connections = [server.connect() for _ in range(4)]
+      for connection in connections:
+         connection.ping()
+      threads = [threading.Thread(target=connection.execute_command,args=('GRAPH.QUERY','test','CREATE (n:A)')) for connection in connections]
+      start = time.perf_counter()
+      for thread in threads:
+         thread.start()
+      for thread in threads:
+         thread.join()
+      elapsed = time.perf_counter() - start
+   assert len(server.graph('test').nodes)==4
+   assert 0.2<=elapsed<0.6
@@ -0,0 +1,64 @@
+import time
+
+from propgraph import read_graph
+from propgraph.loader import GraphLoader, load_requests
+from propgraph.stats import Stats, StatsHook
+
+GRAPH = """
+A:
+ ~label: Component
+ id: 'A'
+ ~edges:
+ - ~to: B
+   ~label: imports
+B:
+ ~label: Component
+ id: 'B'
+"""
+
+class RecordingHook(StatsHook):
+
+   def __init__(self):
+      self.queries = []
+      self.summary = None
+
+   def query(self, stats, size, seconds):
+      self.queries.append(size)
+
+   def finish(self, stats, summary):
+      self.summary = summary
+
+def test_stages(connection) -> None:
+   hook = RecordingHook()
+   stats = Stats([hook])
+
+   def slow(stream):
+      for item in stream:
+         time.sleep(0.01)
+         yield item
+
+   items = stats.timed(slow(read_graph(GRAPH)),'read',count=True)
+   requests = stats.timed(load_requests(items),'generate')
+   with GraphLoader(connection,'test',stats=stats) as loader:
+      for request in requests:
+         loader.submit(request)
+   summary = stats.finish()
+   assert summary is hook.summary
+   assert summary['items']==3
+   assert summary['stages']['read']['items']==3
+   assert summary['stages']['generate']['items']==3
+   assert summary['stages']['query']['items']==3
+   # the time spent reading is not counted as generating queries
+   assert summary['stages']['read']['seconds']>=0.03
+   assert summary['stages']['generate']['seconds']<summary['stages']['read']['seconds']
+   assert summary['queries']['count']==3 and len(hook.queries)==3
+   assert sum(summary['queries']['sizes'].values())==3
+   assert set(summary['queries']['latency'].keys())=={'p50','p90','p99','max'}
+
+def test_latency_samples() -> None:
+   stats = Stats(samples=10)
+   for index in range(100):
+      stats.query(1 << (index % 4),index/1000)
+   assert len(stats.latencies)==10
+   assert stats.sizes=={1:25,2:25,4:25,8:25}
+   assert stats.percentiles()['max']<=0.099
@@ -0,0 +1,42 @@
+import pytest
+
+from propgraph import cypher_for_item, NodeItem, EdgeRelationItem
+from propgraph.templates import TemplateCache
+
+def test_template_reuse() -> None:
+   cache = TemplateCache()
+   query_a, parameters_a = cache.query(NodeItem({'Component'},{'id'},{'id':'A','use':12}))
+   query_b, parameters_b = cache.query(NodeItem({'Component'},{'id'},{'id':'B'}))
+   assert query_a is query_b
+   assert query_a=='MERGE (n:Component {`id`: $k0})\n SET n = $properties\n'
+   assert parameters_b=={'k0':'B','properties':{'id':'B'}}
+   assert (cache.hits,cache.misses)==(1,1)
+
+def test_template_edges() -> None:
+   cache = TemplateCache()
+   edge = EdgeRelationItem({'imports'},{'Component'},{'id':'A'},{'Component'},{'id':'B'},True,{})
+   query, parameters = cache.query(edge)
+   assert query.splitlines()==[
+      'MERGE (from:Component {`id`: $from0})',
+      'MERGE (to:Component {`id`: $to0})',
+      'MERGE (from)-[r:imports]->(to)'
+   ]
+   assert parameters=={'from0':'A','to0':'B'}
+   edge.properties['weight'] = 2
+   query, parameters = cache.query(edge)
+   assert query.endswith(' SET r = $properties\n')
+   assert parameters['properties']=={'weight':2}
+   assert cache.misses==2
+
+def test_template_lru() -> None:
+   cache = TemplateCache(maxsize=2)
+   for label in ['A','B','A','C','A']:
+      cache.get(NodeItem({label},{'id'},{'id':1}))
+   assert (cache.hits,cache.misses)==(2,3)
+   assert len(cache.templates)==2
+   cache.get(NodeItem({'B'},{'id'},{'id':1}))
+   assert cache.misses==4
+
+def test_template_missing_key() -> None:
+   with pytest.raises(ValueError):
+      cypher_for_item(NodeItem({'Component'},{'id'},{'name':'A'}),use_parameters=True)
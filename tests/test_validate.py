@@ -0,0 +1,76 @@
+import pytest
+
+from propgraph import read_graph, NodeItem, EdgeRelationItem, Schema, NodeDefinition
+from propgraph.validate import GraphValidator, validate_graph
+
+GRAPH = """
+A:
+ ~label: Component
+ id: 'A'
+ version: 1
+ ~edges:
+ - ~to: B
+   ~label: imports
+B:
+ ~label: Component
+ id: 'B'
+ version: 2
+"""
+
+def composite_schema() -> Schema:
+   schema = Schema()
+   node = NodeDefinition(labels={'Component'},keys={'id','version'})
+   node.add_property('id','string')
+   node.add_property('version','int')
+   schema.add_node(node)
+   return schema
+
+@pytest.mark.parametrize('hashed',[True,False])
+def test_valid_graph(hashed) -> None:
+   report = validate_graph(read_graph(GRAPH,schema=composite_schema()),hashed=hashed)
+   assert report.valid
+   assert (report.nodes,report.edges)==(2,1)
+
+def test_issues() -> None:
+   schema = composite_schema()
+   items = [
+      EdgeRelationItem({'imports'},{'Component'},{'id':'A','version':1},{'Component'},{'id':'B','version':2},True,{}),
+      NodeItem({'Component'},{'id','version'},{'id':'A','version':1}),
+      NodeItem({'Component'},{'id','version'},{'id':'A','version':1}),
+      NodeItem({'Component'},{'id','version'},{'id':'C','version':'3'}),
+      EdgeRelationItem({'imports'},{'Component'},{'id':'A','version':1},{'Component'},{'id':'C','version':3},True,{}),
+      EdgeRelationItem({'imports'},{'Module'},{},{'Component'},{'id':'A','version':1},True,{}),
+   ]
+   report = validate_graph(items,schema=schema)
+   assert report.counts=={'dangling':1,'duplicate':1,'key-type':2,'undefined-labels':1}
+   assert [(issue.kind,issue.item) for issue in report.issues]==[('duplicate',3),('key-type',4),('dangling',1),('key-type',5),('undefined-labels',6)]
+   assert report.to_dict()['counts']==report.counts
+
+@pytest.mark.parametrize('hashed',[True,False])
+def test_labels_are_part_of_the_identity(hashed) -> None:
+   items = [
+      NodeItem({'Component'},{'id'},{'id':'A'}),
+      NodeItem({'Module'},{'id'},{'id':'A'}),
+      NodeItem({'Module','Package'},{'id'},{'id':'B'}),
+      EdgeRelationItem({'contains'},{'Package'},{'id':'A'},{'Component'},{'id':'A'},True,{}),
+      EdgeRelationItem({'contains'},{'Package'},{'id':'B'},{'Module'},{'id':'A'},True,{}),
+      EdgeRelationItem({'contains'},set(),{'id':'A'},set(),{'id':'B'},True,{}),
+   ]
+   report = validate_graph(items,hashed=hashed)
+   assert report.counts=={'dangling':1}
+   assert [(issue.kind,issue.item) for issue in report.issues]==[('dangling',4)]
+
+def test_max_issues() -> None:
+   items = [EdgeRelationItem({'imports'},set(),{'id':str(index)},set(),{'id':'X'},True,{}) for index in range(10)]
+   report = validate_graph(items,max_issues=3)
+   assert report.counts=={'dangling':20}
+   assert len(report.issues)==3
+
+def test_max_pending() -> None:
+   items = [EdgeRelationItem({'imports'},set(),{'id':str(index)},set(),{'id':str(index+1)},True,{}) for index in range(10)]
+   items += [NodeItem({'Component'},{'id'},{'id':str(index)}) for index in range(1,10)]
+   validator = GraphValidator(max_pending=4)
+   report = validator.validate(items)
+   assert validator.spill is None
+   assert report.counts=={'dangling':2}
+   assert [issue.item for issue in report.issues]==[1,10]